@@ -0,0 +1,41 @@
+from pathlib import Path
+
+from vslomp.archive import Archive, ArchiveWriter, frame_bytes
+from vslomp.video.proc import Cmd, Context
+
+SIZE = (16, 8)
+
+
+def _bake(path: Path, frames: int) -> None:
+    with ArchiveWriter(path, SIZE, frames) as writer:
+        for x in range(frames):
+            writer.append(x * 2, bytes([x]) * frame_bytes(SIZE))
+
+
+def test_unload_closes_and_reopens(tmp_path: Path):
+    path = tmp_path / "baked.vsla"
+    _bake(path, 3)
+
+    archive = Archive(path)
+    assert len(archive) == 3
+    assert archive.frame_number(2) == 4
+    assert bytes(archive.buffer(1)) == bytes([1]) * frame_bytes(SIZE)
+
+    Cmd.Unload(archive).exec(None, Context())  # type: ignore
+    assert archive._mm.closed
+
+    reopened = Archive(path)
+    assert len(reopened) == 3
+    assert bytes(reopened.buffer(2)) == bytes([2]) * frame_bytes(SIZE)
+    reopened.close()
+
+
+def test_close_with_a_buffer_still_out(tmp_path: Path):
+    path = tmp_path / "baked.vsla"
+    _bake(path, 2)
+
+    archive = Archive(path)
+    buf = archive.buffer(0)
+    archive.close()
+    # the frame already handed out stays readable until it is dropped
+    assert bytes(buf) == bytes([0]) * frame_bytes(SIZE)
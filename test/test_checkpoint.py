@@ -0,0 +1,20 @@
+from vslomp.checkpoint import Checkpoint, Checkpointer
+
+
+def test_for_video_without_a_file(tmp_path):
+    assert Checkpointer.for_video("http://example.com/video.mp4", tmp_path) is None
+
+
+def test_save_is_throttled_until_flush(tmp_path):
+    video = tmp_path / "video.mp4"
+    video.write_bytes(b"video")
+    checkpointer = Checkpointer.for_video(str(video), tmp_path)
+    assert checkpointer is not None
+    checkpointer.interval = 60
+
+    checkpointer.save(Checkpoint(1, 100))
+    checkpointer.save(Checkpoint(2, 200))
+    assert checkpointer.load() == Checkpoint(1, 100)
+
+    checkpointer.flush()
+    assert checkpointer.load() == Checkpoint(2, 200)
@@ -0,0 +1,85 @@
+import threading
+import time
+import types
+
+import vslomp.display.clock as clock
+from vslomp.display.clock import FrameClock, Scheduler
+
+
+class _Time:
+    def __init__(self, now: float = 100.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class _Scheduler(Scheduler):
+    """Records jobs instead of running them."""
+
+    def __init__(self):
+        super().__init__()
+        self.jobs = []
+
+    def at(self, deadline, fn):
+        job = clock.Job(deadline, fn)
+        self.jobs.append(job)
+        return job
+
+
+def _clock(monkeypatch, period: float = 1.0):
+    now = _Time()
+    monkeypatch.setattr(clock, "time", types.SimpleNamespace(monotonic=now))
+    scheduler = _Scheduler()
+    return FrameClock(period, scheduler), scheduler, now
+
+
+def test_deadlines_keep_to_the_grid(monkeypatch):
+    frame_clock, scheduler, now = _clock(monkeypatch)
+
+    assert frame_clock.schedule(lambda: None) == 100.0
+    now.now = 100.7
+    assert frame_clock.schedule(lambda: None) == 101.0
+    now.now = 101.2
+    assert frame_clock.schedule(lambda: None) == 102.0
+    assert [job.deadline for job in scheduler.jobs] == [100.0, 101.0, 102.0]
+
+
+def test_late_frame_takes_the_next_deadline(monkeypatch):
+    frame_clock, _, now = _clock(monkeypatch)
+    frame_clock.schedule(lambda: None)
+
+    now.now = 103.5
+    assert frame_clock.schedule(lambda: None) == 104.0
+    assert frame_clock.slot == 4
+
+
+def test_resume_shifts_the_grid(monkeypatch):
+    frame_clock, scheduler, now = _clock(monkeypatch)
+    frame_clock.schedule(lambda: None)
+    frame_clock.schedule(lambda: None)
+    pending = scheduler.jobs[-1]
+
+    now.now = 100.5
+    frame_clock.pause()
+    assert pending.cancelled
+    now.now = 110.5
+    assert frame_clock.resume() == 111.0
+    assert scheduler.jobs[-1].deadline == 111.0
+
+    now.now = 111.0
+    assert frame_clock.schedule(lambda: None) == 112.0
+
+
+def test_scheduler_runs_jobs_in_deadline_order():
+    scheduler = Scheduler("TestClock")
+    ran = []
+    done = threading.Event()
+    now = time.monotonic()
+
+    scheduler.at(now + 0.02, lambda: (ran.append(2), done.set()))
+    scheduler.at(now + 0.01, lambda: ran.append(1))
+    scheduler.cancel(scheduler.at(now, lambda: ran.append(0)))
+
+    assert done.wait(2)
+    assert ran == [1, 2]
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from vslomp.display.imager.dither import (
+    DEFAULT,
+    DITHERS,
+    atkinson,
+    bayer_matrix,
+    check,
+    dither,
+    dither_array,
+)
+
+
+def _atkinson_reference(gray: np.ndarray) -> np.ndarray:
+    height, width = gray.shape
+    buf = gray.astype(np.float32)
+    out = np.zeros(gray.shape, dtype=bool)
+    for y in range(height):
+        for x in range(width):
+            out[y, x] = buf[y, x] >= 128
+            err = (buf[y, x] - out[y, x] * np.float32(255)) * np.float32(1 / 8)
+            for dy, dx in ((0, 1), (0, 2), (1, -1), (1, 0), (1, 1), (2, 0)):
+                if 0 <= y + dy < height and 0 <= x + dx < width:
+                    buf[y + dy, x + dx] += err
+    return out
+
+
+@pytest.mark.parametrize("algorithm", list(DITHERS))
+def test_dither_keeps_brightness(algorithm):
+    for level in (0, 255):
+        flat = np.full((16, 24), level, dtype=np.uint8)
+        assert (dither_array(flat, algorithm) == bool(level)).all()
+
+    gray = np.full((32, 32), 128, dtype=np.uint8)
+    bits = dither_array(gray, algorithm)
+    assert bits.shape == gray.shape
+    assert bits.dtype == np.bool_
+    assert 0.4 < bits.mean() < 0.6
+
+
+@pytest.mark.parametrize("algorithm", list(DITHERS))
+def test_dither_image_matches_array(algorithm):
+    img = Image.linear_gradient("L").resize((40, 30))
+
+    out = dither(img, algorithm)
+
+    assert out.mode == "1"
+    assert (np.asarray(out) == dither_array(img, algorithm)).all()
+
+
+def test_atkinson_matches_serial_diffusion():
+    gray = np.random.default_rng(0).integers(0, 256, (13, 17), dtype=np.uint8)
+
+    assert (atkinson(gray) == _atkinson_reference(gray)).all()
+
+
+def test_bayer_matrix_spreads_thresholds():
+    matrix = bayer_matrix(2)
+
+    assert matrix.shape == (4, 4)
+    assert len(np.unique(matrix)) == 16
+    assert matrix.min() > 0 and matrix.max() < 255
+
+
+def test_check():
+    assert check("") == DEFAULT
+    with pytest.raises(ValueError):
+        check("sierra")
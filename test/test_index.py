@@ -0,0 +1,46 @@
+from fractions import Fraction
+from pathlib import Path
+
+import pytest
+
+from vslomp.bench.synth import make_video
+from vslomp.video.index import FrameIndex, dumps, get_index, index_path, loads
+
+
+def test_dumps_loads_round_trip():
+    index = FrameIndex([0, 512, 1024, 1536, 2048], [0, 3], Fraction(1, 12800))
+
+    loaded = loads(dumps(index))
+
+    assert list(loaded.pts) == list(index.pts)
+    assert list(loaded.keyframes) == list(index.keyframes)
+    assert loaded.time_base == index.time_base
+    assert loaded.frames == 5
+
+
+def test_loads_rejects_bad_data():
+    data = dumps(FrameIndex([0, 1, 2], [0], Fraction(1, 25)))
+
+    with pytest.raises(ValueError):
+        loads(b"XXXX" + data[4:])
+    with pytest.raises(ValueError):
+        loads(data[:-4])
+
+
+def test_addressable_with_nonkey():
+    index = FrameIndex([0, 10, 20, 30, 40], [0, 2, 4], Fraction(1, 1))
+
+    assert list(index.addressable(None)) == [0, 10, 20, 30, 40]
+    assert list(index.addressable("NONKEY")) == [0, 20, 40]
+    assert list(index.addressable_keyframes("NONKEY")) == [0, 1, 2]
+
+
+def test_get_index_caches(tmp_path: Path):
+    video = make_video(tmp_path / "video.mp4", 12, (64, 48), gop=4)
+
+    index = get_index(str(video), 0, tmp_path)
+
+    assert index.frames == 12
+    assert index.keyframes[0] == 0
+    assert index_path(str(video), 0, tmp_path).exists()
+    assert list(get_index(str(video), 0, tmp_path).pts) == list(index.pts)
@@ -0,0 +1,53 @@
+from PIL import Image, ImageDraw
+
+from vslomp.display.screen.emulator import EmulatedEPD, EmulatorConfig
+from vslomp.display.screen.pack import BLANK, pack_image
+from vslomp.display.screen.refresh import Refresh, RefreshState
+
+
+def _driver_buffer(img: Image.Image) -> bytes:
+    # what the waveshare drivers' getbuffer makes of a landscape frame: the mode "1" image's
+    # rows, inverted so that set bits are black
+    return bytes(b ^ 0xFF for b in img.convert("1").tobytes())
+
+
+def _frame(size=(24, 8)) -> Image.Image:
+    img = Image.new("L", size, 255)
+    draw = ImageDraw.Draw(img)
+    draw.rectangle((0, 0, 3, 7), fill=0)
+    draw.point([(9, 2), (17, 5), (23, 7)], fill=0)
+    return img
+
+
+def test_pack_image_matches_driver_layout():
+    img = _frame()
+
+    assert pack_image(img) == _driver_buffer(img)
+    assert pack_image(Image.new("1", (16, 2), 1)) == bytes([BLANK]) * 4
+    assert pack_image(Image.new("1", (16, 2), 0)) == b"\xff" * 4
+
+
+def test_pack_image_turns_portrait_frames():
+    portrait = _frame().rotate(90, expand=True)
+
+    # the drivers turn a portrait frame a quarter counter-clockwise
+    assert pack_image(portrait, (24, 8)) == _driver_buffer(portrait.rotate(90, expand=True))
+
+
+def test_cleared_panel_is_blank():
+    refresh = RefreshState((24, 8))
+    refresh.cleared()
+
+    assert refresh.plan(pack_image(Image.new("1", (24, 8), 1)), False) == (Refresh.SKIP, None)
+    assert refresh.plan(pack_image(_frame()), False) == (Refresh.FULL, None)
+
+
+def test_emulator_shows_packed_frames(tmp_path):
+    epd = EmulatedEPD(EmulatorConfig(width=24, height=8, png_dir=tmp_path))
+    epd.init()
+    img = _frame()
+
+    epd.display(epd.getbuffer(img))
+
+    with Image.open(tmp_path / "frame-000001.png") as shown:
+        assert shown.convert("1").tobytes() == img.convert("1").tobytes()
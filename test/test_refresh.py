@@ -0,0 +1,50 @@
+from vslomp.display.screen.refresh import Refresh, RefreshState
+
+SIZE = (32, 16)
+
+
+def _frame(*pixels) -> bytes:
+    buf = bytearray(4 * 16)
+    for x, y in pixels:
+        buf[y * 4 + x // 8] |= 0x80 >> (x % 8)
+    return bytes(buf)
+
+
+def test_first_frame_is_full():
+    assert RefreshState(SIZE, partial=True).plan(_frame(), True) == (Refresh.FULL, None)
+
+
+def test_same_frame_is_skipped():
+    refresh = RefreshState(SIZE, partial=True)
+    refresh.shown(_frame((3, 3)), Refresh.FULL)
+
+    assert refresh.plan(_frame((3, 3)), True) == (Refresh.SKIP, None)
+
+
+def test_small_change_is_partial_in_byte_aligned_box():
+    refresh = RefreshState(SIZE, partial=True)
+    refresh.shown(_frame(), Refresh.FULL)
+
+    assert refresh.plan(_frame((10, 2), (12, 4)), True) == (Refresh.PARTIAL, (8, 2, 16, 5))
+    assert refresh.plan(_frame((10, 2)), False) == (Refresh.FULL, None)
+    assert RefreshState(SIZE).plan(_frame(), True) == (Refresh.FULL, None)
+
+
+def test_large_change_is_full():
+    refresh = RefreshState(SIZE, partial=True, partial_area=0.25)
+    refresh.shown(_frame(), Refresh.FULL)
+
+    assert refresh.plan(_frame((0, 0), (31, 15)), True) == (Refresh.FULL, None)
+
+
+def test_full_refresh_after_full_every_partials():
+    refresh = RefreshState(SIZE, partial=True, full_every=2)
+    refresh.shown(_frame(), Refresh.FULL)
+
+    for x in (1, 2):
+        frame = _frame((x, 0))
+        assert refresh.plan(frame, True)[0] is Refresh.PARTIAL
+        refresh.shown(frame, Refresh.PARTIAL)
+
+    assert refresh.plan(_frame((3, 0)), True) == (Refresh.FULL, None)
+    assert refresh.counts == (1, 2, 0)
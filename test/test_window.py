@@ -0,0 +1,69 @@
+import threading
+
+import pytest
+
+from vslomp.display.window import FrameWindow, WindowClosed
+
+
+def _acquire_later(window: FrameWindow, nbytes: int = 0) -> threading.Thread:
+    thread = threading.Thread(target=window.acquire, args=(nbytes,), daemon=True)
+    thread.start()
+    thread.join(0.05)
+    return thread
+
+
+def test_acquire_blocks_until_release():
+    window = FrameWindow(frames=2)
+    window.acquire()
+    window.acquire()
+
+    waiting = _acquire_later(window)
+    assert waiting.is_alive()
+
+    window.release()
+    waiting.join(1)
+    assert not waiting.is_alive()
+    assert window.frames == 2
+
+
+def test_byte_budget():
+    window = FrameWindow(nbytes=100)
+    window.acquire(60)
+
+    waiting = _acquire_later(window, 60)
+    assert waiting.is_alive()
+
+    window.release(60)
+    waiting.join(1)
+    assert not waiting.is_alive()
+    assert (window.frames, window.nbytes) == (1, 60)
+
+
+def test_oversized_frame_passes_an_empty_window():
+    window = FrameWindow(nbytes=100)
+
+    window.acquire(500)
+
+    assert window.nbytes == 500
+
+
+def test_close_wakes_and_refuses_producers():
+    window = FrameWindow(frames=1)
+    window.acquire()
+    errors = []
+
+    def acquire():
+        try:
+            window.acquire()
+        except WindowClosed as ex:
+            errors.append(ex)
+
+    waiting = threading.Thread(target=acquire, daemon=True)
+    waiting.start()
+    window.close()
+    waiting.join(1)
+
+    assert not waiting.is_alive()
+    assert len(errors) == 1
+    with pytest.raises(WindowClosed):
+        window.acquire()
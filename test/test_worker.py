@@ -0,0 +1,53 @@
+import threading
+
+import pytest
+
+from vslomp.archive import frame_bytes
+from vslomp.bench.synth import make_video
+from vslomp.video.worker import RenderPool, RenderSpec
+
+SIZE = (64, 48)
+
+
+def _render(spec: RenderSpec, workers: int = 2):
+    frames = []
+    finished = threading.Event()
+    errors = []
+
+    def onbuffer(buf, fr, release):
+        frames.append((fr, len(buf)))
+        release()
+
+    def onfinish(last):
+        finished.set()
+
+    pool = RenderPool(spec, workers, 4)
+    try:
+        pool.start(onbuffer, onfinish, errors.append)
+        assert finished.wait(30)
+    finally:
+        pool.close()
+    assert not errors
+    return frames
+
+
+def test_worker_pool_renders_in_order(tmp_path):
+    video = make_video(tmp_path / "video.mp4", 6, SIZE, gop=1)
+
+    frames = _render(RenderSpec(str(video), 0, SIZE, cache_dir=tmp_path, threads=True))
+
+    assert frames == [(fr, frame_bytes(SIZE)) for fr in range(6)]
+
+
+def test_open_without_start_plays_from_the_first_frame(tmp_path):
+    server = pytest.importorskip("vslomp.server")
+    gen = pytest.importorskip("vslomp.gen.vslomp")
+    video = make_video(tmp_path / "video.mp4", 4, SIZE, gop=1)
+    req = gen.Open(video_path=str(video), stop=3)
+
+    start = server._start(req, None, None, None)
+
+    frames = _render(
+        RenderSpec(str(video), 0, SIZE, start=start, stop=req.stop, cache_dir=tmp_path)
+    )
+    assert [fr for fr, _ in frames] == [0, 1, 2]
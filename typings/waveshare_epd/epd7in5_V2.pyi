@@ -9,6 +9,8 @@ from PIL.Image import Image
 EPD_WIDTH = 800
 EPD_HEIGHT = 480
 class EPD:
+    width: int
+    height: int
     def __init__(self) -> None:
         ...
     
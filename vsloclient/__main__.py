@@ -31,6 +31,13 @@ async def main(*, host: str, port: int):
 
 if __name__ == "__main__":
     import argparse
+    import sys
+
+    if sys.argv[1:2] == ["load"]:
+        from vsloclient.load import cli
+
+        cli(sys.argv[2:])
+        sys.exit(0)
 
     arg_parser = argparse.ArgumentParser()
     arg_parser.add_argument("--host", default="0.0.0.0")
@@ -0,0 +1,342 @@
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from grpclib.client import Channel
+
+from vslomp.bench.synth import make_video
+from vslomp.gen.vslomp import OpenResultAction, PlayerServiceStub
+
+_PREEMPTED = "preempted by a newer Open"
+
+
+class ProcSample(NamedTuple):
+    rss_kb: int
+    threads: int
+    fds: int
+    # descriptors open on the load test's videos, one or more per open container
+    video_fds: int
+
+
+def sample_process(pid: int, video_dir: Path) -> Optional[ProcSample]:
+    """Reads the server's memory, thread and descriptor counts from /proc, on Linux."""
+    status: Dict[str, str] = {}
+    try:
+        with open(f"/proc/{pid}/status") as fp:
+            for line in fp:
+                key, _, val = line.partition(":")
+                status[key] = val.strip()
+        fds = os.listdir(f"/proc/{pid}/fd")
+    except OSError:
+        return None
+
+    video_fds = 0
+    for fd in fds:
+        try:
+            if os.readlink(f"/proc/{pid}/fd/{fd}").startswith(str(video_dir)):
+                video_fds += 1
+        except OSError:
+            pass
+
+    return ProcSample(
+        int(status.get("VmRSS", "0 kB").split()[0]),
+        int(status.get("Threads", "0")),
+        len(fds),
+        video_fds,
+    )
+
+
+def _percentile(samples: Sequence[float], q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+class Recorder:
+    """Collects what every Open stream saw, for one reporting interval at a time."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.opens = 0
+        self.errors = 0
+        self.preempted = 0
+        self.failed_streams = 0
+        self.messages = 0
+        # seconds from the previous message of the stream, or from the Open for the first
+        self.latencies: List[float] = []
+        self.first_load: List[float] = []
+        self.first_play: List[float] = []
+        self.last_error: Optional[str] = None
+
+    def take(self) -> Dict[str, Any]:
+        """Returns a summary of the interval, and starts the next one."""
+        summary = {
+            "opens": self.opens,
+            "messages": self.messages,
+            "errors": self.errors,
+            "error_rate": self.errors / self.messages if self.messages else 0.0,
+            "preempted": self.preempted,
+            "failed_streams": self.failed_streams,
+            "latency_p50": _percentile(self.latencies, 0.5),
+            "latency_p95": _percentile(self.latencies, 0.95),
+            "latency_max": max(self.latencies, default=0.0),
+            "first_load_p50": _percentile(self.first_load, 0.5),
+            "first_load_p95": _percentile(self.first_load, 0.95),
+            "first_play_p50": _percentile(self.first_play, 0.5),
+            "first_play_p95": _percentile(self.first_play, 0.95),
+            "last_error": self.last_error,
+        }
+        self.reset()
+        return summary
+
+
+async def _open_once(
+    player: PlayerServiceStub, video: Path, args: argparse.Namespace, rec: Recorder
+) -> None:
+    rec.opens += 1
+    began = last = time.perf_counter()
+    seen_load = seen_play = False
+
+    try:
+        async for res in player.open(
+            video_path=str(video),
+            frame_wait=float(args.frame_wait),
+            start=0,
+            stop=int(args.frames_per_open),
+            step=1,
+            dither=args.dither,
+        ):
+            now = time.perf_counter()
+            rec.messages += 1
+            rec.latencies.append(now - last)
+            last = now
+
+            if res.action == OpenResultAction.LOAD_VIDEO and not seen_load:
+                seen_load = True
+                rec.first_load.append(now - began)
+            elif res.action == OpenResultAction.PLAY_VIDEO and not seen_play:
+                seen_play = True
+                rec.first_play.append(now - began)
+
+            if not res.ok:
+                if res.err == _PREEMPTED:
+                    rec.preempted += 1
+                else:
+                    rec.errors += 1
+                    rec.last_error = res.err
+    except Exception as ex:
+        rec.failed_streams += 1
+        rec.last_error = repr(ex)
+
+
+async def _client(
+    player: PlayerServiceStub,
+    videos: Sequence[Path],
+    args: argparse.Namespace,
+    recorder: Recorder,
+    deadline: float,
+    remaining: "itertools.count[int]",
+) -> None:
+    for video in itertools.cycle(videos):
+        if time.monotonic() >= deadline or next(remaining) >= int(args.opens or sys.maxsize):
+            return
+        await _open_once(player, video, args, recorder)
+        await asyncio.sleep(float(args.pause))
+
+
+def _report(elapsed: float, summary: Dict[str, Any], proc: Optional[ProcSample]) -> None:
+    line = (
+        f"{elapsed:>8.0f}s opens {summary['opens']:>5} msgs {summary['messages']:>6} "
+        f"err {summary['error_rate']:>6.2%} pre {summary['preempted']:>4} "
+        f"fail {summary['failed_streams']:>3} | lat p50 {summary['latency_p50'] * 1000:>7.1f}ms "
+        f"p95 {summary['latency_p95'] * 1000:>7.1f}ms | load p50 "
+        f"{summary['first_load_p50'] * 1000:>7.1f}ms play p50 "
+        f"{summary['first_play_p50'] * 1000:>7.1f}ms"
+    )
+    if proc:
+        line += (
+            f" | rss {proc.rss_kb / 1024:>7.1f}MiB thr {proc.threads:>3} fds {proc.fds:>4} "
+            f"video fds {proc.video_fds:>3}"
+        )
+    print(line, flush=True)
+
+
+async def run(
+    args: argparse.Namespace, videos: Sequence[Path], pid: Optional[int]
+) -> List[Dict[str, Any]]:
+    """Runs the clients until the duration or number of opens is reached, and returns a
+    sample per reporting interval."""
+    video_dir = videos[0].parent
+    chan = Channel(host=args.host, port=int(args.port))
+    player = PlayerServiceStub(chan)
+    recorder = Recorder()
+    samples: List[Dict[str, Any]] = []
+    began = time.monotonic()
+    deadline = began + float(args.duration) if args.duration else float("inf")
+    remaining = itertools.count()
+
+    def _sample() -> None:
+        proc = sample_process(pid, video_dir) if pid else None
+        summary = recorder.take()
+        elapsed = time.monotonic() - began
+        _report(elapsed, summary, proc)
+        samples.append(dict(summary, elapsed=elapsed, **(proc._asdict() if proc else {})))
+
+    clients = [
+        asyncio.ensure_future(_client(player, videos, args, recorder, deadline, remaining))
+        for _ in range(int(args.concurrency))
+    ]
+    try:
+        while not all(c.done() for c in clients):
+            await asyncio.wait(clients, timeout=float(args.report_every))
+            _sample()
+
+        # once idle, a server that cleans up after itself drops back to no open videos
+        await asyncio.sleep(float(args.settle))
+        _sample()
+    finally:
+        for c in clients:
+            c.cancel()
+        chan.close()
+
+    return samples
+
+
+def _growth(samples: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+    watched = [s for s in samples if "rss_kb" in s]
+    if len(watched) < 2:
+        return {}
+    # the first sample is taken as warmed up, so only growth after it counts
+    first, last = watched[0], watched[-1]
+    return {
+        "rss_growth_kb": last["rss_kb"] - first["rss_kb"],
+        "rss_peak_kb": max(s["rss_kb"] for s in watched),
+        "thread_growth": last["threads"] - first["threads"],
+        "fd_growth": last["fds"] - first["fds"],
+        "video_fds_idle": last["video_fds"],
+    }
+
+
+def _spawn(screen: str, port: int, cache_dir: Path, extra: Sequence[str]) -> subprocess.Popen:
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "vslomp", screen, "-i", "127.0.0.1", "-p", str(port)]
+        + ["-c", str(cache_dir), *extra],
+        stdout=subprocess.DEVNULL,
+    )
+    while True:
+        if proc.poll() is not None:
+            raise RuntimeError(f"the server exited with {proc.returncode}")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.1):
+                return proc
+        except OSError:
+            time.sleep(0.05)
+
+
+def _parse_size(val: str) -> Tuple[int, int]:
+    width, _, height = val.lower().partition("x")
+    return (int(width), int(height))
+
+
+def cli(argv: Optional[Sequence[str]] = None) -> None:
+    arg_parser = argparse.ArgumentParser(
+        prog="vsloclient load",
+        description=(
+            "run many Open streams against a server, and watch it for latency, errors and leaks"
+        ),
+    )
+    arg_parser.add_argument("--host", default="127.0.0.1")
+    arg_parser.add_argument("--port", default=50051)
+    arg_parser.add_argument(
+        "--spawn",
+        metavar="SCREEN",
+        help="start a server on this screen (e.g. emulator:800x480) and watch its process",
+        default=None,
+    )
+    arg_parser.add_argument(
+        "--server-args", help="more arguments for the spawned server", default=""
+    )
+    arg_parser.add_argument(
+        "--server-pid", help="watch the memory, threads and descriptors of this server process"
+    )
+
+    arg_parser.add_argument("--videos", help="synthetic videos to cycle through", default=3)
+    arg_parser.add_argument("--video-frames", help="frames in each synthetic video", default=48)
+    arg_parser.add_argument("--video-size", help="size of the synthetic videos", default="640x480")
+    arg_parser.add_argument(
+        "--video-dir",
+        help="where to write the videos; the server must be able to read them (default: temp)",
+        default=None,
+    )
+
+    arg_parser.add_argument(
+        "-c",
+        "--concurrency",
+        help="Open streams running at once; each preempts the last",
+        default=1,
+    )
+    arg_parser.add_argument(
+        "-d", "--duration", help="seconds to run for (default: until --opens)", default=None
+    )
+    arg_parser.add_argument("-n", "--opens", help="Opens to make in total", default=None)
+    arg_parser.add_argument("--frames-per-open", help="frames each Open plays", default=8)
+    arg_parser.add_argument("--frame-wait", help="seconds between frames", default=0.0)
+    arg_parser.add_argument("--pause", help="seconds each client waits between Opens", default=0.0)
+    arg_parser.add_argument("--dither", help="the dither each Open asks for", default="")
+    arg_parser.add_argument("--report-every", help="seconds between reports", default=10.0)
+    arg_parser.add_argument(
+        "--settle", help="seconds to wait once idle before the last sample", default=2.0
+    )
+    arg_parser.add_argument("--json", help="also write every sample to this file", default=None)
+
+    args = arg_parser.parse_args(argv)
+    if not args.duration and not args.opens:
+        arg_parser.error("give --duration, --opens or both")
+
+    with tempfile.TemporaryDirectory(prefix="vsloclient-load-") as tmp:
+        video_dir = Path(args.video_dir) if args.video_dir else Path(tmp) / "videos"
+        video_dir.mkdir(parents=True, exist_ok=True)
+        size = _parse_size(args.video_size)
+        videos = [
+            # the server plays keyframes only, so every frame is one
+            make_video(video_dir / f"load-{x}.mp4", int(args.video_frames), size, gop=1)
+            for x in range(int(args.videos))
+        ]
+
+        server: Optional[subprocess.Popen] = None
+        pid = int(args.server_pid) if args.server_pid else None
+        if args.spawn:
+            server = _spawn(args.spawn, int(args.port), Path(tmp), args.server_args.split())
+            pid = server.pid
+
+        try:
+            samples = asyncio.run(run(args, videos, pid))
+        finally:
+            if server:
+                server.send_signal(signal.SIGINT)
+                server.wait(30)
+
+    growth = _growth(samples)
+    if growth:
+        print(
+            f"rss growth {growth['rss_growth_kb'] / 1024:.1f}MiB "
+            f"(peak {growth['rss_peak_kb'] / 1024:.1f}MiB), threads {growth['thread_growth']:+d}, "
+            f"fds {growth['fd_growth']:+d}, video fds open when idle {growth['video_fds_idle']}"
+        )
+
+    if args.json:
+        with open(args.json, "w") as fp:
+            json.dump({"samples": samples, "growth": growth}, fp, indent=2)
@@ -1,28 +1,49 @@
 import asyncio
 import logging
-from concurrent.futures.thread import ThreadPoolExecutor
-from typing import Optional
+from pathlib import Path
+from typing import AbstractSet, Collection, List, Mapping, Optional
 
 from grpclib.server import Server
 from grpclib.utils import graceful_exit
 
 import vslomp.display.proc as disp
+import vslomp.executors as executors
+import vslomp.metrics as metrics
+import vslomp.tracing as tracing
 import vslomp.video.proc as video
+from vslomp.display.imager.dither import DEFAULT as DEFAULT_DITHER
+from vslomp.display.imager.dither import DITHERS
 from vslomp.display.proc import Cmd as dcmd
-from vslomp.server import PlayerService
+from vslomp.server import PlayerOptions, PlayerService
+from vslomp.video.pool import ContainerPool
 
 
 async def main(
-    screen_type: str,
+    screen_types: List[str],
     *,
     host: str,
     port: int,
-    threads: int,
+    threads: Optional[int],
     log_level: str,
     asyncio_log_level: Optional[str],
+    cache_dir: Optional[Path] = None,
+    options: PlayerOptions = PlayerOptions(),
+    partial_refresh: bool = False,
+    partial_area: float = 0.25,
+    full_refresh_every: int = 10,
+    metrics_port: Optional[int] = None,
+    trace_file: Optional[Path] = None,
+    fast_start: bool = False,
+    open_videos: int = 4,
+    open_videos_bytes: int = 256 * 2**20,
+    affinity: Optional[Mapping[str, AbstractSet[int]]] = None,
+    lanes: Collection[str] = (executors.DISPLAY,),
 ):
     print("A very SLO movie player")
 
+    if trace_file:
+        tracing.TRACER.enabled = True
+
     core_logger = logging.getLogger("qcmd.core")
     core_logger.setLevel(log_level)
 
@@ -30,32 +51,75 @@ async def main(
         aio_logger = logging.getLogger("asyncio")
         aio_logger.setLevel(asyncio_log_level)
 
-    with ThreadPoolExecutor(threads, thread_name_prefix="Server") as tpe:
-        with video.VideoProcessorFactory(tpe, None) as vph, disp.create(screen_type, tpe) as dph:
+    if threads:
+        # each processor holds a thread, and every extra screen brings its own three
+        threads += 3 * (len(screen_types) - 1)
+    with executors.Executors(threads, affinity, lanes) as execs:
+        pool = ContainerPool(open_videos, open_videos_bytes) if open_videos else None
+        video_cxt = video.Context(cache_dir, pool)
+        vexec, vlane = executors.executor_for(execs, executors.VIDEO)
+        with video.VideoProcessorFactory(vexec, video_cxt, lane=vlane) as vph, disp.create_many(
+            screen_types,
+            execs,
+            partial_refresh=partial_refresh,
+            partial_area=partial_area,
+            full_refresh_every=full_refresh_every,
+            cache_dir=cache_dir,
+        ) as dphs:
 
-            dph.send(dcmd.INIT_SCREEN, pri=10).or_err(lambda ex, t: print(ex, ex.__class__))
-            dph.send(dcmd.CLEAR, pri=45)
+            for dph in dphs:
+                dph.send(dcmd.INIT_SCREEN, pri=10).or_err(lambda ex, t: print(ex, ex.__class__))
+                dph.send(dcmd.CLEAR_IF_UNKNOWN if fast_start else dcmd.CLEAR, pri=45)
 
-            dph.join()
+            # the screens' queues keep the init ahead of anything a client sends, so a fast start
+            # can serve while they are still initializing
+            if not fast_start:
+                for dph in dphs:
+                    dph.join()
 
-            player = PlayerService(dph, vph)
+            # every processor's threads are running by now, so only the loop's own are pinned
+            execs.pin_loop()
+            player = PlayerService(dphs, vph, options, pool)
             server = Server([player])
 
+            metrics_server = None
+            if metrics_port:
+                metrics_server = await metrics.serve_prometheus(host, metrics_port)
+                print("METRICS:", f"""{host}:{metrics_port}""")
+
             with graceful_exit([server]):
                 print("SERVING:", f"""{host}:{port}""")
                 await server.start(host=host, port=port)
                 await server.wait_closed()
 
+            if metrics_server:
+                metrics_server.close()
+
+            if trace_file:
+                trace_file.write_text(tracing.TRACER.dumps())
+                print("TRACE:", trace_file)
+
             vph.halt()
-            dph.join()
-            dph.send(dcmd.SLEEP)
-            dph.join()
+            if pool:
+                pool.close()
+            for dph in dphs:
+                dph.join()
+                dph.send(dcmd.SLEEP)
+            for dph in dphs:
+                dph.join()
 
     return None
 
 
 if __name__ == "__main__":
     import argparse
+    import sys
+
+    if sys.argv[1:2] == ["bake"]:
+        from vslomp.bake import cli
+
+        cli(sys.argv[2:])
+        sys.exit(0)
 
     arg_parser = argparse.ArgumentParser(
         prog="vslomp",
@@ -64,13 +128,143 @@ if __name__ == "__main__":
     )
 
     arg_parser.add_argument(
-        "screen_type", help="the type of the e-paper display connected to the server"
+        "screen_type",
+        nargs="+",
+        help=(
+            "the type of the e-paper display connected to the server, or emulator[:WxH,...];"
+            " give several to play every video on all of them"
+        ),
     )
 
     arg_parser.add_argument("-i", "--host", default="0.0.0.0")
     arg_parser.add_argument("-p", "--port", default=50051)
     arg_parser.add_argument(
-        "-t", "--threads", help="the number of threads to use for running the display", default=7
+        "-t",
+        "--threads",
+        help=(
+            "run every processor on one shared pool of this many threads, instead of a thread"
+            " of its own each"
+        ),
+        default=None,
+    )
+    arg_parser.add_argument(
+        "--cpus",
+        metavar="PROC=CPUS",
+        type=executors.parse_affinity,
+        action="append",
+        help=(
+            "pin a processor (video, imager, screen, display) or the event loop (loop) to CPUs,"
+            " e.g. video=2-3; may be repeated, Linux only"
+        ),
+        default=[],
+    )
+    arg_parser.add_argument(
+        "--lane",
+        choices=executors.PROCESSORS,
+        action="append",
+        help=(
+            "give a processor a second thread for high-priority queries, such as the screen"
+            " size (default: display)"
+        ),
+        default=None,
+    )
+
+    arg_parser.add_argument(
+        "-c",
+        "--cache-dir",
+        help="where to keep video frame indexes (default: $VSLOMP_CACHE_DIR or ~/.cache/vslomp)",
+        default=None,
+    )
+
+    arg_parser.add_argument(
+        "--lookahead-frames",
+        help="the number of frames to decode ahead of the screen (0 for no limit)",
+        default=4,
+    )
+    arg_parser.add_argument(
+        "--lookahead-mb",
+        help="the memory budget for frames decoded ahead of the screen, in MiB",
+        default=None,
+    )
+
+    arg_parser.add_argument(
+        "--jit",
+        help="render each frame just in time for its display deadline",
+        action="store_true",
+    )
+    arg_parser.add_argument(
+        "-w",
+        "--workers",
+        help="decode and render in this many worker processes (default: 0, in-process)",
+        default=0,
+    )
+
+    arg_parser.add_argument(
+        "--prefetch-frames",
+        help="frames of the next playlist video to render while the current one plays",
+        default=4,
+    )
+    arg_parser.add_argument(
+        "--open-videos",
+        help="recently played videos to keep open, to play again without reopening (0 for none)",
+        default=4,
+    )
+    arg_parser.add_argument(
+        "--open-videos-mb",
+        help="the estimated decoder memory the kept open videos may hold, in MiB",
+        default=256,
+    )
+    arg_parser.add_argument(
+        "--scaled-decode",
+        help="decode on several codec threads, straight to grayscale at the screen size",
+        action="store_true",
+    )
+
+    arg_parser.add_argument(
+        "--dither",
+        help="how to dither frames when an Open does not say",
+        choices=list(DITHERS),
+        default=DEFAULT_DITHER,
+    )
+
+    arg_parser.add_argument(
+        "--unfused-render",
+        help="size, dither and pack each frame in separate imager steps, for debugging",
+        action="store_true",
+    )
+
+    arg_parser.add_argument(
+        "--partial-refresh",
+        help="refresh only the changed part of the screen when the panel supports it",
+        action="store_true",
+    )
+    arg_parser.add_argument(
+        "--partial-area",
+        help="the largest fraction of the screen to refresh partially",
+        default=0.25,
+    )
+    arg_parser.add_argument(
+        "--full-refresh-every",
+        help="force a full refresh after this many partial refreshes",
+        default=10,
+    )
+
+    arg_parser.add_argument(
+        "--metrics-port",
+        help="serve Prometheus-style metrics over HTTP on this port",
+        default=None,
+    )
+
+    arg_parser.add_argument(
+        "--trace",
+        help="record a span for every command and write them to this file as a Chrome trace",
+        default=None,
+    )
+
+    arg_parser.add_argument(
+        "--fast-start",
+        help="serve while the screen initializes, and skip clearing it if it is as it was left",
+        action="store_true",
     )
 
     arg_parser.add_argument("-l", "--log-level", default="INFO")
@@ -84,10 +278,34 @@ if __name__ == "__main__":
         main(
             host=args.host,
             port=args.port,
-            screen_type=args.screen_type,
-            threads=int(args.threads),
+            screen_types=args.screen_type,
+            threads=int(args.threads) if args.threads else None,
             log_level=args.log_level,
             asyncio_log_level=args.asyncio_log_level if args.asyncio_debug else None,
+            cache_dir=Path(args.cache_dir) if args.cache_dir else None,
+            options=PlayerOptions(
+                lookahead_frames=int(args.lookahead_frames) or None,
+                lookahead_bytes=(
+                    int(float(args.lookahead_mb) * 2**20) if args.lookahead_mb else None
+                ),
+                jit=args.jit,
+                workers=int(args.workers),
+                scaled_decode=args.scaled_decode,
+                prefetch_frames=int(args.prefetch_frames),
+                dither=args.dither,
+                fused_render=not args.unfused_render,
+                cache_dir=Path(args.cache_dir) if args.cache_dir else None,
+            ),
+            partial_refresh=args.partial_refresh,
+            partial_area=float(args.partial_area),
+            full_refresh_every=int(args.full_refresh_every),
+            metrics_port=int(args.metrics_port) if args.metrics_port else None,
+            trace_file=Path(args.trace) if args.trace else None,
+            fast_start=args.fast_start,
+            open_videos=int(args.open_videos),
+            open_videos_bytes=int(float(args.open_videos_mb) * 2**20),
+            affinity=dict(args.cpus),
+            lanes=args.lane if args.lane is not None else (executors.DISPLAY,),
         ),
         debug=args.asyncio_debug,
     )
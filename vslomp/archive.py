@@ -0,0 +1,139 @@
+import bisect
+import mmap
+import os
+import struct
+from array import array
+from pathlib import Path
+from typing import BinaryIO, Optional, Tuple, Union
+
+# header | frame buffers (count * frame_bytes) | frame numbers (count * int32)
+_MAGIC = b"VSLA"
+_VERSION = 1
+_HEADER = struct.Struct("<4sHHHIIiQ")
+
+SUFFIX = ".vsla"
+
+
+def frame_bytes(size: Tuple[int, int]) -> int:
+    width, height = size
+    return ((width + 7) // 8) * height
+
+
+def is_archive(path: Union[str, Path]) -> bool:
+    try:
+        with open(path, "rb") as fp:
+            return fp.read(len(_MAGIC)) == _MAGIC
+    except OSError:
+        return False
+
+
+class ArchiveWriter:
+    def __init__(self, path: Union[str, Path], size: Tuple[int, int], source_frames: int):
+        self.path = Path(path)
+        self.size = size
+        self.frame_bytes = frame_bytes(size)
+        self.source_frames = source_frames
+        self._frames = array("i")
+        self._tmp = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        self._fp: Optional[BinaryIO] = open(self._tmp, "wb")
+        self._fp.write(b"\0" * _HEADER.size)
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    def append(self, frame: int, buf: bytes) -> None:
+        assert self._fp is not None
+        if len(buf) != self.frame_bytes:
+            raise ValueError(f"expected a {self.frame_bytes} byte buffer, got {len(buf)}")
+        self._fp.write(buf)
+        self._frames.append(frame)
+
+    def close(self) -> None:
+        if self._fp is None:
+            return
+
+        fp, self._fp = self._fp, None
+        table_offset = fp.tell()
+        fp.write(self._frames.tobytes())
+        fp.seek(0)
+        fp.write(
+            _HEADER.pack(
+                _MAGIC,
+                _VERSION,
+                self.size[0],
+                self.size[1],
+                len(self._frames),
+                self.frame_bytes,
+                self.source_frames,
+                table_offset,
+            )
+        )
+        fp.flush()
+        os.fsync(fp.fileno())
+        fp.close()
+        os.replace(self._tmp, self.path)
+
+    def abort(self) -> None:
+        if self._fp is not None:
+            self._fp.close()
+            self._fp = None
+            self._tmp.unlink()
+
+    def __enter__(self) -> "ArchiveWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class Archive:
+    """A read-only, memory-mapped view of a baked frame archive."""
+
+    def __init__(self, path: Union[str, Path]):
+        with open(path, "rb") as fp:
+            self._mm = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (
+            magic,
+            version,
+            width,
+            height,
+            count,
+            self.frame_bytes,
+            self.frames,
+            table_offset,
+        ) = _HEADER.unpack_from(self._mm)
+
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f"{path} is not a frame archive")
+
+        self.size = (width, height)
+        self._data = memoryview(self._mm)
+        self._numbers = self._data[table_offset : table_offset + count * 4].cast("i")
+
+    def __len__(self) -> int:
+        return len(self._numbers)
+
+    def frame_number(self, x: int) -> int:
+        return self._numbers[x]
+
+    def position_after(self, frame: int) -> int:
+        """The position of the first baked frame numbered after frame."""
+        return bisect.bisect_right(self._numbers, frame)
+
+    def buffer(self, x: int) -> memoryview:
+        offset = _HEADER.size + x * self.frame_bytes
+        return self._data[offset : offset + self.frame_bytes]
+
+    def close(self) -> None:
+        # the views export the map's buffer, which cannot be closed while they hold it
+        self._numbers.release()
+        self._data.release()
+        try:
+            self._mm.close()
+        except BufferError:
+            # a frame buffer is still out, and the map is closed once that is collected
+            pass
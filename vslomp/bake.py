@@ -0,0 +1,133 @@
+import concurrent.futures as conc
+import threading
+from concurrent.futures.thread import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, List, Optional, Sequence, Tuple
+
+from PIL import Image
+
+import vslomp.display.imager.proc as imager
+import vslomp.display.screen.utils as screen_utils
+import vslomp.video.proc as video
+from vslomp.archive import ArchiveWriter
+from vslomp.display.imager.dither import DEFAULT, DITHERS
+from vslomp.display.screen.pack import pack_image
+
+
+def _wait(h: Any) -> Any:
+    future: "conc.Future[Any]" = conc.Future()
+    h.then(lambda r, t: future.set_result(r)).or_err(lambda ex, t: future.set_exception(ex))
+    return future.result()
+
+
+def bake(
+    video_path: str,
+    output: Path,
+    size: Tuple[int, int],
+    *,
+    vstream_idx: int = 0,
+    skip_frame: str = "NONKEY",
+    start: Optional[int] = None,
+    stop: Optional[int] = None,
+    step: Optional[int] = None,
+    threads: int = 3,
+    lookahead: int = 8,
+    cache_dir: Optional[Path] = None,
+    dither: str = DEFAULT,
+) -> int:
+    """Runs the playback imager pipeline over a video and writes the packed frames to output.
+
+    Returns the number of frames written.
+    """
+    errors: List[Exception] = []
+    window = threading.BoundedSemaphore(lookahead)
+
+    with ThreadPoolExecutor(threads, thread_name_prefix="Bake") as tpe:
+        with video.VideoProcessorFactory(
+            tpe, video.Context(cache_dir)
+        ) as vph, imager.ImagerProcessorFactory(tpe, None) as iph:
+            loadresult = _wait(vph.send(video.Cmd.Load(video_path, vstream_idx, skip_frame)))
+
+            with ArchiveWriter(output, size, loadresult.frames) as writer:
+
+                def _error(ex: Exception, tags: Any):
+                    errors.append(ex)
+                    window.release()
+
+                def _write(img: Image.Image, tags: Any, *, frame: int):
+                    writer.append(frame, pack_image(img, size))
+                    window.release()
+
+                def _convert(img: Image.Image, tags: Any, *, frame: int):
+                    iph.send(imager.Cmd.Dither(img, dither), tags=tags).then(
+                        lambda img, tags: _write(img, tags, frame=frame)
+                    ).or_err(_error)
+
+                def _onimage(img: Image.Image, frame: int, tags: Any):
+                    window.acquire()
+                    if errors:
+                        window.release()
+                        raise errors[0]
+
+                    iph.send(
+                        imager.Cmd.EnsureSize(img, size, resample=Image.ANTIALIAS),
+                        tags=[("frame", frame)],
+                    ).then(lambda img, tags: _convert(img, tags, frame=frame)).or_err(_error)
+
+                _wait(vph.send(video.Cmd.GenerateImages(loadresult, _onimage, start, stop, step)))
+                iph.join()
+
+                if errors:
+                    raise errors[0]
+
+                return len(writer)
+
+
+def _parse_size(value: str) -> Tuple[int, int]:
+    width, _, height = value.lower().partition("x")
+    return (int(width), int(height))
+
+
+def cli(argv: Sequence[str]) -> None:
+    import argparse
+
+    arg_parser = argparse.ArgumentParser(
+        prog="vslomp bake",
+        description="Pre-render a video into a packed frame archive for playback",
+        fromfile_prefix_chars="@",
+    )
+
+    arg_parser.add_argument("video_path", help="the video to bake")
+    arg_parser.add_argument("output", help="where to write the archive (*.vsla)")
+
+    screen_group = arg_parser.add_mutually_exclusive_group(required=True)
+    screen_group.add_argument("-s", "--screen-type", help="the e-paper display to bake for")
+    screen_group.add_argument("-z", "--size", type=_parse_size, help="the screen size, WxH")
+
+    arg_parser.add_argument("--vstream-idx", type=int, default=0)
+    arg_parser.add_argument("--skip-frame", default="NONKEY")
+    arg_parser.add_argument("--start", type=int, default=None)
+    arg_parser.add_argument("--stop", type=int, default=None)
+    arg_parser.add_argument("--step", type=int, default=None)
+    arg_parser.add_argument("-t", "--threads", type=int, default=3)
+    arg_parser.add_argument("-c", "--cache-dir", default=None)
+    arg_parser.add_argument("--dither", choices=list(DITHERS), default=DEFAULT)
+
+    args = arg_parser.parse_args(argv)
+    size = args.size if args.size else screen_utils.get_screen_size(args.screen_type)
+
+    count = bake(
+        args.video_path,
+        Path(args.output),
+        size,
+        vstream_idx=args.vstream_idx,
+        skip_frame=args.skip_frame,
+        start=args.start,
+        stop=args.stop,
+        step=args.step,
+        threads=args.threads,
+        cache_dir=Path(args.cache_dir) if args.cache_dir else None,
+        dither=args.dither,
+    )
+
+    print("BAKED:", count, "frames", f"""{size[0]}x{size[1]}""", "->", args.output)
@@ -0,0 +1,101 @@
+import argparse
+import json
+import tempfile
+from pathlib import Path
+from typing import List, Optional
+
+from vslomp.bench.pipeline import STAGES, BenchResult, run
+from vslomp.bench.synth import make_video
+
+
+def _parse_size(val: str):
+    width, _, height = val.partition("x")
+    return (int(width), int(height))
+
+
+def _report(name: str, res: BenchResult) -> None:
+    print(
+        f"{name}: {res.frames} frames in {res.seconds:.2f}s, {res.fps:.2f} fps, "
+        f"peak RSS {res.peak_rss_kb / 1024:.1f} MiB"
+    )
+    print(f"  {'stage':<16}{'count':>7}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+    for stage in STAGES:
+        count, mean, p50, p95, top = res.stages[stage]
+        print(
+            f"  {stage:<16}{count:>7}{mean * 1000:>10.2f}{p50 * 1000:>10.2f}"
+            f"{p95 * 1000:>10.2f}{top * 1000:>10.2f}"
+        )
+
+
+def cli(argv: Optional[List[str]] = None) -> None:
+    arg_parser = argparse.ArgumentParser(
+        "vslomp.bench", description="time the playback pipeline against an emulated screen"
+    )
+    arg_parser.add_argument(
+        "-v", "--video", help="the video to play (default: a generated synthetic video)"
+    )
+    arg_parser.add_argument("--frames", help="frames in the synthetic video", default=240)
+    arg_parser.add_argument("--video-size", help="size of the synthetic video", default="640x480")
+    arg_parser.add_argument(
+        "-s",
+        "--screen",
+        help="the screen to play to, e.g. emulator:800x480,refresh=4,spi=2e6",
+        default="emulator",
+    )
+    arg_parser.add_argument("-t", "--threads", default=4)
+    arg_parser.add_argument(
+        "--lookahead",
+        help="frames in flight for the throughput run (the latency run always uses 1)",
+        default=4,
+    )
+    arg_parser.add_argument("--skip-frame", default="DEFAULT")
+    arg_parser.add_argument(
+        "--scaled-decode",
+        help="decode on several codec threads, straight to grayscale at the screen size",
+        action="store_true",
+    )
+    arg_parser.add_argument("-c", "--cache-dir", default=None)
+    arg_parser.add_argument("--json", help="also write the results to this file", default=None)
+
+    args = arg_parser.parse_args(argv)
+    cache_dir = Path(args.cache_dir) if args.cache_dir else None
+
+    with tempfile.TemporaryDirectory(prefix="vslomp-bench-") as tmp:
+        if args.video:
+            video_path = Path(args.video)
+        else:
+            video_path = make_video(
+                Path(tmp) / "synthetic.mp4", int(args.frames), _parse_size(args.video_size)
+            )
+
+        results = {}
+        for name, lookahead in (("latency", 1), ("throughput", int(args.lookahead))):
+            res = run(
+                video_path,
+                args.screen,
+                lookahead=lookahead,
+                threads=int(args.threads),
+                skip_frame=args.skip_frame,
+                cache_dir=cache_dir or Path(tmp),
+                scaled_decode=args.scaled_decode,
+            )
+            _report(name, res)
+            results[name] = res
+
+    if args.json:
+        with open(args.json, "w") as fp:
+            json.dump(
+                {
+                    name: dict(
+                        res._asdict(),
+                        stages={stage: s._asdict() for stage, s in res.stages.items()},
+                    )
+                    for name, res in results.items()
+                },
+                fp,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,141 @@
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+import av
+import numpy as np
+from PIL import Image, ImageFilter
+
+import vslomp.display.screen.utils as screen_utils
+from vslomp.bench.synth import make_video
+from vslomp.display.imager.dither import DITHERS, dither_array
+from vslomp.display.imager.proc import ensure_size
+
+# epd7in5_V2's resolution
+DEFAULT_SIZE = (800, 480)
+
+
+class DitherResult(NamedTuple):
+    algorithm: str
+    frames: int
+    mean_ms: float
+    p95_ms: float
+    # PSNR of the dithered frame against the source, both blurred as the eye blurs them at a
+    # distance; higher is closer
+    psnr_db: float
+    # how far the share of white pixels strays from the source's mean brightness
+    tone_error: float
+
+
+def load_frames(video_path: Path, size: Tuple[int, int], count: int) -> List["np.ndarray"]:
+    """Decodes up to count frames of video_path, sized for the screen as playback does."""
+    frames = []
+    with av.open(str(video_path)) as container:
+        for vframe in container.decode(video=0):
+            img = ensure_size(vframe.to_image().convert("L"), size, 0, Image.ANTIALIAS)
+            frames.append(np.asarray(img))
+            if len(frames) >= count:
+                break
+    return frames
+
+
+def _blurred(arr: "np.ndarray", radius: float) -> "np.ndarray":
+    img = Image.fromarray(arr.astype(np.uint8) if arr.dtype != np.uint8 else arr, "L")
+    return np.asarray(img.filter(ImageFilter.GaussianBlur(radius)), dtype=np.float32)
+
+
+def quality(gray: "np.ndarray", bits: "np.ndarray", radius: float = 1.5) -> Tuple[float, float]:
+    """Returns the blurred PSNR, in dB, and the tone error of bits as a dithering of gray."""
+    mse = float(np.mean((_blurred(gray, radius) - _blurred(bits * np.uint8(255), radius)) ** 2))
+    psnr = 10 * np.log10(255**2 / mse) if mse else float("inf")
+    return psnr, abs(float(bits.mean()) - float(gray.mean()) / 255)
+
+
+def run(
+    frames: Sequence["np.ndarray"], algorithms: Sequence[str], repeat: int = 3
+) -> List[DitherResult]:
+    results = []
+    for algorithm in algorithms:
+        # the first call builds any threshold texture or index tables, which are kept after
+        dither_array(frames[0], algorithm)
+
+        samples = []
+        scores = []
+        for gray in frames:
+            for _ in range(repeat):
+                began = time.perf_counter()
+                bits = dither_array(gray, algorithm)
+                samples.append(time.perf_counter() - began)
+            scores.append(quality(gray, bits))
+
+        samples.sort()
+        results.append(
+            DitherResult(
+                algorithm,
+                len(frames),
+                sum(samples) / len(samples) * 1000,
+                samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000,
+                sum(psnr for psnr, _ in scores) / len(scores),
+                sum(tone for _, tone in scores) / len(scores),
+            )
+        )
+    return results
+
+
+def _parse_size(val: str) -> Tuple[int, int]:
+    width, _, height = val.lower().partition("x")
+    return (int(width), int(height))
+
+
+def cli(argv: Optional[List[str]] = None) -> None:
+    arg_parser = argparse.ArgumentParser(
+        "vslomp.bench.dither", description="compare the dithering algorithms' speed and quality"
+    )
+    arg_parser.add_argument(
+        "-v", "--video", help="the video to take frames from (default: a synthetic video)"
+    )
+    arg_parser.add_argument("--frames", help="the number of frames to dither", default=20)
+    screen_group = arg_parser.add_mutually_exclusive_group()
+    screen_group.add_argument("-s", "--screen-type", help="the e-paper display to size for")
+    screen_group.add_argument(
+        "-z", "--size", type=_parse_size, help="the screen size, WxH (default: 800x480)"
+    )
+    arg_parser.add_argument("--repeat", help="times to dither each frame", default=3)
+    arg_parser.add_argument(
+        "-a", "--algorithm", action="append", choices=list(DITHERS), help="(default: all)"
+    )
+    arg_parser.add_argument("--json", help="also write the results to this file", default=None)
+
+    args = arg_parser.parse_args(argv)
+    if args.screen_type:
+        size = screen_utils.get_screen_size(args.screen_type)
+    else:
+        size = args.size or DEFAULT_SIZE
+
+    with tempfile.TemporaryDirectory(prefix="vslomp-bench-") as tmp:
+        if args.video:
+            video_path = Path(args.video)
+        else:
+            video_path = make_video(Path(tmp) / "synthetic.mp4", int(args.frames), size)
+        frames = load_frames(video_path, size, int(args.frames))
+
+    results = run(frames, args.algorithm or list(DITHERS), int(args.repeat))
+
+    print(f"{len(frames)} frames at {size[0]}x{size[1]}")
+    print(f"  {'algorithm':<18}{'mean ms':>10}{'p95 ms':>10}{'PSNR dB':>10}{'tone err':>10}")
+    for res in results:
+        print(
+            f"  {res.algorithm:<18}{res.mean_ms:>10.2f}{res.p95_ms:>10.2f}"
+            f"{res.psnr_db:>10.2f}{res.tone_error:>10.4f}"
+        )
+
+    if args.json:
+        with open(args.json, "w") as fp:
+            json.dump({res.algorithm: res._asdict() for res in results}, fp, indent=2)
+
+
+if __name__ == "__main__":
+    cli()
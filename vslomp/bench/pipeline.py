@@ -0,0 +1,168 @@
+import concurrent.futures as conc
+import resource
+import threading
+import time
+from concurrent.futures.thread import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from PIL import Image
+
+import vslomp.display.imager.proc as imager
+import vslomp.display.screen.proc as screen
+import vslomp.display.screen.utils as screen_utils
+import vslomp.video.proc as video
+from vslomp.display.screen.refresh import RefreshState
+
+STAGES = ("Load", "GenerateImages", "EnsureSize", "Convert", "getbuffer", "Display")
+
+
+class StageStats(NamedTuple):
+    count: int
+    mean: float
+    p50: float
+    p95: float
+    max: float
+
+
+class BenchResult(NamedTuple):
+    frames: int
+    seconds: float
+    fps: float
+    peak_rss_kb: int
+    stages: Dict[str, StageStats]
+
+
+def _stats(samples: List[float]) -> StageStats:
+    ordered = sorted(samples)
+    if not ordered:
+        return StageStats(0, 0.0, 0.0, 0.0, 0.0)
+    return StageStats(
+        len(ordered),
+        sum(ordered) / len(ordered),
+        ordered[len(ordered) // 2],
+        ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        ordered[-1],
+    )
+
+
+def peak_rss_kb() -> int:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class _Recorder:
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {name: [] for name in STAGES}
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, started: float) -> float:
+        now = time.perf_counter()
+        with self._lock:
+            self.samples[stage].append(now - started)
+        return now
+
+
+def _wait(h: Any) -> Any:
+    future: "conc.Future[Any]" = conc.Future()
+    h.then(lambda r, t: future.set_result(r)).or_err(lambda ex, t: future.set_exception(ex))
+    return future.result()
+
+
+def run(
+    video_path: Path,
+    screen_name: str = "emulator",
+    *,
+    lookahead: int = 1,
+    threads: int = 4,
+    skip_frame: str = "DEFAULT",
+    stop: Optional[int] = None,
+    cache_dir: Optional[Path] = None,
+    scaled_decode: bool = False,
+) -> BenchResult:
+    """Plays video_path through the video, imager and screen processors as fast as it can.
+
+    With lookahead 1 each frame goes through every stage alone, so the stage times are pure
+    latencies; a larger lookahead overlaps the stages and measures throughput instead.
+    """
+    epd, size = screen_utils.get_screen(screen_name)
+    recorder = _Recorder()
+    window = threading.BoundedSemaphore(lookahead)
+    errors: List[Exception] = []
+    shown = 0
+
+    with ThreadPoolExecutor(threads, thread_name_prefix="Bench") as tpe:
+        with video.VideoProcessorFactory(
+            tpe, video.Context(cache_dir)
+        ) as vph, imager.ImagerProcessorFactory(tpe, None) as iph, screen.ScreenProcessorFactory(
+            tpe, screen.Context(epd, RefreshState(size))
+        ) as sph:
+            _wait(sph.send(screen.Cmd.INIT))
+
+            began = time.perf_counter()
+            loadresult = _wait(
+                vph.send(video.Cmd.Load(str(video_path), 0, skip_frame, threads=scaled_decode))
+            )
+            decoded = recorder.add("Load", began)
+
+            def _error(ex: Exception, tags: Any):
+                errors.append(ex)
+                window.release()
+
+            def _displayed(res: None, tags: Any, *, started: float):
+                nonlocal shown
+                recorder.add("Display", started)
+                shown += 1
+                window.release()
+
+            def _converted(img: Image.Image, tags: Any, *, started: float):
+                started = recorder.add("Convert", started)
+                buf = epd.getbuffer(img)
+                started = recorder.add("getbuffer", started)
+                sph.send(screen.Cmd.DisplayBuffer(buf), tags=tags).then(
+                    lambda r, t: _displayed(r, t, started=started)
+                ).or_err(_error)
+
+            def _sized(img: Image.Image, tags: Any, *, started: float):
+                started = recorder.add("EnsureSize", started)
+                iph.send(imager.Cmd.Convert(img, "1", Image.FLOYDSTEINBERG), tags=tags).then(
+                    lambda img, t: _converted(img, t, started=started)
+                ).or_err(_error)
+
+            def _onimage(img: Image.Image, frame: int, tags: Any):
+                nonlocal decoded
+                started = decoded = recorder.add("GenerateImages", decoded)
+                iph.send(
+                    imager.Cmd.EnsureSize(img, size, resample=Image.ANTIALIAS), tags=tags
+                ).then(lambda img, t: _sized(img, t, started=started)).or_err(_error)
+
+                window.acquire()
+                if errors:
+                    raise errors[0]
+                decoded = time.perf_counter()
+
+            window.acquire()
+            _wait(
+                vph.send(
+                    video.Cmd.GenerateImages(
+                        loadresult, _onimage, stop=stop, size=size if scaled_decode else None
+                    )
+                )
+            )
+            # the slot taken for the frame after the last one is never filled
+            for _ in range(lookahead - 1):
+                window.acquire()
+            seconds = time.perf_counter() - began
+
+            vph.send(video.Cmd.Unload(loadresult))
+            sph.send(screen.Cmd.UNINIT)
+
+    if errors:
+        raise errors[0]
+
+    return BenchResult(
+        shown,
+        seconds,
+        shown / seconds if seconds else 0.0,
+        peak_rss_kb(),
+        {name: _stats(samples) for name, samples in recorder.samples.items()},
+    )
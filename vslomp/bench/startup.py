@@ -0,0 +1,137 @@
+import argparse
+import json
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures.thread import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, NamedTuple, Optional, Sequence
+
+from PIL import Image
+
+import vslomp.display.proc as disp
+from vslomp.bench.pipeline import _wait
+from vslomp.session import PlaybackSession
+
+
+class StartupResult(NamedTuple):
+    name: str
+    seconds: float
+
+
+def import_seconds(module: str = "vslomp.__main__") -> float:
+    """Times importing module in a fresh interpreter."""
+    out = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            f"import time; t = time.perf_counter(); import {module}; "
+            "print(time.perf_counter() - t)",
+        ],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    return float(out.stdout.split()[-1])
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def serve_seconds(
+    screen: str, cache_dir: Path, args: Sequence[str] = (), timeout: float = 120.0
+) -> float:
+    """Starts the server, times how long it takes to accept a connection, then stops it."""
+    port = _free_port()
+    began = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "vslomp", screen, "-i", "127.0.0.1", "-p", str(port)]
+        + ["-c", str(cache_dir), *args],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        while True:
+            if proc.poll() is not None:
+                raise RuntimeError(f"the server exited with {proc.returncode}")
+            try:
+                with socket.create_connection(("127.0.0.1", port), timeout=0.1):
+                    seconds = time.perf_counter() - began
+                    break
+            except OSError:
+                if time.perf_counter() - began > timeout:
+                    raise TimeoutError(f"the server did not start in {timeout}s")
+                time.sleep(0.01)
+    finally:
+        # a clean shutdown is what saves the screen state for the next start
+        proc.send_signal(signal.SIGINT)
+        proc.wait(timeout)
+
+    return seconds
+
+
+def first_frame_seconds(screen: str, cache_dir: Path, fast_start: bool) -> float:
+    """Times bringing a screen up as the server does and showing a first picture on it."""
+    picture = cache_dir / "first-frame.png"
+    Image.linear_gradient("L").save(picture)
+
+    with ThreadPoolExecutor(4, thread_name_prefix="Bench") as tpe:
+        with disp.create(screen, tpe, cache_dir=cache_dir) as dph:
+            began = time.perf_counter()
+            dph.send(disp.Cmd.INIT_SCREEN, pri=10)
+            dph.send(disp.Cmd.CLEAR_IF_UNKNOWN if fast_start else disp.Cmd.CLEAR, pri=45)
+            dph.send(disp.Cmd.Splashscreen(picture))
+            # waits for the imager and then the screen to run dry
+            _wait(dph.send(disp.Cmd.Finish(PlaybackSession())))
+            seconds = time.perf_counter() - began
+
+            dph.send(disp.Cmd.SLEEP)
+            dph.join()
+
+    return seconds
+
+
+def run(screen: str, cache_dir: Path) -> List[StartupResult]:
+    # each run's clean shutdown saves the screen state that the next --fast-start finds
+    return [
+        StartupResult("import", import_seconds()),
+        StartupResult("serve", serve_seconds(screen, cache_dir)),
+        StartupResult("serve --fast-start", serve_seconds(screen, cache_dir, ["--fast-start"])),
+        StartupResult("first frame", first_frame_seconds(screen, cache_dir, False)),
+        StartupResult("first frame --fast-start", first_frame_seconds(screen, cache_dir, True)),
+    ]
+
+
+def cli(argv: Optional[List[str]] = None) -> None:
+    arg_parser = argparse.ArgumentParser(
+        "vslomp.bench.startup", description="time how long the server takes to start serving"
+    )
+    arg_parser.add_argument(
+        "-s",
+        "--screen",
+        help="the screen to start with; give the emulator a refresh time like a real panel's",
+        default="emulator:800x480,refresh=3",
+    )
+    arg_parser.add_argument("--json", help="also write the results to this file", default=None)
+
+    args = arg_parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="vslomp-bench-") as tmp:
+        results = run(args.screen, Path(tmp))
+
+    for res in results:
+        print(f"{res.name:<28}{res.seconds:>8.3f}s")
+
+    if args.json:
+        with open(args.json, "w") as fp:
+            json.dump({res.name: res.seconds for res in results}, fp, indent=2)
+
+
+if __name__ == "__main__":
+    cli()
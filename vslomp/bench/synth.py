@@ -0,0 +1,50 @@
+from pathlib import Path
+from typing import Optional, Tuple, Union
+
+import av
+import numpy as np
+
+
+def make_video(
+    path: Union[str, Path],
+    frames: int = 240,
+    size: Tuple[int, int] = (640, 480),
+    rate: int = 24,
+    gop: int = 12,
+    codec: Optional[str] = None,
+) -> Path:
+    """Encodes a synthetic test video of a gradient, a moving bar and some noise.
+
+    Every frame differs from the last so no refresh can be skipped. codec defaults to libx264
+    where PyAV has it, and mpeg4 otherwise.
+    """
+    path = Path(path)
+    width, height = size
+    if codec is None:
+        codec = "libx264" if "libx264" in av.codecs_available else "mpeg4"
+
+    rng = np.random.default_rng(0)
+    gradient = np.linspace(0, 255, width, dtype=np.uint8)[np.newaxis, :].repeat(height, axis=0)
+
+    with av.open(str(path), "w") as container:
+        stream = container.add_stream(codec, rate=rate)
+        stream.width = width
+        stream.height = height
+        stream.pix_fmt = "yuv420p"
+        stream.options = {"g": str(gop)}
+
+        bar = max(1, width // 16)
+        for x in range(frames):
+            luma = gradient.copy()
+            left = (x * 4) % width
+            luma[:, left : left + bar] = 255 - luma[:, left : left + bar]
+            luma[: height // 4] = rng.integers(0, 256, (height // 4, width), dtype=np.uint8)
+
+            rgb = np.repeat(luma[:, :, np.newaxis], 3, axis=2)
+            for packet in stream.encode(av.VideoFrame.from_ndarray(rgb, format="rgb24")):
+                container.mux(packet)
+
+        for packet in stream.encode():
+            container.mux(packet)
+
+    return path
@@ -0,0 +1,41 @@
+import hashlib
+import os
+from pathlib import Path
+from typing import Any, Optional, Union
+
+PathLike = Union[str, Path]
+
+
+def default_cache_dir() -> Path:
+    env_dir = os.environ.get("VSLOMP_CACHE_DIR")
+    if env_dir:
+        return Path(env_dir)
+
+    xdg_dir = os.environ.get("XDG_CACHE_HOME")
+    base = Path(xdg_dir) if xdg_dir else Path.home() / ".cache"
+    return base / "vslomp"
+
+
+def file_key(resource: PathLike, *extra: Any) -> str:
+    """A stable key for a file's current contents, built from its path, size, and mtime."""
+    path = Path(resource).resolve()
+    st = path.stat()
+    raw = ":".join(str(p) for p in (path, st.st_size, st.st_mtime_ns, *extra))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def cache_path(cache_dir: Optional[PathLike], kind: str, key: str, suffix: str) -> Path:
+    base = Path(cache_dir) if cache_dir else default_cache_dir()
+    return base / kind / f"{key}{suffix}"
+
+
+def atomic_write(path: PathLike, data: bytes) -> None:
+    """Writes data to a temp file next to path, then renames it into place."""
+    target = Path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as fp:
+        fp.write(data)
+        fp.flush()
+        os.fsync(fp.fileno())
+    os.replace(tmp, target)
@@ -0,0 +1,72 @@
+import json
+import threading
+import time
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+from qcmd.core import logevent
+
+import vslomp.cache as cache
+
+
+class Checkpoint(NamedTuple):
+    frame: int
+    pts: Optional[int] = None
+
+
+class Checkpointer:
+    """Keeps the last displayed position of one video in a small file under the cache dir.
+
+    A position is written at most once every interval seconds; flush writes the last one that
+    was held back.
+    """
+
+    def __init__(self, path: Path, interval: float = 1.0):
+        self.path = path
+        self.interval = interval
+        self._pending: Optional[Checkpoint] = None
+        self._written: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_video(
+        cls, resource: str, cache_dir: Optional[Path] = None
+    ) -> Optional["Checkpointer"]:
+        """Returns the checkpointer for resource, or None when it is not a local file."""
+        try:
+            key = cache.file_key(resource)
+        except OSError:
+            return None
+        return cls(cache.cache_path(cache_dir, "checkpoint", key, ".json"))
+
+    def load(self) -> Optional[Checkpoint]:
+        try:
+            data = json.loads(self.path.read_text())
+            return Checkpoint(int(data["frame"]), data.get("pts"))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError) as ex:
+            logevent("CHKPT", f"discarding unreadable checkpoint {self.path}", ex)
+            return None
+
+    def save(self, checkpoint: Checkpoint) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if self._written is not None and now - self._written < self.interval:
+                self._pending = checkpoint
+                return
+            self._written = now
+            self._pending = None
+            self._write(checkpoint)
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._pending:
+                self._write(self._pending)
+                self._pending = None
+
+    def _write(self, checkpoint: Checkpoint) -> None:
+        try:
+            cache.atomic_write(self.path, json.dumps(checkpoint._asdict()).encode("utf-8"))
+        except OSError as ex:
+            logevent("CHKPT", f"could not write checkpoint {self.path}", ex)
@@ -0,0 +1,157 @@
+import heapq
+import itertools
+import math
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+
+from qcmd.core import logevent
+
+
+class Job:
+    __slots__ = ("deadline", "fn", "cancelled")
+
+    def __init__(self, deadline: float, fn: Callable[[], None]):
+        self.deadline = deadline
+        self.fn = fn
+        self.cancelled = False
+
+
+class Scheduler:
+    """Runs callbacks at time.monotonic() deadlines, in deadline order, on one thread.
+
+    The thread is started with the first job and serves every playback after that, so no
+    thread is made per frame. Callbacks should hand work off rather than block it.
+    """
+
+    def __init__(self, name: str = "DisplayClock"):
+        self.name = name
+        self._heap: List[Tuple[float, int, Job]] = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def at(self, deadline: float, fn: Callable[[], None]) -> Job:
+        job = Job(deadline, fn)
+        with self._cond:
+            heapq.heappush(self._heap, (deadline, next(self._seq), job))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return job
+
+    def cancel(self, job: Job) -> None:
+        # left in the heap, and dropped when it comes up
+        job.cancelled = True
+
+    def _next(self) -> Job:
+        with self._cond:
+            while True:
+                while self._heap and self._heap[0][2].cancelled:
+                    heapq.heappop(self._heap)
+
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+
+                remaining = self._heap[0][0] - time.monotonic()
+                if remaining <= 0:
+                    return heapq.heappop(self._heap)[2]
+                self._cond.wait(remaining)
+
+    def _run(self) -> None:
+        while True:
+            job = self._next()
+            if job.cancelled:
+                continue
+            try:
+                job.fn()
+            except Exception as ex:
+                logevent("CLOCK", "scheduled callback failed", ex)
+
+
+SCHEDULER = Scheduler()
+
+
+class FrameClock:
+    """Puts one playback's frames on a fixed grid of deadlines, period seconds apart.
+
+    The grid starts at the first frame, so how long the screen takes to refresh does not add
+    up over a long video. A frame that is late goes out at the next grid deadline that has not
+    passed yet. Pausing holds the next frame back, and resuming shifts the whole grid by the
+    time spent paused.
+    """
+
+    def __init__(self, period: float, scheduler: Scheduler = SCHEDULER):
+        self.period = period
+        self.scheduler = scheduler
+        self.origin: Optional[float] = None
+        self.slot = 0
+        self.deadline: Optional[float] = None
+        self._fn: Optional[Callable[[], None]] = None
+        self._job: Optional[Job] = None
+        self._paused_at: Optional[float] = None
+        self._cancelled = False
+        self._lock = threading.Lock()
+
+    @property
+    def paused(self) -> bool:
+        return self._paused_at is not None
+
+    def schedule(self, fn: Callable[[], None]) -> float:
+        """Runs fn at the next frame's deadline, and returns the deadline."""
+        with self._lock:
+            now = time.monotonic()
+            if self.origin is None:
+                self.origin = now
+                self.slot = 0
+            else:
+                self.slot += 1
+                if self.period > 0 and self.origin + self.slot * self.period < now:
+                    self.slot = math.ceil((now - self.origin) / self.period)
+
+            self.deadline = self.origin + self.slot * self.period
+            self._fn = fn
+            if not self._cancelled and self._paused_at is None:
+                self._job = self.scheduler.at(self.deadline, self._fire)
+            return self.deadline
+
+    def _fire(self) -> None:
+        with self._lock:
+            fn, self._fn, self._job = self._fn, None, None
+        if fn:
+            fn()
+
+    def pause(self) -> None:
+        with self._lock:
+            if self._paused_at is not None:
+                return
+            self._paused_at = time.monotonic()
+            if self._job:
+                self.scheduler.cancel(self._job)
+                self._job = None
+
+    def resume(self) -> Optional[float]:
+        """Resumes the grid where it was paused, and returns the next frame's new deadline."""
+        with self._lock:
+            if self._paused_at is None:
+                return self.deadline
+
+            shift = time.monotonic() - self._paused_at
+            self._paused_at = None
+            if self.origin is not None:
+                self.origin += shift
+            if self.deadline is not None:
+                self.deadline += shift
+            if self._fn and not self._cancelled and self.deadline is not None:
+                self._job = self.scheduler.at(self.deadline, self._fire)
+            return self.deadline
+
+    def cancel(self) -> None:
+        with self._lock:
+            self._cancelled = True
+            self._fn = None
+            if self._job:
+                self.scheduler.cancel(self._job)
+                self._job = None
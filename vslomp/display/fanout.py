@@ -0,0 +1,111 @@
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from PIL import Image
+
+import vslomp.display.imager.dither as dithering
+import vslomp.display.proc as disp
+from vslomp.display.screen.utils import ScreenBuffer
+from vslomp.session import PlaybackSession
+
+
+def countdown(count: int, fn: Optional[Callable[[], None]]) -> Optional[Callable[[], None]]:
+    """Returns a callback that calls fn on its count-th call."""
+    if fn is None or count <= 1:
+        return fn
+
+    lock = threading.Lock()
+    remaining = [count]
+
+    def _call():
+        with lock:
+            remaining[0] -= 1
+            if remaining[0] != 0:
+                return
+        fn()
+
+    return _call
+
+
+class FrameGather:
+    """Calls ondisplay for a frame once every one of count screens has shown it."""
+
+    def __init__(self, count: int, ondisplay: Callable[[int], None]):
+        self.count = count
+        self.ondisplay = ondisplay
+        self._shown: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, frame: int) -> None:
+        with self._lock:
+            shown = self._shown.get(frame, 0) + 1
+            if shown < self.count:
+                self._shown[frame] = shown
+                return
+            self._shown.pop(frame, None)
+        self.ondisplay(frame)
+
+
+class Fanout:
+    """Plays one stream of decoded frames on several displays.
+
+    Displays are grouped by screen size. Each frame is sized, dithered and packed once per
+    group, by the group's first display, and the packed buffer is shown on every display in
+    the group.
+    """
+
+    def __init__(
+        self, displays: Sequence[disp.DisplayProcessor], sizes: Sequence[Tuple[int, int]]
+    ):
+        self.displays = displays
+        self.sizes = sizes
+        groups: Dict[Tuple[int, int], List[int]] = {}
+        for x, size in enumerate(sizes):
+            groups.setdefault(size, []).append(x)
+        self.groups = list(groups.values())
+
+    def send_image(
+        self,
+        sessions: Sequence[PlaybackSession],
+        img: Image.Image,
+        frame: int,
+        ondone: Optional[Callable[[], None]],
+        onready: Optional[Callable[[], None]],
+        onerror: Callable[[Exception], None],
+        dither: str = dithering.DEFAULT,
+        fused: bool = True,
+    ) -> None:
+        # ondone runs once per display and onready once per group; callers count them down
+        for x, members in enumerate(self.groups):
+            # EnsureSize resizes in place, so every group but the last gets its own copy
+            group_img = img if fused or x == len(self.groups) - 1 else img.copy()
+
+            def _rendered(buf: bytes, members: List[int] = members):
+                if onready:
+                    onready()
+                self.send_buffer(sessions, buf, frame, ondone, onerror, members)
+
+            def _failed(ex: Exception, members: List[int] = members):
+                for _ in members:
+                    if ondone:
+                        ondone()
+                onerror(ex)
+
+            self.displays[members[0]].send(
+                disp.Cmd.Render(group_img, frame, _rendered, _failed, dither, fused),
+                tags=[("frame", frame)],
+            ).or_err(lambda ex, t, _failed=_failed: _failed(ex))
+
+    def send_buffer(
+        self,
+        sessions: Sequence[PlaybackSession],
+        buf: ScreenBuffer,
+        frame: int,
+        ondone: Optional[Callable[[], None]],
+        onerror: Callable[[Exception], None],
+        members: Optional[Sequence[int]] = None,
+    ) -> None:
+        for x in members if members is not None else range(len(self.displays)):
+            self.displays[x].send(
+                disp.Cmd.DisplayBuffer(sessions[x], buf, frame, ondone), tags=[("frame", frame)]
+            ).or_err(lambda ex, t: onerror(ex))
@@ -0,0 +1,195 @@
+import functools
+from typing import TYPE_CHECKING, Callable, Dict, List, Tuple, Union
+
+from PIL import Image
+
+from vslomp.lazy import lazy_import
+
+if TYPE_CHECKING:
+    import numpy as np
+else:
+    np = lazy_import("numpy")
+
+FLOYD_STEINBERG = "floyd-steinberg"
+ATKINSON = "atkinson"
+BAYER = "bayer"
+BLUE_NOISE = "blue-noise"
+
+DEFAULT = FLOYD_STEINBERG
+
+
+def _gray(img: Union[Image.Image, "np.ndarray"]) -> "np.ndarray":
+    if isinstance(img, Image.Image):
+        if img.mode != "L":
+            img = img.convert("L")
+        return np.asarray(img)
+    return img
+
+
+def _tile(img: "np.ndarray", thresholds: "np.ndarray") -> "np.ndarray":
+    height, width = img.shape
+    th, tw = thresholds.shape
+    reps = (-(-height // th), -(-width // tw))
+    return np.tile(thresholds, reps)[:height, :width]
+
+
+@functools.lru_cache(maxsize=None)
+def bayer_matrix(order: int = 3) -> "np.ndarray":
+    """Returns the 2**order square Bayer index matrix as uint8 thresholds in (0, 255)."""
+    m = np.zeros((1, 1), dtype=np.int32)
+    for _ in range(order):
+        m = np.block([[4 * m, 4 * m + 2], [4 * m + 3, 4 * m + 1]])
+    return ((m * 2 + 1) * 128 // m.size).astype(np.uint8)
+
+
+@functools.lru_cache(maxsize=None)
+def blue_noise_matrix(size: int = 64, sigma: float = 1.5, seed: int = 0) -> "np.ndarray":
+    """Returns a size square blue-noise threshold texture as uint8 thresholds in (0, 255], made
+    once by void-and-cluster on a torus."""
+    rng = np.random.default_rng(seed)
+    count = size * size
+
+    d = np.minimum(np.arange(size), size - np.arange(size))
+    kernel = np.exp(-(d[:, np.newaxis] ** 2 + d[np.newaxis, :] ** 2) / (2 * sigma**2))
+
+    def _at(idx: int) -> "np.ndarray":
+        return np.roll(kernel, divmod(idx, size), axis=(0, 1)).ravel()
+
+    def _tightest(pattern: "np.ndarray", energy: "np.ndarray") -> int:
+        return int(np.argmax(np.where(pattern, energy, -np.inf)))
+
+    def _void(pattern: "np.ndarray", energy: "np.ndarray") -> int:
+        return int(np.argmin(np.where(pattern, np.inf, energy)))
+
+    pattern = np.zeros(count, dtype=bool)
+    pattern[rng.choice(count, count // 10, replace=False)] = True
+    energy = np.real(
+        np.fft.ifft2(np.fft.fft2(pattern.reshape(size, size)) * np.fft.fft2(kernel))
+    ).ravel()
+
+    # spreads the initial points out until the tightest cluster is also the largest void
+    while True:
+        tight = _tightest(pattern, energy)
+        pattern[tight] = False
+        energy -= _at(tight)
+        void = _void(pattern, energy)
+        pattern[void] = True
+        energy += _at(void)
+        if void == tight:
+            break
+
+    rank = np.zeros(count, dtype=np.int32)
+    ones = int(pattern.sum())
+
+    p, e = pattern.copy(), energy.copy()
+    for r in range(ones - 1, -1, -1):
+        tight = _tightest(p, e)
+        p[tight] = False
+        e -= _at(tight)
+        rank[tight] = r
+
+    p, e = pattern.copy(), energy.copy()
+    for r in range(ones, count):
+        void = _void(p, e)
+        p[void] = True
+        e += _at(void)
+        rank[void] = r
+
+    # with more ranks than gray levels the lowest would round to 0, which lets black through
+    thresholds = np.maximum((rank * 2 + 1) * 128 // count, 1)
+    return thresholds.astype(np.uint8).reshape(size, size)
+
+
+def ordered(img: Union[Image.Image, "np.ndarray"], thresholds: "np.ndarray") -> "np.ndarray":
+    """Dithers a grayscale image or uint8 array against a tiled threshold matrix, and returns a
+    2D bool array (True for white)."""
+    gray = _gray(img)
+    return gray >= _tile(gray, thresholds)
+
+
+def bayer(img: Union[Image.Image, "np.ndarray"]) -> "np.ndarray":
+    return ordered(img, bayer_matrix())
+
+
+def blue_noise(img: Union[Image.Image, "np.ndarray"]) -> "np.ndarray":
+    return ordered(img, blue_noise_matrix())
+
+
+def floyd_steinberg(img: Union[Image.Image, "np.ndarray"]) -> "np.ndarray":
+    # PIL's own error diffusion, so frames look as they always have
+    if isinstance(img, Image.Image):
+        return np.asarray(img.convert("1", dither=Image.FLOYDSTEINBERG))
+    return np.asarray(Image.fromarray(img, "L").convert("1", dither=Image.FLOYDSTEINBERG))
+
+
+# the neighbours, right and below, that each pixel's error is spread to, an eighth each
+_ATKINSON = ((0, 1), (0, 2), (1, -1), (1, 0), (1, 1), (2, 0))
+
+
+@functools.lru_cache(maxsize=8)
+def _wavefronts(height: int, width: int) -> List[Tuple["np.ndarray", "np.ndarray"]]:
+    """Returns, for each line x + 2y = t in turn, its pixels' flat indices in the image and in
+    the error buffer that atkinson() pads the image into."""
+    ys, xs = np.mgrid[0:height, 0:width]
+    lines = (xs + 2 * ys).ravel()
+    order = np.argsort(lines, kind="stable")
+    flat = order.astype(np.intp)
+    padded = (ys.ravel() * (width + 3) + xs.ravel() + 1)[order].astype(np.intp)
+    ends = np.cumsum(np.bincount(lines))
+    return [(flat[a:b], padded[a:b]) for a, b in zip(np.concatenate(([0], ends[:-1])), ends)]
+
+
+def atkinson(img: Union[Image.Image, "np.ndarray"]) -> "np.ndarray":
+    """Atkinson error diffusion, which spreads only 3/4 of each pixel's error and so keeps
+    highlights and shadows clean.
+
+    Every pixel on a line x + 2y = t only takes error from lines before t, so each line is
+    quantized in one vectorized step instead of one pixel at a time.
+    """
+    gray = _gray(img)
+    height, width = gray.shape
+    stride = width + 3
+    # padded so the error spread past the edges lands somewhere and is dropped
+    buf = np.zeros((height + 2, stride), dtype=np.float32)
+    buf[:height, 1 : width + 1] = gray
+    flat_buf = buf.ravel()
+    out = np.zeros(height * width, dtype=bool)
+    offsets = [dy * stride + dx for dy, dx in _ATKINSON]
+
+    for pixels, cells in _wavefronts(height, width):
+        old = flat_buf[cells]
+        white = old >= 128
+        out[pixels] = white
+        err = (old - white * np.float32(255)) * np.float32(1 / 8)
+        for offset in offsets:
+            flat_buf[cells + offset] += err
+
+    return out.reshape(height, width)
+
+
+DITHERS: Dict[str, Callable[[Union[Image.Image, "np.ndarray"]], "np.ndarray"]] = {
+    FLOYD_STEINBERG: floyd_steinberg,
+    ATKINSON: atkinson,
+    BAYER: bayer,
+    BLUE_NOISE: blue_noise,
+}
+
+
+def check(algorithm: str) -> str:
+    """Returns algorithm, or DEFAULT if it is empty, and raises ValueError if it is unknown."""
+    algorithm = algorithm or DEFAULT
+    if algorithm not in DITHERS:
+        raise ValueError(f"unknown dither {algorithm!r}, expected one of {', '.join(DITHERS)}")
+    return algorithm
+
+
+def dither_array(img: Union[Image.Image, "np.ndarray"], algorithm: str = DEFAULT) -> "np.ndarray":
+    """Dithers a grayscale image or uint8 array to a 2D bool array (True for white)."""
+    return DITHERS[check(algorithm)](img)
+
+
+def dither(img: Image.Image, algorithm: str = DEFAULT) -> Image.Image:
+    """Dithers img to a mode "1" image."""
+    if check(algorithm) == FLOYD_STEINBERG:
+        return img.convert("1", dither=Image.FLOYDSTEINBERG)
+    return Image.fromarray(dither_array(img, algorithm))
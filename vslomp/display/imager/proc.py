@@ -6,14 +6,20 @@ from typing import BinaryIO, Optional, Tuple, Union
 import qcmd.processors.executor as q
 from PIL import Image
 
+import vslomp.metrics as metrics
+from vslomp.display.imager.dither import DEFAULT, dither
+from vslomp.display.imager.render import FrameRenderer
+
 
 class CommandId(enum.Enum):
     LOAD_FILE = enum.auto()
     CONVERT = enum.auto()
     ENSURE_SIZE = enum.auto()
+    DITHER = enum.auto()
+    RENDER = enum.auto()
 
 
-class ImagerProcessorFactory(q.ProcessorFactory[CommandId, None]):
+class ImagerProcessorFactory(metrics.ProcessorFactory[CommandId, None]):
     procname = "Imager"
 
 
@@ -23,15 +29,38 @@ ImagerCommandHandle = q.CommandHandle[CommandId, Image.Image]
 _ImagerCommand = q.Command[CommandId, None, Image.Image]
 
 
+def ensure_size(
+    in_img: Image.Image, size: Tuple[int, int], fill: int = 0, resample: int = Image.ANTIALIAS
+) -> Image.Image:
+    in_img.thumbnail(size, resample=resample)
+
+    in_width, in_height = in_img.size
+    out_width, out_height = size
+
+    if in_width < out_width or in_height < out_height:
+        out_img = Image.new(in_img.mode, size, 0)  # type:ignore
+        place_w = (out_width - in_width) // 2
+        place_h = (out_height - in_height) // 2
+        out_img.paste(in_img, (max(0, place_w), max(0, place_h)))
+        return out_img
+    else:
+        return in_img
+
+
 class Cmd:
     @dataclasses.dataclass
     class LoadFile(_ImagerCommand):
         cmdid = CommandId.LOAD_FILE
 
         fp: Union[str, pathlib.Path, BinaryIO]
+        # decodes a JPEG in grayscale, DCT-scaled down to no smaller than this
+        draft: Optional[Tuple[int, int]] = None
 
         def exec(self, hcmd: ImagerCommandHandle, cxt: None) -> Image.Image:
-            return Image.open(self.fp)
+            img = Image.open(self.fp)
+            if self.draft:
+                img.draft("L", self.draft)
+            return img
 
     @dataclasses.dataclass
     class Convert(_ImagerCommand):
@@ -44,6 +73,17 @@ class Cmd:
         def exec(self, hcmd: ImagerCommandHandle, cxt: None) -> Image.Image:
             return self.img.convert(mode=self.mode, dither=self.dither)  # type:ignore
 
+    # dithers img to a mode "1" image with one of dither.DITHERS
+    @dataclasses.dataclass
+    class Dither(_ImagerCommand):
+        cmdid = CommandId.DITHER
+
+        img: Image.Image
+        algorithm: str = DEFAULT
+
+        def exec(self, hcmd: ImagerCommandHandle, cxt: None) -> Image.Image:
+            return dither(self.img, self.algorithm)
+
     @dataclasses.dataclass
     class EnsureSize(_ImagerCommand):
         cmdid = CommandId.ENSURE_SIZE
@@ -54,17 +94,16 @@ class Cmd:
         resample: int = Image.ANTIALIAS
 
         def exec(self, hcmd: ImagerCommandHandle, cxt: None) -> Image.Image:
-            in_img = self.img
-            in_img.thumbnail(self.size, resample=self.resample)
-
-            in_width, in_height = in_img.size
-            out_width, out_height = self.size
-
-            if in_width < out_width or in_height < out_height:
-                out_img = Image.new(in_img.mode, self.size, 0)  # type:ignore
-                place_w = (out_width - in_width) // 2
-                place_h = (out_height - in_height) // 2
-                out_img.paste(in_img, (max(0, place_w), max(0, place_h)))
-                return out_img
-            else:
-                return in_img
+            return ensure_size(self.img, self.size, self.fill, self.resample)
+
+    # EnsureSize, Dither and packing in one step, into one of renderer's pooled buffers
+    @dataclasses.dataclass
+    class Render(q.Command[CommandId, None, bytearray]):
+        cmdid = CommandId.RENDER
+
+        img: Image.Image
+        renderer: FrameRenderer
+        dither: str = DEFAULT
+
+        def exec(self, hcmd: q.CommandHandle[CommandId, bytearray], cxt: None) -> bytearray:
+            return self.renderer.render(self.img, self.dither)
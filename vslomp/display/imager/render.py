@@ -0,0 +1,79 @@
+import threading
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+from PIL import Image
+
+from vslomp.display.imager.dither import DEFAULT, FLOYD_STEINBERG, check, dither_array
+from vslomp.lazy import lazy_import
+from vslomp.video.proc import fit_size
+
+if TYPE_CHECKING:
+    import numpy as np
+else:
+    np = lazy_import("numpy")
+
+
+class BufferPool:
+    """Hands out packed frame buffers of nbytes, and keeps up to keep of those given back for
+    reuse. A buffer that is never given back is simply garbage collected."""
+
+    def __init__(self, nbytes: int, keep: int = 8):
+        self.nbytes = nbytes
+        self.keep = keep
+        self._free: List[bytearray] = []
+        self._lock = threading.Lock()
+
+    def acquire(self) -> bytearray:
+        with self._lock:
+            if self._free:
+                return self._free.pop()
+        return bytearray(self.nbytes)
+
+    def release(self, buf: bytearray) -> None:
+        with self._lock:
+            if len(self._free) < self.keep:
+                self._free.append(buf)
+
+
+class FrameRenderer:
+    """Sizes, letterboxes, dithers and packs a frame for a screen of size in one step.
+
+    The frame is made grayscale before it is resized, and goes through one letterbox canvas
+    that is kept between frames, into a packed buffer from pool. It is not thread-safe; each
+    imager has its own.
+    """
+
+    def __init__(self, size: Tuple[int, int], keep: int = 8):
+        self.size = size
+        width, height = size
+        self.pool = BufferPool((width + 7) // 8 * height, keep)
+        self._canvas: Optional["np.ndarray"] = None
+
+    def render(self, img: Image.Image, dither: str = DEFAULT) -> bytearray:
+        width, height = self.size
+        # a new image either way, so the caller's is left as it was
+        gray = img.convert("L") if img.mode != "L" else img
+        fit = fit_size(gray.size, self.size)
+        if fit != gray.size:
+            gray = gray.resize(fit, Image.ANTIALIAS, reducing_gap=2.0)
+
+        if self._canvas is None:
+            self._canvas = np.zeros((height, width), dtype=np.uint8)
+        canvas = self._canvas
+        if fit != self.size:
+            canvas.fill(0)
+        left, top = (width - fit[0]) // 2, (height - fit[1]) // 2
+        canvas[top : top + fit[1], left : left + fit[0]] = np.asarray(gray)
+
+        if check(dither) == FLOYD_STEINBERG:
+            bits = np.asarray(
+                Image.fromarray(canvas, "L").convert("1", dither=Image.FLOYDSTEINBERG)
+            )
+        else:
+            bits = dither_array(canvas, dither)
+
+        buf = self.pool.acquire()
+        packed = np.frombuffer(buf, dtype=np.uint8).reshape(height, (width + 7) // 8)
+        # set bits for black, as pack.pack_bits
+        packed[:] = np.packbits(~bits, axis=1)
+        return buf
@@ -0,0 +1,73 @@
+import threading
+import time
+from typing import Optional
+
+from vslomp.display.window import WindowClosed
+
+
+class RenderPacer:
+    """Holds back decoding of the next frame until just before the screen needs it.
+
+    The display reports the deadline of the next frame with schedule(); the decoder calls
+    wait() before each frame and is let through at the deadline minus the lead time. The lead
+    is the smoothed latency of previous frames from wait() to ready(), times a safety margin.
+    """
+
+    def __init__(self, margin: float = 1.5, min_lead: float = 1.0, smoothing: float = 0.3):
+        self.margin = margin
+        self.min_lead = min_lead
+        self.smoothing = smoothing
+        self._latency: Optional[float] = None
+        self._deadline: Optional[float] = None
+        self._started: Optional[float] = None
+        self._closed = False
+        self._cond = threading.Condition()
+
+    @property
+    def latency(self) -> Optional[float]:
+        return self._latency
+
+    @property
+    def lead(self) -> float:
+        return max(self.min_lead, (self._latency or 0.0) * self.margin)
+
+    def schedule(self, deadline: float) -> None:
+        """Sets the time.monotonic() deadline of the next frame."""
+        with self._cond:
+            self._deadline = deadline
+            self._cond.notify_all()
+
+    def wait(self) -> None:
+        with self._cond:
+            while not self._closed:
+                if self._deadline is None:
+                    self._cond.wait()
+                    continue
+
+                remaining = self._deadline - self.lead - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            if self._closed:
+                raise WindowClosed()
+
+            self._deadline = None
+            self._started = time.monotonic()
+
+    def ready(self) -> None:
+        with self._cond:
+            if self._started is None:
+                return
+
+            sample = time.monotonic() - self._started
+            self._started = None
+            if self._latency is None:
+                self._latency = sample
+            else:
+                self._latency += self.smoothing * (sample - self._latency)
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
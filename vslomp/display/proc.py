@@ -2,28 +2,38 @@ import concurrent.futures as conc
 import contextlib
 import dataclasses
 import enum
-import functools
 from pathlib import Path
-from queue import Queue
-from threading import Timer
-from typing import Any, BinaryIO, Callable, ClassVar, NamedTuple, Optional, Tuple, Union
+from typing import Any, BinaryIO, Callable, NamedTuple, Optional, Sequence, Tuple, Union
 
 import PIL.Image as Image
 import qcmd.core as qcore
 import qcmd.processors.executor as q
 from qcmd.core import logevent
 
+import vslomp.display.imager.dither as dithering
 import vslomp.display.imager.proc as imager
 import vslomp.display.screen.proc as screen
 import vslomp.display.screen.utils as screen_utils
 import vslomp.display.utils as disp_utils
-from vslomp.display.screen.utils import EPDMonochromeProtocol
+import vslomp.executors as executors
+import vslomp.metrics as metrics
+from vslomp.display.clock import FrameClock
+from vslomp.display.imager.render import FrameRenderer
+from vslomp.display.screen.pack import pack_image
+from vslomp.display.screen.refresh import RefreshCounts, RefreshState
+from vslomp.display.screen.saved import SavedScreen
+from vslomp.display.screen.utils import ScreenBuffer
+from vslomp.display.splash import SplashCache
+from vslomp.session import PlaybackSession
 
 
 class Context(NamedTuple):
-    screen: qcore.CommandProcessor[screen.CommandId, EPDMonochromeProtocol]
+    screen: qcore.CommandProcessor[screen.CommandId, screen.Context]
     imager: qcore.CommandProcessor[imager.CommandId, None]
     screen_size: Tuple[int, int]
+    refresh: RefreshState
+    splashes: SplashCache
+    renderer: FrameRenderer
 
 
 Result = Any
@@ -33,13 +43,18 @@ class CommandId(enum.Enum):
     INIT_SCREEN = enum.auto()
     INIT_VIDEO = enum.auto()
     CLEAR = enum.auto()
+    CLEAR_IF_UNKNOWN = enum.auto()
     SPLASHSCREEN = enum.auto()
     DISPLAY = enum.auto()
+    DISPLAY_BUFFER = enum.auto()
     FINISH = enum.auto()
     SLEEP = enum.auto()
+    GET_REFRESH_COUNTS = enum.auto()
+    GET_SCREEN_SIZE = enum.auto()
+    RENDER = enum.auto()
 
 
-class DisplayProcessorFactory(q.ProcessorFactory[CommandId, Context]):
+class DisplayProcessorFactory(metrics.ProcessorFactory[CommandId, Context]):
     procname = "Display"
 
 
@@ -49,21 +64,59 @@ _DisplayCommand = q.Command[CommandId, Context, None]
 
 
 @contextlib.contextmanager
-def create(screen_name: str, executor: conc.Executor):
+def create(
+    screen_name: str,
+    executor: Union[conc.Executor, executors.Executors],
+    *,
+    partial_refresh: bool = False,
+    partial_area: float = 0.25,
+    full_refresh_every: int = 10,
+    cache_dir: Optional[Path] = None,
+):
     (
         epd,
         size,
     ) = screen_utils.get_screen(screen_name)
+    refresh = RefreshState(size, partial_refresh, partial_area, full_refresh_every)
+    saved = SavedScreen.for_screen(screen_name, size, cache_dir)
+    sexec, slane = executors.executor_for(executor, executors.SCREEN)
+    iexec, ilane = executors.executor_for(executor, executors.IMAGER)
+    dexec, dlane = executors.executor_for(executor, executors.DISPLAY)
     with screen.ScreenProcessorFactory(
-        executor=executor, cxt=epd
-    ) as sph, imager.ImagerProcessorFactory(executor=executor, cxt=None) as iph:
-        with DisplayProcessorFactory(executor=executor, cxt=Context(sph, iph, size)) as dph:
+        executor=sexec, cxt=screen.Context(epd, refresh, saved), lane=slane
+    ) as sph, imager.ImagerProcessorFactory(executor=iexec, cxt=None, lane=ilane) as iph:
+        cxt = Context(sph, iph, size, refresh, SplashCache(cache_dir), FrameRenderer(size))
+        with DisplayProcessorFactory(executor=dexec, cxt=cxt, lane=dlane) as dph:
             yield dph
     logevent("EXIT", "DisplayProcessorContextManager")
 
 
-_buffer: "Queue[Tuple[Image.Image, Optional[int], disp_utils.Tags]]" = Queue()
-last_timer: Optional[Timer] = None
+@contextlib.contextmanager
+def create_many(
+    screen_names: Sequence[str],
+    executor: Union[conc.Executor, executors.Executors],
+    **kwargs: Any,
+):
+    """Creates a display processor per screen, as create does for one."""
+    with contextlib.ExitStack() as stack:
+        yield [stack.enter_context(create(name, executor, **kwargs)) for name in screen_names]
+
+
+_BufferEntry = Tuple[
+    q.Command[screen.CommandId, screen.Context, None],
+    Optional[int],
+    disp_utils.Tags,
+    Optional[Callable[[], None]],
+]
+
+
+def _enqueue(session: PlaybackSession, entry: _BufferEntry) -> None:
+    if not session.put(entry):
+        # the session was cancelled while this frame was on its way
+        if entry[3]:
+            entry[3]()
+        return
+    metrics.REGISTRY.sample_queue("Display.buffer", session.buffer.qsize())
 
 
 class Cmd:
@@ -79,34 +132,56 @@ class Cmd:
     @dataclasses.dataclass
     class InitVideo(_DisplayCommand):
         cmdid = CommandId.INIT_VIDEO
-        firstFrame: ClassVar[bool] = True
 
+        session: PlaybackSession
         ondisplay: Callable[[int], None]
         wait: Optional[float] = None
+        # called with the time.monotonic() deadline of each next frame
+        onschedule: Optional[Callable[[float], None]] = None
 
         def exec(self, hcmd: DisplayCommandHandle, cxt: Context) -> Result:
-            global _buffer, last_timer
+            session = self.session
+            clock = session.clock = FrameClock(self.wait if self.wait else 0.0)
+            if session.paused:
+                clock.pause()
 
             def _pushnext(res: None, tags: Any, *, frame: Optional[int]):
-                _wait = self.wait if self.wait else 0.0
-                if Cmd.InitVideo.firstFrame:
-                    _wait = 0.0
-                    Cmd.InitVideo.firstFrame = False
-                last_timer = Timer(_wait, _display)
-                last_timer.setName(f"PushNextFrame[{_wait}]")
-                last_timer.start()
-
-                if frame:
+                if session.cancelled:
+                    return
+
+                deadline = clock.schedule(_display)
+                if self.onschedule:
+                    self.onschedule(deadline)
+
+                if frame is not None:
+                    session.shown += 1
                     self.ondisplay(frame)
 
             def _display():
-                img, frno, tags = _buffer.get(block=True)
-                cxt.screen.send(screen.Cmd.Display(img), tags=tags).then(
-                    functools.partial(_pushnext, frame=frno)
-                )
-                _buffer.task_done()
+                # runs on the clock's thread, so it must not wait for the frame
+                session.take(_send)
 
-            _buffer = Queue()
+            def _send(entry: Optional[_BufferEntry]):
+                if entry is None:
+                    return
+
+                scmd, frno, tags, ondone = entry
+
+                def _shown(res: None, tags: Any):
+                    if ondone:
+                        ondone()
+                    _pushnext(res, tags, frame=frno)
+
+                def _failed(ex: Exception, tags: Any):
+                    if ondone:
+                        ondone()
+                    return True
+
+                cxt.screen.send(scmd, tags=tags).then(_shown).or_err(_failed)
+                session.buffer.task_done()
+
+            metrics.REGISTRY.track_queue("Display.buffer", session.buffer.qsize)
+            cxt.refresh.reset_counts()
             # sends frames one-by-one to the screen processor so we have a chance to interrupt
             _pushnext(None, None, frame=None)
 
@@ -118,22 +193,41 @@ class Cmd:
 
     CLEAR = Clear()
 
+    # clears the screen unless it still shows what it was left showing at the last shutdown
+    class ClearIfUnknown(_DisplayCommand):
+        cmdid = CommandId.CLEAR_IF_UNKNOWN
+
+        def exec(self, hcmd: DisplayCommandHandle, cxt: Context) -> Result:
+            cxt.screen.send(screen.Cmd.ClearIfUnknown())
+
+    CLEAR_IF_UNKNOWN = ClearIfUnknown()
+
     @dataclasses.dataclass
     class Splashscreen(_DisplayCommand):
         cmdid = CommandId.SPLASHSCREEN
 
         resource: Union[str, Path, BinaryIO]
+        dither: str = dithering.DEFAULT
 
         def exec(self, hcmd: DisplayCommandHandle, cxt: Context) -> Result:
+            key = cxt.splashes.key(self.resource, cxt.screen_size, self.dither)
+            cached = cxt.splashes.get(key) if key else None
+            if cached is not None:
+                cxt.screen.send(
+                    screen.Cmd.DisplayBuffer(cached), pri=45, tags=[("splashscreen", 0)]
+                )
+                return
+
             def _display(img: Image.Image, tags: Any):
-                cxt.screen.send(screen.Cmd.Display(img), pri=45, tags=tags)
+                buf = pack_image(img, cxt.screen_size)
+                if key:
+                    cxt.splashes.put(key, buf)
+                cxt.screen.send(screen.Cmd.DisplayBuffer(buf), pri=45, tags=tags)
 
             def _convert(img: Image.Image, tags: Any):
-                cxt.imager.send(
-                    imager.Cmd.Convert(img, mode="1", dither=Image.FLOYDSTEINBERG),
-                    tags=tags,
-                    pri=45,
-                ).then(_display)
+                cxt.imager.send(imager.Cmd.Dither(img, self.dither), tags=tags, pri=45).then(
+                    _display
+                )
 
             def _size(img: Image.Image, tags: Any):
                 cxt.imager.send(
@@ -143,48 +237,140 @@ class Cmd:
                 ).then(_convert)
 
             cxt.imager.send(
-                imager.Cmd.LoadFile(self.resource), tags=[("splashscreen", 0)], pri=45
+                imager.Cmd.LoadFile(self.resource, draft=cxt.screen_size),
+                tags=[("splashscreen", 0)],
+                pri=45,
             ).then(_size)
 
     @dataclasses.dataclass
     class Display(_DisplayCommand):
         cmdid = CommandId.DISPLAY
 
+        session: PlaybackSession
         img: Image.Image
         frame: Optional[int]
+        ondone: Optional[Callable[[], None]] = None
+        onready: Optional[Callable[[], None]] = None
+        dither: str = dithering.DEFAULT
+        # renders in one imager step; off, each step is a command of its own, for debugging
+        fused: bool = True
+
+        def _dropped(self) -> bool:
+            # the frame is dropped between steps once its session has been cancelled
+            if self.session.cancelled and self.ondone:
+                self.ondone()
+            return self.session.cancelled
 
         def exec(self, hcmd: DisplayCommandHandle, cxt: Context) -> Result:
-            global _buffer
+            if self._dropped():
+                return
+
+            def _failed(ex: Exception, tags: disp_utils.Tags):
+                if self.ondone:
+                    self.ondone()
+                return True
 
             def _bufferput(img: Image.Image, tags: disp_utils.Tags):
-                _buffer.put((img, self.frame, tags), block=True)
+                if self.onready:
+                    self.onready()
+                _enqueue(self.session, (screen.Cmd.Display(img), self.frame, tags, self.ondone))
 
             def _convert(img: Image.Image, tags: disp_utils.Tags):
+                if self._dropped():
+                    return
+                cxt.imager.send(imager.Cmd.Dither(img, self.dither), tags=tags).then(
+                    _bufferput
+                ).or_err(_failed)
+
+            def _rendered(buf: bytearray, tags: disp_utils.Tags):
+                if self.onready:
+                    self.onready()
+
+                def _done():
+                    # the screen has copied what it needs, so the buffer can be reused
+                    cxt.renderer.pool.release(buf)
+                    if self.ondone:
+                        self.ondone()
+
+                _enqueue(self.session, (screen.Cmd.DisplayBuffer(buf), self.frame, tags, _done))
+
+            if self.fused:
                 cxt.imager.send(
-                    imager.Cmd.Convert(img, "1", Image.FLOYDSTEINBERG), tags=tags
-                ).then(_bufferput)
+                    imager.Cmd.Render(self.img, cxt.renderer, self.dither),
+                    tags=[("frame", self.frame)],
+                ).then(_rendered).or_err(_failed)
+                return
 
             cxt.imager.send(
                 imager.Cmd.EnsureSize(self.img, cxt.screen_size, Image.ANTIALIAS),
                 tags=[("frame", self.frame)],
-            ).then(_convert)
+            ).then(_convert).or_err(_failed)
 
-    class Finish(_DisplayCommand):
-        cmdid = CommandId.FINISH
+    # sizes, dithers and packs img for this display's screen, without showing it
+    @dataclasses.dataclass
+    class Render(_DisplayCommand):
+        cmdid = CommandId.RENDER
+
+        img: Image.Image
+        frame: Optional[int]
+        onrendered: Callable[[bytes], None]
+        onerror: Callable[[Exception], None]
+        dither: str = dithering.DEFAULT
+        fused: bool = True
 
         def exec(self, hcmd: DisplayCommandHandle, cxt: Context) -> Result:
-            global _buffer, last_timer
+            def _failed(ex: Exception, tags: disp_utils.Tags):
+                self.onerror(ex)
+                return True
+
+            if self.fused:
+                # the buffer goes to several screens, so it is left out of the pool
+                cxt.imager.send(
+                    imager.Cmd.Render(self.img, cxt.renderer, self.dither),
+                    tags=[("frame", self.frame)],
+                ).then(lambda buf, tags: self.onrendered(buf)).or_err(_failed)
+                return
+
+            def _pack(img: Image.Image, tags: disp_utils.Tags):
+                self.onrendered(pack_image(img, cxt.screen_size))
+
+            def _convert(img: Image.Image, tags: disp_utils.Tags):
+                cxt.imager.send(imager.Cmd.Dither(img, self.dither), tags=tags).then(_pack).or_err(
+                    _failed
+                )
+
+            cxt.imager.send(
+                imager.Cmd.EnsureSize(self.img, cxt.screen_size, Image.ANTIALIAS),
+                tags=[("frame", self.frame)],
+            ).then(_convert).or_err(_failed)
+
+    @dataclasses.dataclass
+    class DisplayBuffer(_DisplayCommand):
+        cmdid = CommandId.DISPLAY_BUFFER
 
-            _last_timer = last_timer
-            if _last_timer:
-                _last_timer.cancel()
+        session: PlaybackSession
+        buf: ScreenBuffer
+        frame: Optional[int]
+        ondone: Optional[Callable[[], None]] = None
+        onready: Optional[Callable[[], None]] = None
 
+        def exec(self, hcmd: DisplayCommandHandle, cxt: Context) -> Result:
+            if self.onready:
+                self.onready()
+            scmd = screen.Cmd.DisplayBuffer(self.buf)
+            _enqueue(self.session, (scmd, self.frame, [("frame", self.frame)], self.ondone))
+
+    @dataclasses.dataclass
+    class Finish(_DisplayCommand):
+        cmdid = CommandId.FINISH
+
+        session: PlaybackSession
+
+        def exec(self, hcmd: DisplayCommandHandle, cxt: Context) -> Result:
             cxt.imager.join()
-            _buffer.join()
+            self.session.buffer.join()
             cxt.screen.join()
 
-    FINISH = Finish()
-
     class Sleep(_DisplayCommand):
         cmdid = CommandId.SLEEP
 
@@ -196,3 +382,23 @@ class Cmd:
             cxt.screen.join()
 
     SLEEP = Sleep()
+
+    class GetRefreshCounts(q.Command[CommandId, Context, RefreshCounts]):
+        cmdid = CommandId.GET_REFRESH_COUNTS
+
+        def exec(
+            self, hcmd: q.CommandHandle[CommandId, RefreshCounts], cxt: Context
+        ) -> RefreshCounts:
+            return cxt.refresh.counts
+
+    GET_REFRESH_COUNTS = GetRefreshCounts()
+
+    class GetScreenSize(q.Command[CommandId, Context, Tuple[int, int]]):
+        cmdid = CommandId.GET_SCREEN_SIZE
+
+        def exec(
+            self, hcmd: q.CommandHandle[CommandId, Tuple[int, int]], cxt: Context
+        ) -> Tuple[int, int]:
+            return cxt.screen_size
+
+    GET_SCREEN_SIZE = GetScreenSize()
@@ -0,0 +1,29 @@
+import ctypes
+import multiprocessing
+from typing import Any, Optional
+
+
+class FrameRing:
+    """Fixed-size frame slots in shared memory, passed between processes in sequence order.
+
+    Frame seq is always written to slot seq % slots. A writer acquires that slot before filling
+    it, which waits until the frame written there slots frames earlier has been released, so
+    the frame the reader needs next can never be starved of a slot by later ones.
+    """
+
+    def __init__(self, slots: int, slot_bytes: int, ctx: Optional[Any] = None):
+        ctx = ctx or multiprocessing.get_context("spawn")
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self._data = ctx.RawArray(ctypes.c_ubyte, slots * slot_bytes)
+        self._free = [ctx.Semaphore(1) for _ in range(slots)]
+
+    def acquire(self, seq: int, timeout: Optional[float] = None) -> bool:
+        return self._free[seq % self.slots].acquire(timeout=timeout)
+
+    def release(self, seq: int) -> None:
+        self._free[seq % self.slots].release()
+
+    def view(self, seq: int) -> memoryview:
+        offset = (seq % self.slots) * self.slot_bytes
+        return memoryview(self._data).cast("B")[offset : offset + self.slot_bytes]
@@ -0,0 +1,145 @@
+import mmap
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, NamedTuple, Optional, Sequence, Tuple
+
+from PIL import Image
+
+from vslomp.lazy import lazy_import
+
+from .pack import BLANK, pack_image
+from .utils import ScreenBuffer
+
+if TYPE_CHECKING:
+    import numpy as np
+else:
+    np = lazy_import("numpy")
+
+PREFIX = "emulator"
+
+
+class EmulatorConfig(NamedTuple):
+    width: int = 800
+    height: int = 480
+    # seconds per full and partial refresh, after the buffer has been sent
+    full_refresh: float = 0.0
+    partial_refresh: float = 0.0
+    # SPI throughput in bytes per second, 0 for instant transfers
+    spi_rate: float = 0.0
+    # a file mmap'd as the panel's packed framebuffer
+    framebuffer: Optional[Path] = None
+    # a directory to write every refresh to as a PNG
+    png_dir: Optional[Path] = None
+
+
+def is_emulator(name: str) -> bool:
+    return name == PREFIX or name.startswith(PREFIX + ":")
+
+
+def parse_name(name: str) -> EmulatorConfig:
+    """Parses a screen name like "emulator:800x480,refresh=4,partial=0.4,spi=2e6,png=out".
+
+    The size is optional; the other keys are refresh, partial, spi, fb and png.
+    """
+    config = EmulatorConfig()
+    _, _, spec = name.partition(":")
+
+    for part in filter(None, spec.split(",")):
+        key, sep, val = part.partition("=")
+        if not sep:
+            width, _, height = key.partition("x")
+            config = config._replace(width=int(width), height=int(height))
+        elif key == "refresh":
+            config = config._replace(full_refresh=float(val))
+        elif key == "partial":
+            config = config._replace(partial_refresh=float(val))
+        elif key == "spi":
+            config = config._replace(spi_rate=float(val))
+        elif key == "fb":
+            config = config._replace(framebuffer=Path(val))
+        elif key == "png":
+            config = config._replace(png_dir=Path(val))
+        else:
+            raise ValueError(f"unknown emulator option: {key}")
+
+    return config
+
+
+class EmulatedEPD:
+    """An EPD that keeps its picture in memory and sleeps for the configured panel timings."""
+
+    def __init__(self, config: EmulatorConfig = EmulatorConfig()):
+        self.config = config
+        self.width = config.width
+        self.height = config.height
+        self.refreshes = 0
+        self.partial_refreshes = 0
+        self._row_bytes = (self.width + 7) // 8
+        self._fp = None
+        self._fb: Optional[mmap.mmap] = None
+        self._pixels = np.full((self.height, self._row_bytes), BLANK, dtype=np.uint8)
+
+    def _transfer(self, nbytes: int) -> None:
+        if self.config.spi_rate:
+            time.sleep(nbytes / self.config.spi_rate)
+
+    def _refreshed(self, wait: float) -> None:
+        if wait:
+            time.sleep(wait)
+
+        if self._fb is not None:
+            self._fb[:] = self._pixels.tobytes()
+
+        if self.config.png_dir:
+            # a mode "1" image sets its bits for white
+            pixels = np.invert(self._pixels).tobytes()
+            img = Image.frombytes("1", (self.width, self.height), pixels)
+            img.save(
+                self.config.png_dir / f"frame-{self.refreshes + self.partial_refreshes:06d}.png"
+            )
+
+    def init(self) -> None:
+        if self.config.framebuffer and self._fb is None:
+            size = self._pixels.nbytes
+            self._fp = open(self.config.framebuffer, "w+b")
+            self._fp.truncate(size)
+            self._fb = mmap.mmap(self._fp.fileno(), size)
+        if self.config.png_dir:
+            self.config.png_dir.mkdir(parents=True, exist_ok=True)
+
+    def getbuffer(self, image: Image.Image) -> Sequence[int]:
+        return pack_image(image, (self.width, self.height))
+
+    def display(self, image: ScreenBuffer) -> None:
+        self._transfer(len(image))
+        self._pixels[:] = np.frombuffer(bytes(image), dtype=np.uint8).reshape(self._pixels.shape)
+        self.refreshes += 1
+        self._refreshed(self.config.full_refresh)
+
+    def display_partial(self, region: ScreenBuffer, x0: int, y0: int, x1: int, y1: int) -> None:
+        self._transfer(len(region))
+        cols = slice(x0 // 8, (x1 + 7) // 8)
+        self._pixels[y0:y1, cols] = np.frombuffer(bytes(region), dtype=np.uint8).reshape(
+            y1 - y0, cols.stop - cols.start
+        )
+        self.partial_refreshes += 1
+        self._refreshed(self.config.partial_refresh)
+
+    def Clear(self) -> None:
+        self.display(bytes([BLANK]) * self._pixels.nbytes)
+
+    def sleep(self) -> None:
+        pass
+
+    def Dev_exit(self) -> None:
+        if self._fb is not None:
+            self._fb.close()
+            self._fb = None
+        if self._fp is not None:
+            self._fp.close()
+            self._fp = None
+
+
+def get_screen(name: str) -> Tuple[EmulatedEPD, Tuple[int, int]]:
+    epd = EmulatedEPD(parse_name(name))
+    return (epd, (epd.width, epd.height))
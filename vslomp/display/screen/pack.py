@@ -0,0 +1,74 @@
+from typing import TYPE_CHECKING, Optional, Tuple, Union
+
+from PIL import Image
+
+from vslomp.lazy import lazy_import
+
+if TYPE_CHECKING:
+    import numpy as np
+else:
+    np = lazy_import("numpy")
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+# a packed byte of eight white pixels: the drivers' buffers set a bit for each black pixel,
+# the reverse of a mode "1" image
+BLANK = 0x00
+
+
+def to_bits(img: Union[Image.Image, "np.ndarray"]) -> "np.ndarray":
+    """Returns a 2D bool array (True for white) from a mode "1"/"L" image or array."""
+    if isinstance(img, Image.Image):
+        if img.mode not in ("1", "L"):
+            img = img.convert("1")
+        arr = np.asarray(img)
+    else:
+        arr = img
+
+    if arr.dtype == np.bool_:
+        return arr
+    return arr >= 128
+
+
+def orient(
+    bits: "np.ndarray", size: Tuple[int, int], rotate: int = 0, mirror: bool = False
+) -> "np.ndarray":
+    """Rotates (counter-clockwise, in degrees) and mirrors bits to the panel's native size.
+
+    A portrait frame is turned a quarter counter-clockwise, as the drivers' getbuffer does.
+    """
+    if rotate % 90:
+        raise ValueError(f"rotation must be a multiple of 90 degrees, got {rotate}")
+    if rotate:
+        bits = np.rot90(bits, (rotate // 90) % 4)
+    if mirror:
+        bits = bits[:, ::-1]
+
+    width, height = size
+    if bits.shape == (width, height) and width != height:
+        bits = np.rot90(bits)
+
+    if bits.shape != (height, width):
+        raise ValueError(
+            f"frame size {bits.shape[1]}x{bits.shape[0]} does not fit a {width}x{height} panel"
+        )
+    return bits
+
+
+def pack_bits(bits: "np.ndarray") -> bytes:
+    """Packs panel-oriented bits (True for white) into rows of whole bytes, MSB first, set
+    bits for black."""
+    return np.packbits(~bits, axis=1).tobytes()
+
+
+def pack_image(
+    img: Union[Image.Image, "np.ndarray"],
+    size: Optional[Tuple[int, int]] = None,
+    rotate: int = 0,
+    mirror: bool = False,
+) -> bytes:
+    """Packs a frame into the buffer layout the drivers' display expects."""
+    bits = to_bits(img)
+    if size is None:
+        size = (bits.shape[1], bits.shape[0])
+    return pack_bits(orient(bits, size, rotate, mirror))
@@ -1,78 +1,138 @@
 import dataclasses
 import enum
 from time import sleep
+from typing import NamedTuple, Optional
 
 import qcmd.processors.executor as q
 from PIL.Image import Image
 
-from .utils import EPDMonochromeProtocol
+import vslomp.metrics as metrics
+
+from .pack import pack_image
+from .refresh import Refresh, RefreshState
+from .saved import SavedScreen
+from .utils import EPDMonochromeProtocol, ScreenBuffer, show_full, show_partial, supports_partial
+
+
+class Context(NamedTuple):
+    epd: EPDMonochromeProtocol
+    refresh: RefreshState
+    saved: Optional[SavedScreen] = None
 
 
 class CommandId(enum.Enum):
     INIT = enum.auto()
     CLEAR = enum.auto()
+    CLEAR_IF_UNKNOWN = enum.auto()
     DISPLAY = enum.auto()
+    DISPLAY_BUFFER = enum.auto()
     WAIT = enum.auto()
     SLEEP = enum.auto()
     UNINIT = enum.auto()
 
 
-class ScreenProcessorFactory(q.ProcessorFactory[CommandId, EPDMonochromeProtocol]):
+class ScreenProcessorFactory(metrics.ProcessorFactory[CommandId, Context]):
     procname = "Screen"
 
 
-ScreenProcessor = q.Processor[CommandId, EPDMonochromeProtocol]
+ScreenProcessor = q.Processor[CommandId, Context]
 
 
-_ScreenCommand = q.Command[CommandId, EPDMonochromeProtocol, None]
+_ScreenCommand = q.Command[CommandId, Context, None]
 ScreenCommandHandle = q.CommandHandle[CommandId, None]
 
 
+def _show(cxt: Context, buf: ScreenBuffer) -> None:
+    refresh, box = cxt.refresh.plan(buf, supports_partial(cxt.epd))
+
+    if refresh is Refresh.PARTIAL:
+        assert box is not None
+        region = cxt.refresh.region(buf, box)
+        show_partial(cxt.epd, region, box, entering=not cxt.refresh.partial_mode)
+    elif refresh is Refresh.FULL:
+        show_full(cxt.epd, buf, leaving_partial=cxt.refresh.partial_mode)
+
+    cxt.refresh.shown(buf, refresh)
+
+
 class Cmd:
     class Init(_ScreenCommand):
         cmdid = CommandId.INIT
 
-        def exec(self, hcmd: ScreenCommandHandle, cxt: EPDMonochromeProtocol) -> None:
-            cxt.init()
+        def exec(self, hcmd: ScreenCommandHandle, cxt: Context) -> None:
+            cxt.epd.init()
+            cxt.refresh.forget()
+            if cxt.saved:
+                cxt.saved.take()
 
     INIT = Init()
 
     class Clear(_ScreenCommand):
         cmdid = CommandId.CLEAR
 
-        def exec(self, hcmd: ScreenCommandHandle, cxt: EPDMonochromeProtocol) -> None:
-            cxt.Clear()
+        def exec(self, hcmd: ScreenCommandHandle, cxt: Context) -> None:
+            if cxt.refresh.partial_mode:
+                cxt.epd.init()
+            cxt.epd.Clear()
+            cxt.refresh.cleared()
 
     CLEAR = Clear()
 
+    class ClearIfUnknown(_ScreenCommand):
+        cmdid = CommandId.CLEAR_IF_UNKNOWN
+
+        def exec(self, hcmd: ScreenCommandHandle, cxt: Context) -> None:
+            picture = cxt.saved.picture if cxt.saved else None
+            if picture is None:
+                Cmd.CLEAR.exec(hcmd, cxt)
+                return
+
+            # the panel still shows what the last run left on it
+            cxt.refresh.restore(picture)
+            cxt.saved.picture = None
+
+    CLEAR_IF_UNKNOWN = ClearIfUnknown()
+
     @dataclasses.dataclass
     class Display(_ScreenCommand):
         cmdid = CommandId.DISPLAY
         img: Image
 
-        def exec(self, hcmd: ScreenCommandHandle, cxt: EPDMonochromeProtocol) -> None:
-            cxt.display(cxt.getbuffer(self.img))
+        def exec(self, hcmd: ScreenCommandHandle, cxt: Context) -> None:
+            _show(cxt, pack_image(self.img, (cxt.epd.width, cxt.epd.height)))
+
+    @dataclasses.dataclass
+    class DisplayBuffer(_ScreenCommand):
+        cmdid = CommandId.DISPLAY_BUFFER
+        buf: ScreenBuffer
+
+        def exec(self, hcmd: ScreenCommandHandle, cxt: Context) -> None:
+            _show(cxt, self.buf)
 
     @dataclasses.dataclass
     class Wait(_ScreenCommand):
         cmdid = CommandId.WAIT
         wait: float
 
-        def exec(self, hcmd: ScreenCommandHandle, cxt: EPDMonochromeProtocol) -> None:
+        def exec(self, hcmd: ScreenCommandHandle, cxt: Context) -> None:
             sleep(self.wait)
 
     class Sleep(_ScreenCommand):
         cmdid = CommandId.SLEEP
 
-        def exec(self, hcmd: ScreenCommandHandle, cxt: EPDMonochromeProtocol) -> None:
-            cxt.sleep()
+        def exec(self, hcmd: ScreenCommandHandle, cxt: Context) -> None:
+            cxt.epd.sleep()
 
     SLEEP = Sleep()
 
     class Uninit(_ScreenCommand):
         cmdid = CommandId.UNINIT
 
-        def exec(self, hcmd: ScreenCommandHandle, cxt: EPDMonochromeProtocol) -> None:
-            cxt.Dev_exit()
+        def exec(self, hcmd: ScreenCommandHandle, cxt: Context) -> None:
+            last = cxt.refresh.last
+            if cxt.saved and last is not None:
+                cxt.saved.save(last)
+            cxt.epd.Dev_exit()
+            cxt.refresh.forget()
 
     UNINIT = Uninit()
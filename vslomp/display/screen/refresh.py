@@ -0,0 +1,136 @@
+import enum
+import threading
+from typing import TYPE_CHECKING, NamedTuple, Optional, Tuple
+
+from vslomp.lazy import lazy_import
+
+from .pack import BLANK
+from .utils import ScreenBuffer
+
+if TYPE_CHECKING:
+    import numpy as np
+else:
+    np = lazy_import("numpy")
+
+Box = Tuple[int, int, int, int]
+
+
+class Refresh(enum.Enum):
+    SKIP = enum.auto()
+    PARTIAL = enum.auto()
+    FULL = enum.auto()
+
+
+class RefreshCounts(NamedTuple):
+    full: int = 0
+    partial: int = 0
+    skipped: int = 0
+
+
+class RefreshState:
+    """Tracks the frame on the panel and decides how to refresh it for the next one.
+
+    Identical frames are skipped. When partial refresh is enabled, a frame whose changed
+    bounding box covers at most partial_area of the panel is refreshed in that box only,
+    with a full refresh forced after full_every partials in a row to clear ghosting.
+    """
+
+    def __init__(
+        self,
+        size: Tuple[int, int],
+        partial: bool = False,
+        partial_area: float = 0.25,
+        full_every: int = 10,
+    ):
+        self.size = size
+        self.partial = partial
+        self.partial_area = partial_area
+        self.full_every = full_every
+        self._last: Optional[np.ndarray] = None
+        self._partials = 0
+        self.partial_mode = False
+        self._counts = RefreshCounts()
+        self._lock = threading.Lock()
+
+    @property
+    def counts(self) -> RefreshCounts:
+        return self._counts
+
+    def reset_counts(self) -> None:
+        with self._lock:
+            self._counts = RefreshCounts()
+
+    @property
+    def last(self) -> Optional[bytes]:
+        """The packed frame on the panel, if it is known."""
+        last = self._last
+        return last.tobytes() if last is not None else None
+
+    def _rows(self, buf: ScreenBuffer) -> "np.ndarray":
+        width, height = self.size
+        return np.frombuffer(bytes(buf), dtype=np.uint8).reshape(height, (width + 7) // 8)
+
+    def plan(self, buf: ScreenBuffer, partial_capable: bool) -> Tuple[Refresh, Optional[Box]]:
+        """Returns how to show buf, and for a partial refresh the changed (x0, y0, x1, y1)."""
+        if self._last is None:
+            return (Refresh.FULL, None)
+
+        diff = np.bitwise_xor(self._last, self._rows(buf))
+        rows = np.flatnonzero(diff.any(axis=1))
+        if rows.size == 0:
+            return (Refresh.SKIP, None)
+
+        if not (self.partial and partial_capable) or self._partials >= self.full_every:
+            return (Refresh.FULL, None)
+
+        cols = np.flatnonzero(diff.any(axis=0))
+        width, height = self.size
+        box = (
+            int(cols[0]) * 8,
+            int(rows[0]),
+            min(width, (int(cols[-1]) + 1) * 8),
+            int(rows[-1]) + 1,
+        )
+        area = (box[2] - box[0]) * (box[3] - box[1])
+        if area > self.partial_area * width * height:
+            return (Refresh.FULL, None)
+
+        return (Refresh.PARTIAL, box)
+
+    def region(self, buf: ScreenBuffer, box: Box) -> bytes:
+        x0, y0, x1, y1 = box
+        return self._rows(buf)[y0:y1, x0 // 8 : (x1 + 7) // 8].tobytes()
+
+    def shown(self, buf: ScreenBuffer, refresh: Refresh) -> None:
+        with self._lock:
+            full, partial, skipped = self._counts
+            if refresh is Refresh.SKIP:
+                self._counts = RefreshCounts(full, partial, skipped + 1)
+                return
+
+            self.partial_mode = refresh is Refresh.PARTIAL
+            if refresh is Refresh.PARTIAL:
+                self._partials += 1
+                self._counts = RefreshCounts(full, partial + 1, skipped)
+            else:
+                self._partials = 0
+                self._counts = RefreshCounts(full + 1, partial, skipped)
+
+            self._last = self._rows(buf).copy()
+
+    def cleared(self) -> None:
+        width, height = self.size
+        self._last = np.full((height, (width + 7) // 8), BLANK, dtype=np.uint8)
+        self._partials = 0
+        self.partial_mode = False
+
+    def restore(self, buf: ScreenBuffer) -> None:
+        """Takes buf as the frame on the panel, as it was left by a previous run."""
+        self._last = self._rows(buf).copy()
+        self._partials = 0
+        self.partial_mode = False
+
+    def forget(self) -> None:
+        self._last = None
+        self._partials = 0
+        self.partial_mode = False
@@ -0,0 +1,51 @@
+import hashlib
+from pathlib import Path
+from typing import Optional, Tuple
+
+from qcmd.core import logevent
+
+import vslomp.cache as cache
+
+from .utils import ScreenBuffer
+
+
+class SavedScreen:
+    """Keeps the picture a panel was left showing at the last clean shutdown, in a file under
+    the cache dir.
+
+    E-paper holds its picture without power, so while the file is there the panel is known to
+    show it and does not need a clearing refresh. The file is taken when the panel is next
+    initialized, so after a crash the picture is unknown again.
+    """
+
+    def __init__(self, path: Path, size: Tuple[int, int]):
+        self.path = path
+        self.size = size
+        # the picture taken at init, until it is restored or cleared
+        self.picture: Optional[bytes] = None
+
+    @classmethod
+    def for_screen(
+        cls, name: str, size: Tuple[int, int], cache_dir: Optional[Path] = None
+    ) -> "SavedScreen":
+        key = hashlib.sha1(name.encode("utf-8")).hexdigest()
+        return cls(cache.cache_path(cache_dir, "screen", key, ".bin"), size)
+
+    def take(self) -> None:
+        try:
+            data = self.path.read_bytes()
+            self.path.unlink()
+        except FileNotFoundError:
+            return
+        except OSError as ex:
+            logevent("SCREEN", f"discarding unreadable screen state {self.path}", ex)
+            return
+
+        width, height = self.size
+        self.picture = data if len(data) == (width + 7) // 8 * height else None
+
+    def save(self, buf: ScreenBuffer) -> None:
+        try:
+            cache.atomic_write(self.path, bytes(buf))
+        except OSError as ex:
+            logevent("SCREEN", f"could not write screen state {self.path}", ex)
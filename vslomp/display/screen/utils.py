@@ -1,17 +1,22 @@
 import importlib
-from typing import Protocol, Sequence, Tuple, Type, cast
+from typing import Any, Protocol, Sequence, Tuple, Type, Union, cast
 
 from PIL import Image
 
+ScreenBuffer = Union[Sequence[int], bytes, bytearray, memoryview]
+
 
 class EPDMonochromeProtocol(Protocol):
+    width: int
+    height: int
+
     def init(self) -> None:
         raise NotImplementedError
 
     def getbuffer(self, image: Image.Image) -> Sequence[int]:
         raise NotImplementedError
 
-    def display(self, image: Sequence[int]) -> None:
+    def display(self, image: ScreenBuffer) -> None:
         raise NotImplementedError
 
     def Clear(self) -> None:
@@ -24,13 +29,64 @@ class EPDMonochromeProtocol(Protocol):
         raise NotImplementedError
 
 
-def get_screen(name: str) -> Tuple[EPDMonochromeProtocol, Tuple[int, int]]:
+class EPDPartialProtocol(Protocol):
+    def display_partial(self, region: ScreenBuffer, x0: int, y0: int, x1: int, y1: int) -> None:
+        """Refreshes the box from (x0, y0) to (x1, y1), with x0 and x1 on byte boundaries.
+
+        region holds just the box's rows, packed in the same layout as display's buffer.
+        """
+        raise NotImplementedError
+
+
+def supports_partial(epd: Any) -> bool:
+    return hasattr(epd, "display_partial") or (
+        hasattr(epd, "display_Partial") and hasattr(epd, "init_part")
+    )
+
+
+def show_partial(
+    epd: Any, region: ScreenBuffer, box: Tuple[int, int, int, int], entering: bool
+) -> None:
+    if hasattr(epd, "display_partial"):
+        cast(EPDPartialProtocol, epd).display_partial(region, *box)
+        return
+
+    # the waveshare drivers switch the controller into partial mode with init_part
+    if entering:
+        epd.init_part()
+    epd.display_Partial(region, *box)
+
+
+def show_full(epd: EPDMonochromeProtocol, buf: ScreenBuffer, leaving_partial: bool) -> None:
+    # and back out of it with a full init
+    if leaving_partial and not hasattr(epd, "display_partial"):
+        epd.init()
+    epd.display(buf)
+
+
+def get_screen_size(name: str) -> Tuple[int, int]:
+    from . import emulator
+
+    if emulator.is_emulator(name):
+        config = emulator.parse_name(name)
+        return (config.width, config.height)
+
     epd_module = importlib.import_module("waveshare_epd." + name)
-    screen_size = (
+    return (
         cast(int, getattr(epd_module, "EPD_WIDTH")),
         cast(int, getattr(epd_module, "EPD_HEIGHT")),
     )
 
+
+def get_screen(name: str) -> Tuple[EPDMonochromeProtocol, Tuple[int, int]]:
+    from . import emulator
+
+    if emulator.is_emulator(name):
+        return emulator.get_screen(name)
+
+    epd_module = importlib.import_module("waveshare_epd." + name)
+    screen_size = get_screen_size(name)
+
     epd_class = cast(Type[EPDMonochromeProtocol], getattr(epd_module, "EPD"))
 
     return (epd_class(), screen_size)
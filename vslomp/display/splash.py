@@ -0,0 +1,78 @@
+import collections
+import os
+import threading
+from pathlib import Path
+from typing import Any, Optional, Tuple
+
+from qcmd.core import logevent
+
+import vslomp.cache as cache
+from vslomp.display.screen.utils import ScreenBuffer
+
+
+class SplashCache:
+    """Keeps the packed screen buffers of recent splash screens, so showing the same picture
+    again skips loading, sizing and dithering it.
+
+    Buffers are keyed by the picture's path, size and mtime, the screen size and the dither,
+    and kept in memory and in files under the cache dir, each least recently used first out.
+    """
+
+    def __init__(self, cache_dir: Optional[Path] = None, entries: int = 4, disk_entries: int = 32):
+        self.cache_dir = cache_dir
+        self.entries = entries
+        self.disk_entries = disk_entries
+        self._lru: "collections.OrderedDict[str, bytes]" = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def key(self, resource: Any, size: Tuple[int, int], dither: str) -> Optional[str]:
+        """Returns the key for resource on a screen of size, or None if it cannot be cached."""
+        if not isinstance(resource, (str, Path)):
+            return None
+        try:
+            return cache.file_key(resource, size, dither)
+        except OSError:
+            return None
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            buf = self._lru.get(key)
+            if buf is not None:
+                self._lru.move_to_end(key)
+                return buf
+
+        path = self._path(key)
+        try:
+            buf = path.read_bytes()
+            # the file's mtime is when it was last used
+            os.utime(path)
+        except OSError:
+            return None
+
+        self._remember(key, buf)
+        return buf
+
+    def put(self, key: str, buf: ScreenBuffer) -> None:
+        data = bytes(buf)
+        self._remember(key, data)
+        path = self._path(key)
+        try:
+            cache.atomic_write(path, data)
+            self._evict(path.parent)
+        except OSError as ex:
+            logevent("SPLASH", f"could not write splash cache {path}", ex)
+
+    def _path(self, key: str) -> Path:
+        return cache.cache_path(self.cache_dir, "splash", key, ".bin")
+
+    def _remember(self, key: str, buf: bytes) -> None:
+        with self._lock:
+            self._lru[key] = buf
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.entries:
+                self._lru.popitem(last=False)
+
+    def _evict(self, directory: Path) -> None:
+        files = sorted(directory.glob("*.bin"), key=lambda p: p.stat().st_mtime_ns)
+        for path in files[: max(0, len(files) - self.disk_entries)]:
+            path.unlink(missing_ok=True)
@@ -0,0 +1,61 @@
+import threading
+from typing import Optional
+
+
+class WindowClosed(Exception):
+    pass
+
+
+class FrameWindow:
+    """Bounds the frames (and bytes) in flight between the decoder and the screen.
+
+    The producer acquires a slot before handing a frame on and blocks while the window is
+    full; the display releases it once the frame has been shown. A frame larger than the
+    whole byte budget is still let through when the window is otherwise empty.
+    """
+
+    def __init__(self, frames: Optional[int] = None, nbytes: Optional[int] = None):
+        self.max_frames = frames
+        self.max_bytes = nbytes
+        self._frames = 0
+        self._bytes = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    @property
+    def frames(self) -> int:
+        return self._frames
+
+    @property
+    def nbytes(self) -> int:
+        return self._bytes
+
+    def _full(self, nbytes: int) -> bool:
+        if self._frames == 0:
+            return False
+        if self.max_frames is not None and self._frames >= self.max_frames:
+            return True
+        return self.max_bytes is not None and self._bytes + nbytes > self.max_bytes
+
+    def acquire(self, nbytes: int = 0) -> None:
+        """Waits for room in the window. Raises WindowClosed once the window is closed."""
+        with self._cond:
+            while not self._closed and self._full(nbytes):
+                self._cond.wait()
+
+            if self._closed:
+                raise WindowClosed()
+
+            self._frames += 1
+            self._bytes += nbytes
+
+    def release(self, nbytes: int = 0) -> None:
+        with self._cond:
+            self._frames = max(0, self._frames - 1)
+            self._bytes = max(0, self._bytes - nbytes)
+            self._cond.notify_all()
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
@@ -0,0 +1,117 @@
+import concurrent.futures as conc
+import functools
+import os
+import threading
+from typing import AbstractSet, Collection, Dict, FrozenSet, List, Mapping, Optional, Tuple, Union
+
+from qcmd.core import logevent
+
+VIDEO = "video"
+IMAGER = "imager"
+SCREEN = "screen"
+DISPLAY = "display"
+# the asyncio event loop, which serves gRPC
+LOOP = "loop"
+
+PROCESSORS = (VIDEO, IMAGER, SCREEN, DISPLAY)
+
+
+def parse_cpus(spec: str) -> FrozenSet[int]:
+    """Parses a CPU list such as "0-2,5" into a set of CPU numbers."""
+    cpus = set()
+    for part in spec.split(","):
+        first, _, last = part.strip().partition("-")
+        cpus.update(range(int(first), int(last or first) + 1))
+    if not cpus:
+        raise ValueError(f"no CPUs in {spec!r}")
+    return frozenset(cpus)
+
+
+def parse_affinity(spec: str) -> Tuple[str, FrozenSet[int]]:
+    """Parses "name=cpus", such as "video=2-3", for a processor or the loop."""
+    name, _, cpus = spec.partition("=")
+    name = name.strip().lower()
+    if name not in PROCESSORS + (LOOP,):
+        raise ValueError(f"unknown processor {name!r}, expected one of {PROCESSORS + (LOOP,)}")
+    return name, parse_cpus(cpus)
+
+
+def pin(cpus: AbstractSet[int]) -> None:
+    """Pins the calling thread to cpus, where the platform allows it."""
+    try:
+        os.sched_setaffinity(0, cpus)
+    except (AttributeError, OSError) as ex:
+        logevent("AFFINITY", f"could not pin {threading.current_thread().name} to {cpus}", ex)
+
+
+class Executors:
+    """Hands each processor a thread pool of its own, so a blocking SPI refresh or a long decode
+    can never hold the thread another processor needs.
+
+    A processor runs its commands one at a time on one thread, and one more when it has a lane
+    (see metrics.MeteredProcessor). Its threads are pinned to the CPUs affinity gives for its
+    kind, if any. Given threads, every processor shares one pool of that many instead, as they
+    all used to, and without lanes.
+    """
+
+    def __init__(
+        self,
+        threads: Optional[int] = None,
+        affinity: Optional[Mapping[str, AbstractSet[int]]] = None,
+        lanes: Collection[str] = (),
+    ):
+        self.affinity = dict(affinity or {})
+        self.lanes = frozenset(lanes)
+        self._shared = (
+            conc.ThreadPoolExecutor(threads, thread_name_prefix="Server") if threads else None
+        )
+        self._executors: List[conc.ThreadPoolExecutor] = []
+        self._counts: Dict[str, int] = {}
+
+    def executor(self, kind: str) -> conc.Executor:
+        """Returns the executor for a new processor of kind."""
+        if self._shared:
+            return self._shared
+
+        count = self._counts.get(kind, 0)
+        self._counts[kind] = count + 1
+        cpus = self.affinity.get(kind)
+        executor = conc.ThreadPoolExecutor(
+            2 if kind in self.lanes else 1,
+            thread_name_prefix=f"{kind.capitalize()}{count}",
+            initializer=functools.partial(pin, cpus) if cpus else None,
+        )
+        self._executors.append(executor)
+        return executor
+
+    def lane(self, kind: str) -> bool:
+        # a lane's thread is only sure to be there in a pool of the processor's own
+        return kind in self.lanes and not self._shared
+
+    def pin_loop(self) -> None:
+        """Pins the calling thread, the event loop's, to the loop's CPUs. Threads it starts
+        later, such as the prefetcher's, run on those too."""
+        cpus = self.affinity.get(LOOP)
+        if cpus:
+            pin(cpus)
+
+    def shutdown(self) -> None:
+        for executor in self._executors:
+            executor.shutdown()
+        if self._shared:
+            self._shared.shutdown()
+
+    def __enter__(self) -> "Executors":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.shutdown()
+
+
+def executor_for(
+    executor: Union[conc.Executor, Executors], kind: str
+) -> Tuple[conc.Executor, bool]:
+    """Returns the executor for a new processor of kind, and whether it has a lane."""
+    if isinstance(executor, Executors):
+        return executor.executor(kind), executor.lane(kind)
+    return executor, False
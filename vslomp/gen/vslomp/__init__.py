@@ -2,7 +2,7 @@
 # sources: player.proto
 # plugin: python-betterproto
 from dataclasses import dataclass
-from typing import AsyncIterator, Optional
+from typing import AsyncIterator, List, Optional
 
 import betterproto
 import grpclib
@@ -24,6 +24,8 @@ class Open(betterproto.Message):
     start: Optional[int] = betterproto.message_field(5, wraps=betterproto.TYPE_INT32)
     stop: Optional[int] = betterproto.message_field(6, wraps=betterproto.TYPE_INT32)
     step: Optional[int] = betterproto.message_field(7, wraps=betterproto.TYPE_INT32)
+    resume: bool = betterproto.bool_field(8)
+    dither: str = betterproto.string_field(9)
 
     def __post_init__(self) -> None:
         super().__post_init__()
@@ -35,6 +37,132 @@ class OpenResult(betterproto.Message):
     ok: bool = betterproto.bool_field(2)
     err: str = betterproto.string_field(3)
     frame_count: int = betterproto.uint32_field(4, group="data")
+    skipped_frames: int = betterproto.uint32_field(5)
+    partial_refreshes: int = betterproto.uint32_field(6)
+    # the playlist item the result is for
+    item: int = betterproto.uint32_field(7)
+
+    def __post_init__(self) -> None:
+        super().__post_init__()
+
+
+@dataclass(eq=False, repr=False)
+class Playlist(betterproto.Message):
+    # played in order, each opened in the background while the one before it plays
+    items: List["Open"] = betterproto.message_field(1)
+    # starts over with the first item after the last
+    repeat: bool = betterproto.bool_field(2)
+
+    def __post_init__(self) -> None:
+        super().__post_init__()
+
+
+@dataclass(eq=False, repr=False)
+class StatsRequest(betterproto.Message):
+    # clears the counters after reading them
+    reset: bool = betterproto.bool_field(1)
+
+    def __post_init__(self) -> None:
+        super().__post_init__()
+
+
+@dataclass(eq=False, repr=False)
+class HistogramBucket(betterproto.Message):
+    # upper bound in seconds, +Inf for the last bucket
+    le: float = betterproto.double_field(1)
+    # cumulative count of observations at or below le
+    count: int = betterproto.uint64_field(2)
+
+    def __post_init__(self) -> None:
+        super().__post_init__()
+
+
+@dataclass(eq=False, repr=False)
+class CommandStats(betterproto.Message):
+    processor: str = betterproto.string_field(1)
+    command: str = betterproto.string_field(2)
+    count: int = betterproto.uint64_field(3)
+    errors: int = betterproto.uint64_field(4)
+    exec_seconds: float = betterproto.double_field(5)
+    wait_seconds: float = betterproto.double_field(6)
+    exec_buckets: List["HistogramBucket"] = betterproto.message_field(7)
+    wait_buckets: List["HistogramBucket"] = betterproto.message_field(8)
+
+    def __post_init__(self) -> None:
+        super().__post_init__()
+
+
+@dataclass(eq=False, repr=False)
+class QueueStats(betterproto.Message):
+    name: str = betterproto.string_field(1)
+    depth: int = betterproto.uint32_field(2)
+    max_depth: int = betterproto.uint32_field(3)
+
+    def __post_init__(self) -> None:
+        super().__post_init__()
+
+
+@dataclass(eq=False, repr=False)
+class StatsResult(betterproto.Message):
+    commands: List["CommandStats"] = betterproto.message_field(1)
+    queues: List["QueueStats"] = betterproto.message_field(2)
+
+    def __post_init__(self) -> None:
+        super().__post_init__()
+
+
+@dataclass(eq=False, repr=False)
+class TraceRequest(betterproto.Message):
+    # turns span recording on or off, or leaves it as it is when unset
+    enabled: Optional[bool] = betterproto.message_field(1, wraps=betterproto.TYPE_BOOL)
+    # drops the recorded spans after exporting them
+    clear: bool = betterproto.bool_field(2)
+
+    def __post_init__(self) -> None:
+        super().__post_init__()
+
+
+@dataclass(eq=False, repr=False)
+class TraceResult(betterproto.Message):
+    enabled: bool = betterproto.bool_field(1)
+    spans: int = betterproto.uint32_field(2)
+    # Chrome/Perfetto trace-event JSON
+    chrome_trace: str = betterproto.string_field(3)
+
+    def __post_init__(self) -> None:
+        super().__post_init__()
+
+
+@dataclass(eq=False, repr=False)
+class StopRequest(betterproto.Message):
+    pass
+
+    def __post_init__(self) -> None:
+        super().__post_init__()
+
+
+@dataclass(eq=False, repr=False)
+class PauseRequest(betterproto.Message):
+    # pauses the playing video, or resumes it when false
+    paused: bool = betterproto.bool_field(1)
+
+    def __post_init__(self) -> None:
+        super().__post_init__()
+
+
+@dataclass(eq=False, repr=False)
+class SeekRequest(betterproto.Message):
+    # the frame to go on from, numbered as in OpenResult.frame_count
+    frame: int = betterproto.uint32_field(1)
+
+    def __post_init__(self) -> None:
+        super().__post_init__()
+
+
+@dataclass(eq=False, repr=False)
+class ControlResult(betterproto.Message):
+    ok: bool = betterproto.bool_field(1)
+    err: str = betterproto.string_field(2)
 
     def __post_init__(self) -> None:
         super().__post_init__()
@@ -51,6 +179,8 @@ class PlayerServiceStub(betterproto.ServiceStub):
         start: Optional[int] = None,
         stop: Optional[int] = None,
         step: Optional[int] = None,
+        resume: bool = False,
+        dither: str = "",
     ) -> AsyncIterator["OpenResult"]:
 
         request = Open()
@@ -66,6 +196,8 @@ class PlayerServiceStub(betterproto.ServiceStub):
             request.stop = stop
         if step is not None:
             request.step = step
+        request.resume = resume
+        request.dither = dither
 
         async for response in self._unary_stream(
             "/vslomp.PlayerService/Open",
@@ -73,3 +205,56 @@ class PlayerServiceStub(betterproto.ServiceStub):
             OpenResult,
         ):
             yield response
+
+    async def playlist(
+        self, *, items: Optional[List["Open"]] = None, repeat: bool = False
+    ) -> AsyncIterator["OpenResult"]:
+        if items is None:
+            items = []
+
+        request = Playlist()
+        request.items = items
+        request.repeat = repeat
+
+        async for response in self._unary_stream(
+            "/vslomp.PlayerService/Playlist",
+            request,
+            OpenResult,
+        ):
+            yield response
+
+    async def stats(self, *, reset: bool = False) -> "StatsResult":
+
+        request = StatsRequest()
+        request.reset = reset
+
+        return await self._unary_unary("/vslomp.PlayerService/Stats", request, StatsResult)
+
+    async def trace(self, *, enabled: Optional[bool] = None, clear: bool = False) -> "TraceResult":
+
+        request = TraceRequest()
+        if enabled is not None:
+            request.enabled = enabled
+        request.clear = clear
+
+        return await self._unary_unary("/vslomp.PlayerService/Trace", request, TraceResult)
+
+    async def stop(self) -> "ControlResult":
+
+        request = StopRequest()
+
+        return await self._unary_unary("/vslomp.PlayerService/Stop", request, ControlResult)
+
+    async def pause(self, *, paused: bool = False) -> "ControlResult":
+
+        request = PauseRequest()
+        request.paused = paused
+
+        return await self._unary_unary("/vslomp.PlayerService/Pause", request, ControlResult)
+
+    async def seek(self, *, frame: int = 0) -> "ControlResult":
+
+        request = SeekRequest()
+        request.frame = frame
+
+        return await self._unary_unary("/vslomp.PlayerService/Seek", request, ControlResult)
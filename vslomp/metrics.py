@@ -0,0 +1,339 @@
+import asyncio
+import bisect
+import queue
+import threading
+import time
+from typing import (
+    Any,
+    Callable,
+    ClassVar,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
+
+import qcmd.core as core
+import qcmd.processors.executor as q
+
+import vslomp.tracing as tracing
+
+CmdId = TypeVar("CmdId")
+X = TypeVar("X")
+
+# commands sent at this priority or higher (a lower number) run on the processor's lane, when it
+# has one; they must be safe to run alongside whatever the processor is running
+LANE_PRI = 5
+
+# upper bounds, in seconds, of the latency histogram buckets
+BUCKETS: Sequence[float] = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+class Histogram:
+    def __init__(self, buckets: Sequence[float] = BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.total += seconds
+
+    def cumulative(self) -> List[Tuple[float, int]]:
+        """Returns (upper bound, observations at or below it) pairs, ending with +Inf."""
+        out = []
+        running = 0
+        for le, count in zip(list(self.buckets) + [float("inf")], self.counts):
+            running += count
+            out.append((le, running))
+        return out
+
+
+class CommandMetrics(NamedTuple):
+    processor: str
+    command: str
+    errors: int
+    exec_seconds: Histogram
+    wait_seconds: Histogram
+
+
+class QueueMetrics(NamedTuple):
+    name: str
+    depth: int
+    max_depth: int
+
+
+class Registry:
+    """Collects command latencies and queue depths from every processor in the player."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._commands: Dict[Tuple[str, str], CommandMetrics] = {}
+        self._queues: Dict[str, Callable[[], int]] = {}
+        self._max_depth: Dict[str, int] = {}
+
+    def observe(self, processor: str, command: str, wait: float, took: float, ok: bool) -> None:
+        key = (processor, command)
+        with self._lock:
+            metrics = self._commands.get(key)
+            if metrics is None:
+                metrics = CommandMetrics(processor, command, 0, Histogram(), Histogram())
+            if not ok:
+                metrics = metrics._replace(errors=metrics.errors + 1)
+            metrics.exec_seconds.observe(took)
+            metrics.wait_seconds.observe(wait)
+            self._commands[key] = metrics
+
+    def track_queue(self, name: str, depth: Callable[[], int]) -> None:
+        with self._lock:
+            self._queues[name] = depth
+
+    def sample_queue(self, name: str, depth: int) -> None:
+        with self._lock:
+            self._max_depth[name] = max(depth, self._max_depth.get(name, 0))
+
+    def commands(self) -> List[CommandMetrics]:
+        with self._lock:
+            return sorted(self._commands.values(), key=lambda m: (m.processor, m.command))
+
+    def queues(self) -> List[QueueMetrics]:
+        with self._lock:
+            tracked = sorted(self._queues.items())
+            max_depth = dict(self._max_depth)
+
+        out = []
+        for name, depth in tracked:
+            current = depth()
+            out.append(QueueMetrics(name, current, max(current, max_depth.get(name, 0))))
+        return out
+
+    def reset(self) -> None:
+        with self._lock:
+            self._commands.clear()
+            self._max_depth.clear()
+
+
+REGISTRY = Registry()
+
+
+def _command_name(cmd: Any) -> str:
+    cmdid = getattr(cmd, "cmdid", None)
+    return cmdid.name if cmdid is not None else type(cmd).__name__
+
+
+class _Metered(q.Command[Any, Any, Any]):
+    def __init__(self, cmd: q.Command[Any, Any, Any], processor: "MeteredProcessor"):
+        self.cmd = cmd
+        self.processor = processor
+        self.sent = time.perf_counter()
+        self.started = self.executed = self.sent
+        self.ok = False
+
+    def get_handle(
+        self, pri: int, entry: int, tags: core.Tags = [], procname: Optional[str] = None
+    ):
+        return self.cmd.get_handle(pri, entry, tags, procname)
+
+    def __call__(self, hcmd: q.CommandHandle[Any, Any], cxt: Any) -> None:
+        self.started = time.perf_counter()
+        try:
+            super().__call__(hcmd, cxt)
+        finally:
+            self.processor.done(self, hcmd, time.perf_counter())
+
+    def exec(self, hcmd: q.CommandHandle[Any, Any], cxt: Any) -> Any:
+        try:
+            result = self.cmd.exec(hcmd, cxt)
+            self.ok = True
+            return result
+        finally:
+            self.executed = time.perf_counter()
+
+    def __repr__(self) -> str:
+        return repr(self.cmd)
+
+
+class MeteredProcessor(q.Processor[Any, Any]):
+    """A Processor that records each command's queue wait and run time, and its queue depth.
+
+    Each command is also handed to the tracer as a span, which keeps it while tracing is on.
+
+    With a lane, commands sent at LANE_PRI or higher run in order on a second thread from
+    executor instead, so they do not wait behind a long command or a full queue.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        executor: Any,
+        cxt: Any = None,
+        registry: Registry = REGISTRY,
+        tracer: tracing.Tracer = tracing.TRACER,
+        lane: bool = False,
+    ):
+        self.name = name
+        self.registry = registry
+        self.tracer = tracer
+        self._lane: "Optional[queue.Queue[Tuple[q.CommandHandle[Any, Any], Any]]]" = None
+        super().__init__(name, executor, cxt)
+        registry.track_queue(name, self._q.qsize)
+        if lane:
+            self._lane = queue.Queue()
+            registry.track_queue(f"{name}.lane", self._lane.qsize)
+            executor.submit(self._consume_lane)
+
+    def send(self, cmd: q.Command[Any, Any, Any], pri: int = 50, tags: core.Tags = ()):
+        if self._lane is not None and pri <= LANE_PRI:
+            metered = _Metered(cmd, self)
+            hcmd = metered.get_handle(pri, self._entry, tags, self._name)
+            self._entry += 1
+            self._lane.put((hcmd, metered))
+            core.logevent("RCVD", hcmd)
+            return hcmd
+        hcmd = super().send(_Metered(cmd, self), pri, tags)
+        self.registry.sample_queue(self.name, self._q.qsize())
+        return hcmd
+
+    def join(self) -> None:
+        if self._lane is not None:
+            self._lane.join()
+        super().join()
+
+    def halt(self) -> None:
+        if self._lane is not None:
+            self._lane.put((core.CommandHandle(0, 0, None), None))
+        super().halt()
+
+    def _consume_lane(self) -> None:
+        assert self._lane is not None
+        while self._qevent.wait():
+            hcmd, cmd = self._lane.get()
+            try:
+                if cmd is None:
+                    break
+                core.logevent("EXEC", cmd)
+                cmd(hcmd, self._cxt)
+            except Exception as ex:
+                core.logevent("ERRR", hcmd, ex.__cause__)
+            finally:
+                self._lane.task_done()
+
+    def done(self, cmd: _Metered, hcmd: q.CommandHandle[Any, Any], ended: float) -> None:
+        command = _command_name(cmd.cmd)
+        self.registry.observe(
+            self.name, command, cmd.started - cmd.sent, cmd.executed - cmd.started, cmd.ok
+        )
+        self.tracer.record(
+            tracing.Span(
+                self.name,
+                command,
+                tuple(hcmd.tags),
+                threading.current_thread().name,
+                cmd.sent,
+                cmd.started,
+                cmd.executed,
+                ended,
+                cmd.ok,
+            )
+        )
+
+
+class ProcessorFactory(q.ProcessorFactory[CmdId, X]):
+    procname: ClassVar[str] = "Proc"
+
+    def __init__(self, executor: Any, cxt: X, lane: bool = False):
+        # set first, as the processor is created while the base class initializes
+        self.lane = lane
+        super().__init__(executor, cxt)
+
+    def create(self, cxt: X) -> q.Processor[CmdId, X]:
+        return MeteredProcessor(self.procname, self._executor, cxt, lane=self.lane)
+
+
+def _labels(**labels: Any) -> str:
+    return ",".join(f'{key}="{val}"' for key, val in labels.items())
+
+
+def _histogram_lines(name: str, labels: str, hist: Histogram) -> List[str]:
+    lines = []
+    for le, count in hist.cumulative():
+        bound = "+Inf" if le == float("inf") else repr(le)
+        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+    lines.append(f"{name}_sum{{{labels}}} {hist.total}")
+    lines.append(f"{name}_count{{{labels}}} {hist.count}")
+    return lines
+
+
+def prometheus_text(registry: Registry = REGISTRY) -> str:
+    """Renders the registry in the Prometheus text exposition format."""
+    commands = registry.commands()
+    queues = registry.queues()
+
+    lines = ["# TYPE vslomp_command_seconds histogram"]
+    for m in commands:
+        labels = _labels(processor=m.processor, command=m.command)
+        lines.extend(_histogram_lines("vslomp_command_seconds", labels, m.exec_seconds))
+
+    lines.append("# TYPE vslomp_command_wait_seconds histogram")
+    for m in commands:
+        labels = _labels(processor=m.processor, command=m.command)
+        lines.extend(_histogram_lines("vslomp_command_wait_seconds", labels, m.wait_seconds))
+
+    lines.append("# TYPE vslomp_command_errors_total counter")
+    for m in commands:
+        labels = _labels(processor=m.processor, command=m.command)
+        lines.append(f"vslomp_command_errors_total{{{labels}}} {m.errors}")
+
+    lines.append("# TYPE vslomp_queue_depth gauge")
+    for qm in queues:
+        lines.append(f"vslomp_queue_depth{{{_labels(queue=qm.name)}}} {qm.depth}")
+
+    lines.append("# TYPE vslomp_queue_max_depth gauge")
+    for qm in queues:
+        lines.append(f"vslomp_queue_max_depth{{{_labels(queue=qm.name)}}} {qm.max_depth}")
+
+    return "\n".join(lines) + "\n"
+
+
+async def serve_prometheus(
+    host: str, port: int, registry: Registry = REGISTRY
+) -> asyncio.AbstractServer:
+    """Serves prometheus_text over plain HTTP on every path."""
+
+    async def _handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            body = prometheus_text(registry).encode("utf-8")
+            writer.write(
+                b"HTTP/1.0 200 OK\r\n"
+                b"Content-Type: text/plain; version=0.0.4\r\n"
+                + f"Content-Length: {len(body)}\r\n\r\n".encode("ascii")
+                + body
+            )
+            await writer.drain()
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(_handle, host, port)
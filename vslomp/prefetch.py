@@ -0,0 +1,111 @@
+import concurrent.futures as conc
+import os
+import threading
+from pathlib import Path
+from typing import List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from PIL import Image
+
+import vslomp.gen.vslomp as gen
+from vslomp.archive import Archive, is_archive
+from vslomp.display.imager.dither import DEFAULT, check
+from vslomp.video.pool import ContainerPool
+from vslomp.video.proc import LoadResult, _load, _seek_frames, scaled_gray
+from vslomp.video.worker import render_image
+
+
+class Prefetched(NamedTuple):
+    loadresult: Union[LoadResult, Archive]
+    start: int
+    # the first frames from start; already dithered when every screen is the same size
+    head: Sequence[Image.Image] = ()
+
+
+def _lower_priority() -> None:
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 10)
+    except (AttributeError, OSError):
+        pass
+
+
+def _prefetch(
+    req: gen.Open,
+    sizes: Sequence[Tuple[int, int]],
+    frames: int,
+    cache_dir: Optional[Path],
+    scaled_decode: bool,
+    dither: str,
+    pool: Optional[ContainerPool] = None,
+) -> Prefetched:
+    if is_archive(req.video_path):
+        return Prefetched(Archive(req.video_path), 0)
+
+    load = pool.acquire if pool else _load
+    loadresult = load(
+        req.video_path,
+        req.vstream_idx if req.vstream_idx else 0,
+        "NONKEY",
+        cache_dir,
+        scaled_decode,
+    )
+    start = req.start if req.start else 0
+    # a resumed video starts wherever its checkpoint says once it is played
+    if req.resume or not loadresult.index or not frames:
+        return Prefetched(loadresult, start)
+
+    stop = req.stop if req.stop is not None else loadresult.index.frames
+    targets = range(start, stop, req.step if req.step else 1)[:frames]
+    bounds = (max(w for w, _ in sizes), max(h for _, h in sizes))
+    algorithm = check(req.dither or dither)
+
+    head: List[Image.Image] = []
+    for vframe in _seek_frames(loadresult, targets):
+        if len(set(sizes)) == 1:
+            head.append(render_image(vframe, sizes[0], scaled_decode, algorithm))
+        else:
+            head.append(scaled_gray(vframe, bounds) if scaled_decode else vframe.to_image())
+
+    return Prefetched(loadresult, start, head)
+
+
+class Prefetcher:
+    """Opens and indexes the next video of a playlist, and renders its first frames, on a
+    thread of its own at a lowered priority, so they are ready when the video comes up."""
+
+    def __init__(
+        self,
+        frames: int = 4,
+        cache_dir: Optional[Path] = None,
+        scaled_decode: bool = False,
+        dither: str = DEFAULT,
+        pool: Optional[ContainerPool] = None,
+    ):
+        self.frames = frames
+        self.cache_dir = cache_dir
+        self.scaled_decode = scaled_decode
+        # what frames are dithered with when the request does not say
+        self.dither = dither
+        # the video processor's pool, which the prefetched video is given back to when unloaded
+        self.pool = pool
+        self._executor: Optional[conc.ThreadPoolExecutor] = None
+
+    def start(self, req: gen.Open, sizes: Sequence[Tuple[int, int]]) -> "conc.Future[Prefetched]":
+        if self._executor is None:
+            self._executor = conc.ThreadPoolExecutor(
+                1, thread_name_prefix="Prefetch", initializer=_lower_priority
+            )
+        return self._executor.submit(
+            _prefetch,
+            req,
+            sizes,
+            self.frames,
+            self.cache_dir,
+            self.scaled_decode,
+            self.dither,
+            self.pool,
+        )
+
+    def close(self) -> None:
+        if self._executor:
+            self._executor.shutdown(wait=False)
+            self._executor = None
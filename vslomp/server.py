@@ -1,39 +1,224 @@
 import asyncio
-from typing import Any, AsyncIterator, Awaitable, Optional, Tuple, Union
+import concurrent.futures as conc
+import functools
+from pathlib import Path
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 
 import protoflux.servicer as flux
+import qcmd.processors.executor as q
 from PIL import Image
-from qcmd.core import CommandHandle
+from qcmd.core import Command, CommandHandle, Tags, logevent
 
+import vslomp.display.imager.dither as dithering
 import vslomp.display.proc as disp
 import vslomp.gen.vslomp as gen
+import vslomp.metrics as metrics
+import vslomp.tracing as tracing
 import vslomp.video.proc as vid
+from vslomp.archive import Archive, is_archive
+from vslomp.checkpoint import Checkpoint, Checkpointer
+from vslomp.display.fanout import Fanout, FrameGather, countdown
+from vslomp.display.pacing import RenderPacer
+from vslomp.display.window import FrameWindow
+from vslomp.prefetch import Prefetched, Prefetcher
+from vslomp.session import PlaybackSession
+from vslomp.video.pool import ContainerPool
 from vslomp.video.proc import LoadResult
+from vslomp.video.worker import RenderPool, RenderSpec
+
+_PREEMPTED = "preempted by a newer Open"
+_STOPPED = "stopped"
+_NOT_PLAYING = "no video is playing"
+
+
+class PlayerOptions(NamedTuple):
+    # frames (and bytes) decoded ahead of the screen before decoding pauses
+    lookahead_frames: Optional[int] = 4
+    lookahead_bytes: Optional[int] = None
+    # start rendering each frame just before its display deadline instead of right away
+    jit: bool = False
+    # where frame indexes and playback checkpoints are kept
+    cache_dir: Optional[Path] = None
+    # decode and render in this many worker processes instead of the shared thread pool
+    workers: int = 0
+    # decode on several codec threads, straight to grayscale at the screen size
+    scaled_decode: bool = False
+    # frames of the next playlist video to render while the current one plays
+    prefetch_frames: int = 4
+    # how frames are dithered when an Open does not say
+    dither: str = dithering.DEFAULT
+    # size, dither and pack each frame in one imager step instead of one per stage
+    fused_render: bool = True
 
 
 @flux.grpc_service("vslomp.PlayerService")
 class PlayerService:
-    def __init__(self, disp: disp.DisplayProcessor, vid: vid.VideoProcessor) -> None:
-        self.dp = disp
+    def __init__(
+        self,
+        disp: Union[disp.DisplayProcessor, Sequence[disp.DisplayProcessor]],
+        vid: vid.VideoProcessor,
+        options: PlayerOptions = PlayerOptions(),
+        pool: Optional[ContainerPool] = None,
+    ) -> None:
+        # every display shows the same frames; the first one paces the decoder
+        self.displays = list(disp) if isinstance(disp, Sequence) else [disp]
+        self.dp = self.displays[0]
         self.vp = vid
+        self.options = options
+        self._session: Optional[PlaybackSession] = None
+        self._session_done: Optional[asyncio.Event] = None
+        # the video processor's container pool, which prefetched videos are loaded from too
+        self._prefetcher = Prefetcher(
+            options.prefetch_frames,
+            options.cache_dir,
+            options.scaled_decode,
+            options.dither,
+            pool,
+        )
 
-    @flux.grpc_method  # type:ignore
+    @flux.grpc_method  # type: ignore
     async def open(self, req: gen.Open) -> AsyncIterator[gen.OpenResult]:
-        loop = asyncio.get_running_loop()
+        async for res in self._run([req]):
+            yield res
 
-        if req.screen_path:
-            ok, res = await wait_for_cmd(self.dp.send(disp.Cmd.Splashscreen(req.screen_path)))
+    @flux.grpc_method  # type: ignore
+    async def playlist(self, req: gen.Playlist) -> AsyncIterator[gen.OpenResult]:
+        async for res in self._run(req.items, req.repeat):
+            yield res
 
-            yield gen.OpenResult(action=gen.OpenResultAction.SPLASH_SCREEN, ok=ok, err=str(res))
+    async def _run(
+        self, reqs: Sequence[gen.Open], repeat: bool = False
+    ) -> AsyncIterator[gen.OpenResult]:
+        """Plays each of reqs in turn, opening the next one in the background while one plays."""
+        if not reqs:
+            return
 
-        ok, res = await wait_for_cmd(
-            self.vp.send(
-                vid.Cmd.Load(req.video_path, req.vstream_idx if req.vstream_idx else 0, "NONKEY")
+        session = PlaybackSession()
+        previous, previous_done = self._session, self._session_done
+        done = asyncio.Event()
+        self._session, self._session_done = session, done
+        prefetch: "Optional[conc.Future[Prefetched]]" = None
+        prefetched: Optional[Prefetched] = None
+
+        try:
+            if previous:
+                # a newer Open takes over the screen once the running one has drained
+                previous.cancel(_PREEMPTED)
+                await previous_done.wait()
+
+            if session.cancelled:
+                yield gen.OpenResult(
+                    action=gen.OpenResultAction.PLAY_VIDEO, ok=False, err=_PREEMPTED
+                )
+                return
+
+            x = 0
+            seek_to: Optional[int] = None
+            while True:
+                following = x + 1 if x + 1 < len(reqs) else (0 if repeat else None)
+                if following is not None and prefetch is None:
+                    prefetch = self._prefetcher.start(reqs[following], await self._sizes())
+
+                async for res in self._play(session, reqs[x], seek_to, prefetched):
+                    if len(reqs) > 1:
+                        res.item = x
+                    yield res
+                prefetched = None
+
+                if session.reason is not None or self._session is not session:
+                    break
+
+                seek_to = session.seek_to
+                if seek_to is None:
+                    # played out, so on to the next video, which should be open by now
+                    if following is None or prefetch is None:
+                        break
+                    x = following
+                    prefetched = await self._prefetched(prefetch)
+                    prefetch = None
+
+                # a Seek, or the next video, plays under a fresh session, still paused if the
+                # last one was
+                session.cancel()
+                if session.loadresult is not None:
+                    self.vp.send(vid.Cmd.Unload(session.loadresult))
+                paused = session.paused
+                session = PlaybackSession()
+                session.paused = paused
+                self._session = session
+        finally:
+            session.cancel()
+            if session.loadresult is not None:
+                self.vp.send(vid.Cmd.Unload(session.loadresult))
+            if prefetch:
+                self._discard(prefetch)
+            if prefetched and prefetched.loadresult is not session.loadresult:
+                self.vp.send(vid.Cmd.Unload(prefetched.loadresult))
+            done.set()
+
+    async def _sizes(self) -> List[Tuple[int, int]]:
+        return [
+            size
+            for _, size in await asyncio.gather(
+                # on the lane, so it does not wait behind a Finish draining the last video
+                *(
+                    wait_for_cmd(dp, disp.Cmd.GET_SCREEN_SIZE, metrics.LANE_PRI)
+                    for dp in self.displays
+                )
             )
-        )
+        ]
+
+    async def _prefetched(self, prefetch: "conc.Future[Prefetched]") -> Optional[Prefetched]:
+        try:
+            return await asyncio.wrap_future(prefetch)
+        except Exception as ex:
+            # the video is loaded again when it is played, and the error reported then
+            logevent("PREFETCH", "prefetching the next video failed", ex)
+            return None
+
+    def _discard(self, prefetch: "conc.Future[Prefetched]") -> None:
+        def _unload(future: "conc.Future[Prefetched]"):
+            if not future.cancelled() and future.exception() is None:
+                self.vp.send(vid.Cmd.Unload(future.result().loadresult))
+
+        if not prefetch.cancel():
+            prefetch.add_done_callback(_unload)
+
+    async def _play(
+        self,
+        session: PlaybackSession,
+        req: gen.Open,
+        seek_to: Optional[int] = None,
+        prefetched: Optional[Prefetched] = None,
+    ) -> AsyncIterator[gen.OpenResult]:
+        loop = asyncio.get_running_loop()
+
+        try:
+            dither = dithering.check(req.dither or self.options.dither)
+        except ValueError as ex:
+            yield gen.OpenResult(action=gen.OpenResultAction.PLAY_VIDEO, ok=False, err=str(ex))
+            return
 
-        if ok and isinstance(res, LoadResult):
+        if req.screen_path and seek_to is None:
+            ok, res = await self._all(lambda dp: disp.Cmd.Splashscreen(req.screen_path, dither))
+
+            yield gen.OpenResult(action=gen.OpenResultAction.SPLASH_SCREEN, ok=ok, err=str(res))
+
+        ok, res = await self._load(req, prefetched)
+        if ok and isinstance(res, (LoadResult, Archive)):
             load_result = res
+            session.loadresult = load_result
             yield gen.OpenResult(
                 action=gen.OpenResultAction.LOAD_VIDEO, ok=True, frame_count=load_result.frames
             )
@@ -41,42 +226,371 @@ class PlayerService:
             yield gen.OpenResult(action=gen.OpenResultAction.LOAD_VIDEO, ok=False, err=str(res))
             return
 
+        checkpointer = Checkpointer.for_video(req.video_path, self.options.cache_dir)
+        start = _start(req, load_result, seek_to, checkpointer)
+
+        sizes = await self._sizes()
+        fanout = Fanout(self.displays, sizes)
+        sessions = [session] + [session.child() for _ in self.displays[1:]]
+
+        if isinstance(load_result, Archive) and any(size != load_result.size for size in sizes):
+            yield gen.OpenResult(
+                action=gen.OpenResultAction.PLAY_VIDEO,
+                ok=False,
+                err=f"the archive was baked for {load_result.size}, not for every screen",
+            )
+            return
+
+        frame_pts = _frame_pts(load_result)
         frame_iter = _FrameIterator(load_result.frames)
 
         def __push(val: Union[int, str]):
             loop.call_soon_threadsafe(lambda: frame_iter.push(val))
 
-        ok, res = await wait_for_cmd(
-            self.dp.send(disp.Cmd.InitVideo(lambda fr: __push(fr), req.frame_wait))
+        def _ondisplay(fr: int):
+            pts = frame_pts[fr] if frame_pts and fr < len(frame_pts) else None
+            if checkpointer:
+                checkpointer.save(Checkpoint(fr, pts))
+            __push(fr)
+
+        session.oncancel(lambda: __push(session.reason))
+
+        pacer = RenderPacer() if self.options.jit else None
+        if pacer:
+            session.oncancel(pacer.close)
+
+        ondisplay = FrameGather(len(self.displays), _ondisplay)
+        ok, res = await self._all(
+            lambda dp: disp.Cmd.InitVideo(
+                sessions[self.displays.index(dp)],
+                ondisplay,
+                req.frame_wait,
+                onschedule=pacer.schedule if pacer and dp is self.dp else None,
+            )
         )
 
         if not ok:
             yield gen.OpenResult(action=gen.OpenResultAction.PLAY_VIDEO, ok=False, err=str(res))
             return
 
-        def _onimage(img: Image.Image, fr: int, tags: Any):
-            self.dp.send(disp.Cmd.Display(img, fr), tags=tags).or_err(
-                lambda ex, t: __push(str(ex))
-            )
+        def _onsteps(steps: int):
+            loop.call_soon_threadsafe(frame_iter.total_steps, steps)
+
+        pool = self._sink(
+            req,
+            sessions,
+            fanout,
+            load_result,
+            start,
+            dither,
+            pacer,
+            prefetched,
+            __push,
+            _onsteps,
+        )
 
-        self.vp.send(
-            vid.Cmd.GenerateImages(
-                load_result, _onimage, start=req.start, stop=req.stop, step=req.step
+        for dp, dsession in zip(self.displays, sessions):
+            dp.send(disp.Cmd.Finish(dsession), pri=100)
+
+        try:
+            async for res in frame_iter:
+                yield res
+        finally:
+            if pool:
+                pool.close()
+            if checkpointer:
+                checkpointer.flush()
+
+        if not session.cancelled:
+            yield await self._played()
+
+    async def _load(
+        self, req: gen.Open, prefetched: Optional[Prefetched]
+    ) -> Tuple[bool, Union[Exception, Any]]:
+        if prefetched:
+            return True, prefetched.loadresult
+
+        if is_archive(req.video_path):
+            load_cmd: Any = vid.Cmd.LoadArchive(req.video_path)
+        else:
+            load_cmd = vid.Cmd.Load(
+                req.video_path,
+                req.vstream_idx if req.vstream_idx else 0,
+                "NONKEY",
+                threads=self.options.scaled_decode,
             )
-        ).then(lambda steps, tags: frame_iter.total_steps(steps))
+        return await wait_for_cmd(self.vp, load_cmd)
+
+    def _sink(
+        self,
+        req: gen.Open,
+        sessions: Sequence[PlaybackSession],
+        fanout: Fanout,
+        load_result: Union[LoadResult, Archive],
+        start: int,
+        dither: str,
+        pacer: Optional[RenderPacer],
+        prefetched: Optional[Prefetched],
+        push: Callable[[Union[int, str]], None],
+        onsteps: Callable[[int], None],
+    ) -> Optional[RenderPool]:
+        """Starts the frames of load_result on their way to the screens: baked buffers from an
+        archive, or frames decoded by worker processes or the video processor. Returns the
+        worker pool, if one is used."""
+        session = sessions[0]
+        sizes = fanout.sizes
+        window = FrameWindow(self.options.lookahead_frames, self.options.lookahead_bytes)
+        # unblocks the decoder if it is still waiting on the window
+        session.oncancel(window.close)
+
+        def _onerror(ex: Exception):
+            push(str(ex))
 
-        self.dp.send(disp.Cmd.FINISH, pri=100)
-
-        async for res in frame_iter:
-            yield res
-
-        self.vp.join()
-        self.dp.join()
+        def _onimage(img: Image.Image, fr: int, tags: Any):
+            nbytes = img.width * img.height * len(img.getbands())
+            window.acquire(nbytes)
+            release = functools.partial(window.release, nbytes)
+            onready = pacer.ready if pacer else None
+            if len(self.displays) == 1:
+                self.dp.send(
+                    disp.Cmd.Display(
+                        session, img, fr, release, onready, dither, self.options.fused_render
+                    ),
+                    tags=[("frame", fr)],
+                ).or_err(lambda ex, t: push(str(ex)))
+            else:
+                # one decode for every screen, sized and dithered once per screen size
+                fanout.send_image(
+                    sessions,
+                    img,
+                    fr,
+                    countdown(len(self.displays), release),
+                    countdown(len(fanout.groups), onready),
+                    _onerror,
+                    dither,
+                    self.options.fused_render,
+                )
+
+        def _onbuffer(buf: memoryview, fr: int, tags: Any):
+            window.acquire(len(buf))
+            release = functools.partial(window.release, len(buf))
+            fanout.send_buffer(sessions, buf, fr, countdown(len(self.displays), release), _onerror)
+
+        def _onpooled(buf: memoryview, fr: int, release: Callable[[], None]):
+            fanout.send_buffer(sessions, buf, fr, countdown(len(self.displays), release), _onerror)
+
+        if isinstance(load_result, Archive):
+            # baked frames are already packed for the screen, so skip decode and dither
+            generate_cmd: Any = vid.Cmd.GenerateBuffers(
+                load_result, _onbuffer, start=start, stop=req.stop, step=req.step, session=session
+            )
+        elif self.options.workers and load_result.index and len(fanout.groups) == 1:
+            pool = RenderPool(
+                RenderSpec(
+                    req.video_path,
+                    req.vstream_idx if req.vstream_idx else 0,
+                    sizes[0],
+                    start=start,
+                    stop=req.stop,
+                    step=req.step if req.step else 1,
+                    cache_dir=self.options.cache_dir,
+                    scaled_decode=self.options.scaled_decode,
+                    dither=dither,
+                    threads=self.options.scaled_decode,
+                ),
+                self.options.workers,
+                self.options.lookahead_frames or self.options.workers * 2,
+            )
+            session.oncancel(pool.stop)
+            pool.start(_onpooled, onsteps, push)
+            return pool
+        else:
+            generate_cmd = vid.Cmd.GenerateImages(
+                load_result,
+                _onimage,
+                start=start,
+                stop=req.stop,
+                step=req.step,
+                pace=pacer.wait if pacer else None,
+                session=session,
+                # big enough for every screen; each one sizes it down the rest of the way
+                size=(
+                    (max(w for w, _ in sizes), max(h for _, h in sizes))
+                    if self.options.scaled_decode
+                    else None
+                ),
+                head=prefetched.head if prefetched and prefetched.start == (start or 0) else (),
+            )
 
-        yield gen.OpenResult(action=gen.OpenResultAction.PLAY_VIDEO, ok=True, err="***")
+        self.vp.send(generate_cmd).then(lambda steps, tags: onsteps(steps))
+        return None
 
+    async def _played(self) -> gen.OpenResult:
+        counts = [
+            res
+            for ok, res in await asyncio.gather(
+                *(wait_for_cmd(dp, disp.Cmd.GET_REFRESH_COUNTS) for dp in self.displays)
+            )
+            if ok
+        ]
+
+        return gen.OpenResult(
+            action=gen.OpenResultAction.PLAY_VIDEO,
+            ok=True,
+            err="***",
+            skipped_frames=sum(c.skipped for c in counts),
+            partial_refreshes=sum(c.partial for c in counts),
+        )
 
-def wait_for_cmd(h: CommandHandle[Any, Any]) -> Awaitable[Tuple[bool, Union[Exception, Any]]]:
+    async def _all(
+        self, make_cmd: Callable[[disp.DisplayProcessor], Any]
+    ) -> Tuple[bool, Union[Exception, Any]]:
+        """Sends a command to every display, and returns the first failure or the last result."""
+        results = await asyncio.gather(*(wait_for_cmd(dp, make_cmd(dp)) for dp in self.displays))
+        return next((res for res in results if not res[0]), results[-1])
+
+    @flux.grpc_method  # type: ignore
+    async def stop(self, req: gen.StopRequest) -> gen.ControlResult:
+        session = self._playing()
+        if session is None:
+            return gen.ControlResult(ok=False, err=_NOT_PLAYING)
+        session.cancel(_STOPPED)
+        return gen.ControlResult(ok=True)
+
+    @flux.grpc_method  # type: ignore
+    async def pause(self, req: gen.PauseRequest) -> gen.ControlResult:
+        session = self._playing()
+        if session is None:
+            return gen.ControlResult(ok=False, err=_NOT_PLAYING)
+        if req.paused:
+            session.pause()
+        else:
+            session.resume()
+        return gen.ControlResult(ok=True)
+
+    @flux.grpc_method  # type: ignore
+    async def seek(self, req: gen.SeekRequest) -> gen.ControlResult:
+        session = self._playing()
+        if session is None:
+            return gen.ControlResult(ok=False, err=_NOT_PLAYING)
+        session.seek_to = req.frame
+        # ends the session's stream quietly, and open() starts the next one at seek_to
+        session.cancel()
+        return gen.ControlResult(ok=True)
+
+    def _playing(self) -> Optional[PlaybackSession]:
+        session = self._session
+        return session if session and not session.cancelled else None
+
+    @flux.grpc_method  # type: ignore
+    async def stats(self, req: gen.StatsRequest) -> gen.StatsResult:
+        res = _stats_result(metrics.REGISTRY)
+        if req.reset:
+            metrics.REGISTRY.reset()
+        return res
+
+    @flux.grpc_method  # type: ignore
+    async def trace(self, req: gen.TraceRequest) -> gen.TraceResult:
+        tracer = tracing.TRACER
+        spans = len(tracer.spans())
+        res = gen.TraceResult(enabled=tracer.enabled, spans=spans, chrome_trace=tracer.dumps())
+        if req.clear:
+            tracer.clear()
+        if req.enabled is not None:
+            tracer.enabled = req.enabled
+            res.enabled = req.enabled
+        return res
+
+
+def _buckets(hist: metrics.Histogram) -> List[gen.HistogramBucket]:
+    return [gen.HistogramBucket(le=le, count=count) for le, count in hist.cumulative()]
+
+
+def _stats_result(registry: metrics.Registry) -> gen.StatsResult:
+    return gen.StatsResult(
+        commands=[
+            gen.CommandStats(
+                processor=m.processor,
+                command=m.command,
+                count=m.exec_seconds.count,
+                errors=m.errors,
+                exec_seconds=m.exec_seconds.total,
+                wait_seconds=m.wait_seconds.total,
+                exec_buckets=_buckets(m.exec_seconds),
+                wait_buckets=_buckets(m.wait_seconds),
+            )
+            for m in registry.commands()
+        ],
+        queues=[
+            gen.QueueStats(name=qm.name, depth=qm.depth, max_depth=qm.max_depth)
+            for qm in registry.queues()
+        ],
+    )
+
+
+def _start(
+    req: gen.Open,
+    load_result: Union[LoadResult, Archive],
+    seek_to: Optional[int],
+    checkpointer: Optional[Checkpointer],
+) -> int:
+    """Returns where playback starts: at a Seek's frame, after the checkpoint on a resume, or
+    where the request says."""
+    if seek_to is not None:
+        return _seek_start(load_result, seek_to)
+    if req.resume and checkpointer:
+        checkpoint = checkpointer.load()
+        if checkpoint:
+            return _resume_start(load_result, checkpoint, req.step)
+    return req.start if req.start else 0
+
+
+def _resume_start(
+    load_result: Union[LoadResult, Archive], checkpoint: Checkpoint, step: Optional[int]
+) -> int:
+    if isinstance(load_result, Archive):
+        return load_result.position_after(checkpoint.frame)
+    return checkpoint.frame + (step if step else 1)
+
+
+def _seek_start(load_result: Union[LoadResult, Archive], frame: int) -> int:
+    if isinstance(load_result, Archive):
+        return load_result.position_after(frame - 1)
+    return frame
+
+
+def _frame_pts(load_result: Union[LoadResult, Archive]) -> Optional[Sequence[int]]:
+    if isinstance(load_result, LoadResult) and load_result.index:
+        return load_result.index.addressable(load_result.skip_frame)
+    return None
+
+
+class _Awaited(Command[Any, Any, Any]):
+    """Wraps cmd so its handle has the callbacks before it is queued, and a command that runs
+    at once on an idle processor cannot finish before they are attached."""
+
+    def __init__(self, cmd: Command[Any, Any, Any], onresult: Any, onerror: Any):
+        self.cmd = cmd
+        self.cmdid = cmd.cmdid
+        self.onresult = onresult
+        self.onerror = onerror
+
+    def get_handle(
+        self, pri: int, entry: int, tags: Tags = [], procname: Optional[str] = None
+    ) -> CommandHandle[Any, Any]:
+        hcmd = self.cmd.get_handle(pri, entry, tags, procname)
+        return hcmd.then(self.onresult).or_err(self.onerror)
+
+    def exec(self, hcmd: CommandHandle[Any, Any], cxt: Any) -> Any:
+        return self.cmd.exec(hcmd, cxt)
+
+    def __repr__(self) -> str:
+        return repr(self.cmd)
+
+
+def wait_for_cmd(
+    proc: "q.Processor[Any, Any]", cmd: Command[Any, Any, Any], pri: int = 50
+) -> Awaitable[Tuple[bool, Union[Exception, Any]]]:
     loop = asyncio.get_running_loop()
     future = loop.create_future()
 
@@ -86,7 +600,7 @@ def wait_for_cmd(h: CommandHandle[Any, Any]) -> Awaitable[Tuple[bool, Union[Exce
     def _error(ex: Exception, t: disp.disp_utils.Tags):
         loop.call_soon_threadsafe(lambda: future.set_result((False, ex)))
 
-    h.then(_result).or_err(_error)
+    proc.send(_Awaited(cmd, _result, _error), pri)
 
     return future
 
@@ -95,7 +609,7 @@ class _FrameIterator(AsyncIterator[gen.OpenResult]):
     def __init__(self, frame_count: int):
         self._frame_count = frame_count
         self._stop = False
-        self._q: "asyncio.Queue[Union[int, str]]" = asyncio.Queue()
+        self._q: "asyncio.Queue[Union[int, str, None]]" = asyncio.Queue()
         self._num_steps = 0
         self._total_steps: Optional[int] = None
 
@@ -108,6 +622,9 @@ class _FrameIterator(AsyncIterator[gen.OpenResult]):
 
         curr = await self._q.get()
 
+        if curr is None:
+            raise StopAsyncIteration
+
         if isinstance(curr, str):
             self._stop = True
             return gen.OpenResult(action=gen.OpenResultAction.PLAY_VIDEO, ok=False, err=curr)
@@ -123,6 +640,9 @@ class _FrameIterator(AsyncIterator[gen.OpenResult]):
 
     def total_steps(self, steps: int):
         self._total_steps = steps
+        # the last frame may already have been shown if the decoder finished late
+        if self._num_steps > steps:
+            self._q.put_nowait(None)
 
-    def push(self, frame: Union[int, str]):
+    def push(self, frame: Union[int, str, None]):
         self._q.put_nowait(frame)
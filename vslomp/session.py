@@ -0,0 +1,138 @@
+import itertools
+import threading
+from queue import Empty, Queue
+from typing import Any, Callable, List, Optional
+
+from qcmd.core import logevent
+
+from vslomp.display.clock import FrameClock
+
+_ids = itertools.count(1)
+
+
+class PlaybackSession:
+    """The state one Open owns: its loaded video, the frames waiting for the screen, and the
+    clock that paces them.
+
+    Cancelling a session, whether it was preempted by a newer Open or has played out, stops
+    its clock, runs its oncancel callbacks, and hands every frame still in its buffer back
+    through the frame's ondone so the memory held for it is released.
+    """
+
+    def __init__(self):
+        self.id = next(_ids)
+        # (screen command, frame, tags, ondone) entries
+        self.buffer: "Queue[Any]" = Queue()
+        self.clock: Optional[FrameClock] = None
+        self.loadresult: Any = None
+        self.shown = 0
+        # why the session was cancelled, for the client, or None to end its stream quietly
+        self.reason: Optional[str] = None
+        # the frame a Seek asked to go on from
+        self.seek_to: Optional[int] = None
+        self.paused = False
+        self._children: List["PlaybackSession"] = []
+        self._cancelled = threading.Event()
+        self._oncancel: List[Callable[[], None]] = []
+        self._taker: Optional[Callable[[Any], None]] = None
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def oncancel(self, fn: Callable[[], None]) -> None:
+        """Registers fn to run on cancel, or runs it now if the session is already cancelled."""
+        with self._lock:
+            if not self._cancelled.is_set():
+                self._oncancel.append(fn)
+                return
+        fn()
+
+    def child(self) -> "PlaybackSession":
+        """Returns a session with its own buffer and clock that is cancelled along with this one,
+        for each extra screen the video is played to."""
+        child = PlaybackSession()
+        child.paused = self.paused
+        self._children.append(child)
+        self.oncancel(child.cancel)
+        return child
+
+    def pause(self) -> None:
+        """Holds back the next frame on every screen the session plays to."""
+        self.paused = True
+        for session in [self] + self._children:
+            if session.clock:
+                session.clock.pause()
+
+    def resume(self) -> None:
+        self.paused = False
+        for session in [self] + self._children:
+            if session.clock:
+                session.clock.resume()
+
+    def put(self, entry: Any) -> bool:
+        """Queues a frame for the screen. Returns False, and does not queue it, once cancelled."""
+        with self._lock:
+            if self._cancelled.is_set():
+                return False
+            self.buffer.put(entry, block=True)
+            taker, self._taker = self._taker, None
+            if taker:
+                entry = self.buffer.get_nowait()
+
+        if taker:
+            taker(entry)
+        return True
+
+    def take(self, fn: Callable[[Any], None]) -> None:
+        """Calls fn with the next frame now if one is buffered, or else as soon as one is put.
+
+        fn gets None instead if the session is, or gets, cancelled first.
+        """
+        with self._lock:
+            entry = None
+            if not self._cancelled.is_set():
+                try:
+                    entry = self.buffer.get_nowait()
+                except Empty:
+                    self._taker = fn
+                    return
+        fn(entry)
+
+    def cancel(self, reason: Optional[str] = None) -> None:
+        with self._lock:
+            if self._cancelled.is_set():
+                return
+            self.reason = reason
+            self._cancelled.set()
+            callbacks, self._oncancel = self._oncancel, []
+
+        if self.clock:
+            self.clock.cancel()
+
+        for fn in callbacks:
+            try:
+                fn()
+            except Exception as ex:
+                logevent("SESSN", f"cancel callback failed in session {self.id}", ex)
+
+        self.drain()
+        with self._lock:
+            taker, self._taker = self._taker, None
+        if taker:
+            taker(None)
+
+    def drain(self) -> None:
+        while True:
+            try:
+                entry = self.buffer.get_nowait()
+            except Empty:
+                return
+
+            if entry[3]:
+                entry[3]()
+            self.buffer.task_done()
+
+    def __repr__(self) -> str:
+        return f"<PlaybackSession {self.id} cancelled={self.cancelled} shown={self.shown}>"
@@ -0,0 +1,162 @@
+import collections
+import json
+import os
+import threading
+from typing import Any, Deque, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+
+class Span(NamedTuple):
+    processor: str
+    command: str
+    tags: Tuple[Any, ...]
+    thread: str
+    # time.perf_counter() at send, exec start, exec end and callback end
+    sent: float
+    started: float
+    executed: float
+    ended: float
+    ok: bool = True
+
+
+def _trace_key(tags: Iterable[Any]) -> Optional[Tuple[str, Any]]:
+    """Returns the first (name, value) tag, which names the frame or job a command is for."""
+    for tag in tags:
+        if isinstance(tag, tuple) and len(tag) == 2:
+            return (str(tag[0]), tag[1])
+    return None
+
+
+class Tracer:
+    """Keeps the most recent command spans while enabled, for export as a Chrome trace."""
+
+    def __init__(self, limit: int = 100000):
+        self.enabled = False
+        self._spans: Deque[Span] = collections.deque(maxlen=limit)
+        self._lock = threading.Lock()
+
+    def record(self, span: Span) -> None:
+        if self.enabled:
+            with self._lock:
+                self._spans.append(span)
+
+    def spans(self) -> List[Span]:
+        with self._lock:
+            return list(self._spans)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._spans.clear()
+
+    def chrome_trace(self) -> Dict[str, Any]:
+        """Returns the spans as Chrome/Perfetto trace events.
+
+        Each command is a slice on the thread that ran it, split into exec and callback, with
+        its queue wait on a track of its own per processor. Commands that share a tag such as
+        ("frame", n) are joined by a flow, and the whole frame is an async slice.
+        """
+        pid = os.getpid()
+        tids: Dict[str, int] = {}
+        events: List[Dict[str, Any]] = []
+        jobs: Dict[Tuple[str, Any], List[Span]] = collections.defaultdict(list)
+
+        def _tid(name: str) -> int:
+            if name not in tids:
+                tids[name] = len(tids) + 1
+                events.append(
+                    {
+                        "ph": "M",
+                        "name": "thread_name",
+                        "pid": pid,
+                        "tid": tids[name],
+                        "args": {"name": name},
+                    }
+                )
+            return tids[name]
+
+        def _us(t: float) -> float:
+            return t * 1e6
+
+        for span in sorted(self.spans(), key=lambda s: s.sent):
+            key = _trace_key(span.tags)
+            args = {"tags": repr(span.tags), "ok": span.ok}
+            name = f"{span.processor}::{span.command}"
+            tid = _tid(span.thread)
+
+            events.append(
+                {
+                    "ph": "X",
+                    "name": f"wait {name}",
+                    "cat": "queue",
+                    "pid": pid,
+                    "tid": _tid(f"{span.processor} queue"),
+                    "ts": _us(span.sent),
+                    "dur": _us(span.started - span.sent),
+                    "args": args,
+                }
+            )
+            events.append(
+                {
+                    "ph": "X",
+                    "name": name,
+                    "cat": "exec",
+                    "pid": pid,
+                    "tid": tid,
+                    "ts": _us(span.started),
+                    "dur": _us(span.executed - span.started),
+                    "args": args,
+                }
+            )
+            if span.ended > span.executed:
+                events.append(
+                    {
+                        "ph": "X",
+                        "name": f"then {name}",
+                        "cat": "callback",
+                        "pid": pid,
+                        "tid": tid,
+                        "ts": _us(span.executed),
+                        "dur": _us(span.ended - span.executed),
+                        "args": args,
+                    }
+                )
+
+            if key:
+                jobs[key].append(span)
+
+        for x, (key, spans) in enumerate(jobs.items()):
+            label = f"{key[0]} {key[1]}"
+            first, last = spans[0], max(spans, key=lambda s: s.ended)
+            for ph, ts in (("b", first.sent), ("e", last.ended)):
+                events.append(
+                    {
+                        "ph": ph,
+                        "name": label,
+                        "cat": key[0],
+                        "id": x,
+                        "pid": pid,
+                        "tid": 0,
+                        "ts": _us(ts),
+                    }
+                )
+
+            for y, span in enumerate(spans if len(spans) > 1 else ()):
+                events.append(
+                    {
+                        "ph": "s" if y == 0 else ("f" if y == len(spans) - 1 else "t"),
+                        "name": label,
+                        "cat": "flow",
+                        "id": x,
+                        "bp": "e",
+                        "pid": pid,
+                        "tid": tids[span.thread],
+                        "ts": _us(span.started),
+                    }
+                )
+
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def dumps(self) -> str:
+        return json.dumps(self.chrome_trace())
+
+
+TRACER = Tracer()
@@ -0,0 +1,136 @@
+import struct
+import sys
+from array import array
+from fractions import Fraction
+from pathlib import Path
+from typing import TYPE_CHECKING, NamedTuple, Optional, Sequence
+
+from qcmd.core import logevent
+
+import vslomp.cache as cache
+from vslomp.lazy import lazy_import
+
+if TYPE_CHECKING:
+    import av
+else:
+    av = lazy_import("av")
+
+_MAGIC = b"VSLI"
+_VERSION = 1
+_HEADER = struct.Struct("<4sHIIii")
+
+
+class FrameIndex(NamedTuple):
+    pts: Sequence[int]
+    keyframes: Sequence[int]
+    time_base: Fraction
+
+    @property
+    def frames(self) -> int:
+        return len(self.pts)
+
+    def addressable(self, skip_frame: Optional[str]) -> Sequence[int]:
+        """The pts of the frames a decoder with the given skip_frame setting will yield."""
+        if skip_frame == "NONKEY":
+            return [self.pts[k] for k in self.keyframes]
+        return self.pts
+
+    def addressable_keyframes(self, skip_frame: Optional[str]) -> Sequence[int]:
+        """The positions of the keyframes among the addressable frames."""
+        if skip_frame == "NONKEY":
+            return range(len(self.keyframes))
+        return self.keyframes
+
+
+def build_index(resource: str, video_stream: int) -> FrameIndex:
+    """Walks the packets of a video stream without decoding them.
+
+    The index is empty if the stream's packets carry no pts, as in some raw or AVI streams,
+    since decoded frames could not be matched to it.
+    """
+    pts = []
+    keypts = set()
+
+    with av.open(resource) as container:
+        stream = container.streams.video[video_stream]
+        time_base = stream.time_base or Fraction(1, 1)
+        for packet in container.demux(stream):
+            if packet.size == 0:
+                continue
+            if packet.pts is None:
+                logevent("INDEX", f"{resource} has packets without pts, so it is not indexed")
+                return FrameIndex([], [], Fraction(time_base))
+            pts.append(packet.pts)
+            if packet.is_keyframe:
+                keypts.add(packet.pts)
+
+    pts.sort()
+    keyframes = [x for x, p in enumerate(pts) if p in keypts]
+    return FrameIndex(pts, keyframes, Fraction(time_base))
+
+
+def dumps(index: FrameIndex) -> bytes:
+    pts = array("q", index.pts)
+    keyframes = array("I", index.keyframes)
+    if sys.byteorder != "little":
+        pts.byteswap()
+        keyframes.byteswap()
+
+    header = _HEADER.pack(
+        _MAGIC,
+        _VERSION,
+        len(pts),
+        len(keyframes),
+        index.time_base.numerator,
+        index.time_base.denominator,
+    )
+    return header + pts.tobytes() + keyframes.tobytes()
+
+
+def loads(data: bytes) -> FrameIndex:
+    magic, version, npts, nkeys, tb_num, tb_den = _HEADER.unpack_from(data)
+    if magic != _MAGIC or version != _VERSION:
+        raise ValueError("not a frame index")
+
+    pts = array("q")
+    keyframes = array("I")
+    offset = _HEADER.size
+    pts.frombytes(data[offset : offset + npts * pts.itemsize])
+    offset += npts * pts.itemsize
+    keyframes.frombytes(data[offset : offset + nkeys * keyframes.itemsize])
+    if sys.byteorder != "little":
+        pts.byteswap()
+        keyframes.byteswap()
+
+    if len(pts) != npts or len(keyframes) != nkeys:
+        raise ValueError("truncated frame index")
+
+    return FrameIndex(pts, keyframes, Fraction(tb_num, tb_den))
+
+
+def index_path(resource: str, video_stream: int, cache_dir: Optional[Path] = None) -> Path:
+    return cache.cache_path(cache_dir, "index", cache.file_key(resource, video_stream), ".vsli")
+
+
+def get_index(resource: str, video_stream: int, cache_dir: Optional[Path] = None) -> FrameIndex:
+    """Returns the cached index for the video, building and caching it on a miss.
+
+    The cache key includes the file's size and mtime, so a replaced file is re-indexed.
+    """
+    path = index_path(resource, video_stream, cache_dir)
+
+    try:
+        return loads(path.read_bytes())
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError, struct.error) as ex:
+        logevent("INDEX", f"discarding unreadable index {path}", ex)
+
+    index = build_index(resource, video_stream)
+
+    try:
+        cache.atomic_write(path, dumps(index))
+    except OSError as ex:
+        logevent("INDEX", f"could not write index {path}", ex)
+
+    return index
@@ -0,0 +1,153 @@
+import collections
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Hashable, List, NamedTuple, Optional, Tuple
+
+from qcmd.core import logevent
+
+import vslomp.cache as cache
+from vslomp.video.proc import LoadResult, _load
+
+# decoded frames a container is taken to hold, besides one per codec thread: the references
+# a typical stream keeps, and the frame on its way out
+_HELD_FRAMES = 4
+
+
+class _Entry(NamedTuple):
+    key: Hashable
+    loadresult: LoadResult
+    nbytes: int
+
+
+def footprint(loadresult: LoadResult, threads: bool = False) -> int:
+    """Estimates the decoder memory of an open container, in bytes, from its frame size."""
+    codec = loadresult.stream.codec_context
+    frame = (codec.width or 0) * (codec.height or 0) * 3 // 2
+    # frame threading keeps a frame in flight on every codec thread
+    held = _HELD_FRAMES + ((codec.thread_count or os.cpu_count() or 1) if threads else 1)
+    return frame * held
+
+
+class ContainerPool:
+    """Keeps videos open after they are unloaded, so loading one again seeks it back to the
+    start instead of opening and probing the file again.
+
+    Containers are keyed by the file's path, size and mtime, the video stream and its decode
+    settings. A container is used by one playback at a time; another load of the same video
+    while it is out opens one more. Idle containers are closed, least recently used first,
+    once more than containers are open or their decoders are estimated to hold more than
+    memory bytes.
+    """
+
+    def __init__(self, containers: int = 4, memory: int = 256 * 2**20):
+        self.containers = containers
+        self.memory = memory
+        self._idle: "collections.OrderedDict[int, _Entry]" = collections.OrderedDict()
+        self._out: Dict[int, _Entry] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _key(
+        self, resource: str, video_stream: int, skip_frame: Optional[str], threads: bool
+    ) -> Optional[Hashable]:
+        try:
+            return (cache.file_key(resource), video_stream, skip_frame, threads)
+        except OSError:
+            # not a local file, so it is opened afresh every time
+            return None
+
+    def acquire(
+        self,
+        resource: str,
+        video_stream: int,
+        skip_frame: Optional[str] = None,
+        cache_dir: Optional[Path] = None,
+        threads: bool = False,
+    ) -> LoadResult:
+        """Returns the video loaded and at its start, from the pool if it is in it."""
+        key = self._key(resource, video_stream, skip_frame, threads)
+
+        entry = self._take(key) if key is not None else None
+        if entry:
+            try:
+                # flushes the decoder too, so nothing from the last playback comes out
+                entry.loadresult.container.seek(0)
+            except Exception as ex:
+                logevent("POOL", f"could not rewind {resource}, opening it again", ex)
+                self._close(entry)
+                entry = None
+
+        with self._lock:
+            if entry:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        if entry is None:
+            loadresult = _load(resource, video_stream, skip_frame, cache_dir, threads)
+            entry = _Entry(key, loadresult, footprint(loadresult, threads))
+
+        with self._lock:
+            self._out[id(entry.loadresult.container)] = entry
+        return entry.loadresult
+
+    def release(self, loadresult: LoadResult) -> None:
+        """Gives back a loaded video, which stays open if there is room for it."""
+        container_id = id(loadresult.container)
+        with self._lock:
+            entry = self._out.pop(container_id, None)
+            if entry is None and container_id in self._idle:
+                # already given back
+                return
+            if entry is not None and entry.key is not None:
+                self._idle[container_id] = entry
+                evicted = self._evict()
+            else:
+                evicted = [entry or _Entry(None, loadresult, 0)]
+
+        for old in evicted:
+            self._close(old)
+
+    def close(self) -> None:
+        """Closes every idle container; those still out are closed when they are given back."""
+        with self._lock:
+            idle = list(self._idle.values())
+            self._idle.clear()
+            self.containers = 0
+        for entry in idle:
+            self._close(entry)
+
+    def stats(self) -> Tuple[int, int, int]:
+        """Returns the number of open containers, idle ones, and their estimated bytes."""
+        with self._lock:
+            entries = list(self._idle.values()) + list(self._out.values())
+            return len(entries), len(self._idle), sum(e.nbytes for e in entries)
+
+    def _take(self, key: Hashable) -> Optional[_Entry]:
+        with self._lock:
+            for container_id, entry in reversed(self._idle.items()):
+                if entry.key == key:
+                    del self._idle[container_id]
+                    return entry
+        return None
+
+    def _evict(self) -> List[_Entry]:
+        evicted = []
+        nbytes = sum(e.nbytes for e in self._idle.values()) + sum(
+            e.nbytes for e in self._out.values()
+        )
+        while self._idle and (
+            len(self._idle) + len(self._out) > self.containers or nbytes > self.memory
+        ):
+            _, entry = self._idle.popitem(last=False)
+            nbytes -= entry.nbytes
+            evicted.append(entry)
+        return evicted
+
+    def _close(self, entry: _Entry) -> None:
+        try:
+            entry.loadresult.container.close()
+        except Exception as ex:
+            logevent("POOL", "could not close a container", ex)
@@ -1,15 +1,38 @@
+import bisect
 import dataclasses
 import enum
 import itertools
-from typing import TYPE_CHECKING, Any, Callable, Container, ContextManager, NamedTuple, Optional
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Container,
+    Iterable,
+    Iterator,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 
-import av
 import qcmd.processors.executor as q
 from PIL import Image
 from qcmd.core import Command
 
+import vslomp.metrics as metrics
+from vslomp.archive import Archive
+from vslomp.lazy import lazy_import
+from vslomp.session import PlaybackSession
+from vslomp.video.index import FrameIndex, get_index
+
 if TYPE_CHECKING:
-    from av import InputContainer
+    import av
+
+    from vslomp.video.pool import ContainerPool
+else:
+    av = lazy_import("av")
 
 Result = Any
 
@@ -18,14 +41,22 @@ class CommandId(enum.Enum):
     LOAD = enum.auto()
     GENERATE_IMAGES = enum.auto()
     UNLOAD = enum.auto()
+    LOAD_ARCHIVE = enum.auto()
+    GENERATE_BUFFERS = enum.auto()
+
 
+class Context(NamedTuple):
+    cache_dir: Optional[Path] = None
+    # keeps unloaded videos open to load again; without one, Unload closes them
+    pool: Optional["ContainerPool"] = None
 
-class VideoProcessorFactory(q.ProcessorFactory[CommandId, None]):
+
+class VideoProcessorFactory(metrics.ProcessorFactory[CommandId, Context]):
     procname = "Video"
 
 
-VideoProcessor = q.Processor[Command, None]
-_VideoCommand = q.Command[CommandId, None, Result]
+VideoProcessor = q.Processor[Command, Context]
+_VideoCommand = q.Command[CommandId, Context, Result]
 VideoCommandHandle = q.CommandHandle[CommandId, Result]
 
 
@@ -33,42 +64,149 @@ class LoadResult(NamedTuple):
     container: Any
     stream: Any
     frames: int
+    index: Optional[FrameIndex] = None
+    skip_frame: Optional[str] = None
 
 
-_loaded_manager: Optional[ContextManager["InputContainer"]] = None
+# skip_frame settings whose output can be predicted from packet keyframe flags alone
+_INDEXED_SKIP_FRAME = ("DEFAULT", "NONKEY")
 
 
-def _load(resource: str, video_stream: int, skip_frame: Optional[str] = None):
-    global _loaded_manager
+def _load(
+    resource: str,
+    video_stream: int,
+    skip_frame: Optional[str] = None,
+    cache_dir: Optional[Path] = None,
+    threads: bool = False,
+):
     frames = 0
+    index = None
 
-    if skip_frame:
+    if skip_frame in _INDEXED_SKIP_FRAME:
+        # an empty index has nothing to seek by, so the video is counted and played by
+        # decoding it straight through instead
+        index = get_index(resource, video_stream, cache_dir)
+        if not index.frames:
+            index = None
+
+    if index:
+        # the number of the last frame, as the decode scan below reports it
+        frames = max(0, len(index.addressable(skip_frame)) - 1)
+    elif skip_frame:
         with av.open(resource) as temp_container:
             temp_stream = temp_container.streams.video[video_stream]
             temp_stream.codec_context.skip_frame = skip_frame
+            if threads:
+                temp_stream.thread_type = "AUTO"
             for x, _ in enumerate(temp_container.decode(temp_stream)):
                 frames = x
 
-    _loaded_manager = av.open(resource)
-    container = _loaded_manager.__enter__()
+    container = av.open(resource)
     stream = container.streams.video[video_stream]
     if skip_frame:
         stream.codec_context.skip_frame = skip_frame
+    if threads:
+        # lets libav decode on several threads, by frame and by slice
+        stream.thread_type = "AUTO"
+
+    return LoadResult(
+        container, stream, frames if skip_frame else stream.frames, index, skip_frame
+    )
+
+
+def fit_size(size: Tuple[int, int], bounds: Tuple[int, int]) -> Tuple[int, int]:
+    """Returns size scaled down, keeping its aspect ratio, to fit in bounds."""
+    width, height = size
+    scale = min(bounds[0] / width, bounds[1] / height, 1.0)
+    return (max(1, round(width * scale)), max(1, round(height * scale)))
+
+
+def scaled_gray(vframe: Any, bounds: Tuple[int, int]) -> Image.Image:
+    """Converts a decoded frame straight to an L-mode image that fits in bounds.
+
+    libswscale scales and drops the color in one pass, so the full size RGB image that
+    to_image makes is never built.
+    """
+    width, height = fit_size((vframe.width, vframe.height), bounds)
+    gray = vframe.reformat(width=width, height=height, format="gray8", interpolation="AREA")
+    return Image.fromarray(gray.to_ndarray(), "L")
+
+
+def _seek_frames(
+    loadresult: LoadResult, targets: Iterable[int], pace: Optional[Callable[[], None]] = None
+) -> Iterator[Any]:
+    """Yields the decoded frame for each target frame number, in order.
+
+    Seeks to the keyframe before a target when that skips at least one keyframe's worth of
+    decoding, otherwise decodes straight through from the current position.
+    """
+    assert loadresult.index is not None
+    container, stream = loadresult.container, loadresult.stream
+    pts = loadresult.index.addressable(loadresult.skip_frame)
+    keyframes = loadresult.index.addressable_keyframes(loadresult.skip_frame)
+
+    frames: Optional[Iterator[Any]] = None
+    pos = 0  # the number of the next frame the decoder will produce
+
+    for target in targets:
+        if target >= len(pts):
+            return
+
+        if pace:
+            pace()
+
+        key = keyframes[bisect.bisect_right(keyframes, target) - 1] if keyframes else 0
+        if frames is None or target < pos or key > pos:
+            container.seek(pts[key], stream=stream, backward=True, any_frame=False)
+            frames = container.decode(stream)
+            pos = key
+
+        for vframe in frames:
+            if vframe.pts is None:
+                # taken to be frame pos, which is only the target once it has been reached
+                pos += 1
+                if pos - 1 < target:
+                    continue
+            else:
+                pos = bisect.bisect_right(pts, vframe.pts)
+                if vframe.pts < pts[target]:
+                    continue
+
+            yield vframe
+            break
+        else:
+            return
 
-    return LoadResult(container, stream, frames if skip_frame else stream.frames)
+
+def _paced(frames: Iterator[Any], pace: Optional[Callable[[], None]]) -> Iterator[Any]:
+    """Calls pace before pulling, and so decoding, each frame."""
+    while True:
+        if pace:
+            pace()
+        try:
+            yield next(frames)
+        except StopIteration:
+            return
 
 
 class Cmd:
     @dataclasses.dataclass
-    class Load(q.Command[CommandId, None, LoadResult]):
+    class Load(q.Command[CommandId, Context, LoadResult]):
         cmdid = CommandId.LOAD
 
         resource: str
         vstream_idx: int
         skip_frame: str
+        threads: bool = False
 
-        def exec(self, hcmd: q.CommandHandle[CommandId, LoadResult], cxt: None) -> LoadResult:
-            return _load(self.resource, self.vstream_idx, self.skip_frame)
+        def exec(self, hcmd: q.CommandHandle[CommandId, LoadResult], cxt: Context) -> LoadResult:
+            if cxt.pool:
+                return cxt.pool.acquire(
+                    self.resource, self.vstream_idx, self.skip_frame, cxt.cache_dir, self.threads
+                )
+            return _load(
+                self.resource, self.vstream_idx, self.skip_frame, cxt.cache_dir, self.threads
+            )
 
     @dataclasses.dataclass
     class GenerateImages(_VideoCommand):
@@ -79,31 +217,93 @@ class Cmd:
         start: Optional[int] = 0
         stop: Optional[int] = None
         step: Optional[int] = None
+        seek: bool = True
+        pace: Optional[Callable[[], None]] = None
+        session: Optional[PlaybackSession] = None
+        # when set, frames come out as grayscale images already scaled to fit this size
+        size: Optional[Tuple[int, int]] = None
+        # the first frames from start, decoded ahead of time
+        head: Sequence[Image.Image] = ()
 
-        def exec(self, hcmd: VideoCommandHandle, cxt: None) -> int:
+        def exec(self, hcmd: VideoCommandHandle, cxt: Context) -> int:
             _start = self.start if self.start else 0
             _step = self.step if self.step else 1
+            _decode_start = _start + _step * len(self.head)
 
             def _calcframe(x: int):
                 return _start + (_step * x)
 
-            x = 0
-            for x, vframe in enumerate(
-                itertools.islice(
-                    self.loadresult.container.decode(self.loadresult.stream),
-                    self.start,
-                    self.stop,
-                    self.step,
+            if self.seek and self.loadresult.index:
+                _stop = self.stop if self.stop is not None else self.loadresult.index.frames
+                vframes = _seek_frames(
+                    self.loadresult, range(_decode_start, _stop, _step), self.pace
+                )
+            else:
+                vframes = _paced(
+                    itertools.islice(
+                        self.loadresult.container.decode(self.loadresult.stream),
+                        _decode_start,
+                        self.stop,
+                        self.step,
+                    ),
+                    self.pace,
                 )
-            ):
-                self.onimage(vframe.to_image(), _calcframe(x), hcmd.tags)
+
+            def _images() -> Iterator[Image.Image]:
+                for img in self.head:
+                    if self.pace:
+                        self.pace()
+                    yield img
+                for vframe in vframes:
+                    yield scaled_gray(vframe, self.size) if self.size else vframe.to_image()
+
+            x = -1  # when no frames are generated
+            for x, img in enumerate(_images()):
+                if self.session and self.session.cancelled:
+                    return x - 1
+                self.onimage(img, _calcframe(x), hcmd.tags)
 
             return x
 
+    @dataclasses.dataclass
     class Unload(_VideoCommand):
         cmdid = CommandId.UNLOAD
 
-        def exec(self, hcmd: VideoCommandHandle, cxt: None) -> Result:
-            global _loaded_manager
-            if _loaded_manager:
-                _loaded_manager.__exit__(None, None, None)
+        loadresult: Union[LoadResult, Archive]
+
+        def exec(self, hcmd: VideoCommandHandle, cxt: Context) -> Result:
+            if isinstance(self.loadresult, Archive):
+                self.loadresult.close()
+            elif cxt.pool:
+                cxt.pool.release(self.loadresult)
+            else:
+                self.loadresult.container.close()
+
+    @dataclasses.dataclass
+    class LoadArchive(q.Command[CommandId, Context, Archive]):
+        cmdid = CommandId.LOAD_ARCHIVE
+
+        resource: str
+
+        def exec(self, hcmd: q.CommandHandle[CommandId, Archive], cxt: Context) -> Archive:
+            return Archive(self.resource)
+
+    @dataclasses.dataclass
+    class GenerateBuffers(_VideoCommand):
+        cmdid = CommandId.GENERATE_BUFFERS
+
+        archive: Archive
+        onbuffer: Callable[[memoryview, int, Container[Any]], None]
+        start: Optional[int] = 0
+        stop: Optional[int] = None
+        step: Optional[int] = None
+        session: Optional[PlaybackSession] = None
+
+        def exec(self, hcmd: VideoCommandHandle, cxt: Context) -> int:
+            x = -1  # when no frames are generated
+            for x, pos in enumerate(range(len(self.archive))[self.start : self.stop : self.step]):
+                if self.session and self.session.cancelled:
+                    return x - 1
+                self.onbuffer(self.archive.buffer(pos), self.archive.frame_number(pos), hcmd.tags)
+
+            return x
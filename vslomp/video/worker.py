@@ -0,0 +1,176 @@
+import multiprocessing
+import queue
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from PIL import Image
+from qcmd.core import logevent
+
+from vslomp.archive import frame_bytes
+from vslomp.display.imager.dither import DEFAULT, dither
+from vslomp.display.imager.proc import ensure_size
+from vslomp.display.ring import FrameRing
+from vslomp.display.screen.pack import pack_image
+from vslomp.video.proc import _load, _seek_frames, scaled_gray
+
+
+class RenderSpec(NamedTuple):
+    resource: str
+    vstream_idx: int
+    size: Tuple[int, int]
+    skip_frame: str = "NONKEY"
+    start: int = 0
+    stop: Optional[int] = None
+    step: int = 1
+    cache_dir: Optional[Path] = None
+    # decode straight to grayscale at the screen size
+    scaled_decode: bool = False
+    # one of dither.DITHERS
+    dither: str = DEFAULT
+    # decode on several threads, as Cmd.Load
+    threads: bool = False
+
+
+def render_image(
+    vframe: Any, size: Tuple[int, int], scaled_decode: bool = False, algorithm: str = DEFAULT
+) -> Image.Image:
+    """Sizes and dithers a decoded frame for a screen of size."""
+    img = scaled_gray(vframe, size) if scaled_decode else vframe.to_image()
+    return dither(ensure_size(img, size, 0, Image.ANTIALIAS), algorithm)
+
+
+def _render(
+    spec: RenderSpec,
+    ring: FrameRing,
+    worker: int,
+    workers: int,
+    ready: Any,
+    stop: Any,
+) -> None:
+    """Decodes, sizes, dithers and packs every workers-th frame of spec into the ring."""
+    try:
+        loadresult = _load(
+            spec.resource, spec.vstream_idx, spec.skip_frame, spec.cache_dir, spec.threads
+        )
+        try:
+            assert loadresult.index is not None
+            _stop = spec.stop if spec.stop is not None else loadresult.index.frames
+            frames = range(spec.start, _stop, spec.step)
+            seqs = range(worker, len(frames), workers)
+
+            for seq, vframe in zip(seqs, _seek_frames(loadresult, (frames[s] for s in seqs))):
+                buf = pack_image(
+                    render_image(vframe, spec.size, spec.scaled_decode, spec.dither), spec.size
+                )
+
+                while not ring.acquire(seq, timeout=0.5):
+                    if stop.is_set():
+                        return
+                if stop.is_set():
+                    ring.release(seq)
+                    return
+
+                ring.view(seq)[:] = buf
+                ready.put(("frame", seq, frames[seq]))
+        finally:
+            loadresult.container.close()
+    except Exception as ex:
+        ready.put(("error", worker, repr(ex)))
+    finally:
+        ready.put(("done", worker, None))
+
+
+class RenderPool:
+    """Renders frames in worker processes and hands them back in order through a FrameRing.
+
+    Each of the workers opens the video itself and takes every workers-th frame of the range,
+    so only packed screen buffers cross the process boundary.
+    """
+
+    def __init__(self, spec: RenderSpec, workers: int, slots: int):
+        ctx = multiprocessing.get_context("spawn")
+        self.spec = spec
+        self.workers = workers
+        self.ring = FrameRing(max(slots, workers + 1), frame_bytes(spec.size), ctx)
+        self._ready = ctx.Queue()
+        self._stop = ctx.Event()
+        self._procs = [
+            ctx.Process(
+                target=_render,
+                args=(spec, self.ring, x, workers, self._ready, self._stop),
+                name=f"Render-{x}",
+                daemon=True,
+            )
+            for x in range(workers)
+        ]
+        self._collector: Optional[threading.Thread] = None
+
+    def start(
+        self,
+        onbuffer: Callable[[memoryview, int, Callable[[], None]], None],
+        onfinish: Callable[[int], None],
+        onerror: Callable[[str], None],
+    ) -> None:
+        """Starts the workers. onbuffer gets each frame in order with a callback that frees its
+        slot, and onfinish the index of the last frame handed on (-1 for none)."""
+        for proc in self._procs:
+            proc.start()
+
+        self._collector = threading.Thread(
+            target=self._collect, args=(onbuffer, onfinish, onerror), name="RenderCollect"
+        )
+        self._collector.daemon = True
+        self._collector.start()
+
+    def _collect(
+        self,
+        onbuffer: Callable[[memoryview, int, Callable[[], None]], None],
+        onfinish: Callable[[int], None],
+        onerror: Callable[[str], None],
+    ) -> None:
+        pending: Dict[int, int] = {}
+        done: List[int] = []
+        seq = 0
+
+        while len(done) < self.workers:
+            try:
+                kind, key, val = self._ready.get(timeout=1.0)
+            except queue.Empty:
+                for x, proc in enumerate(self._procs):
+                    if x not in done and not proc.is_alive():
+                        done.append(x)
+                        onerror(f"render worker {x} exited with {proc.exitcode}")
+                        self.stop()
+                continue
+
+            if kind == "frame":
+                pending[key] = val
+            elif kind == "done":
+                if key not in done:
+                    done.append(key)
+            else:
+                logevent("RENDER", f"worker {key} failed", val)
+                onerror(val)
+                self.stop()
+
+            while seq in pending and not self._stop.is_set():
+                onbuffer(self.ring.view(seq), pending.pop(seq), _releaser(self.ring, seq))
+                seq += 1
+
+        onfinish(seq - 1)
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def close(self, timeout: float = 2.0) -> None:
+        self.stop()
+        for proc in self._procs:
+            if proc.pid is not None:
+                proc.join(timeout)
+                if proc.is_alive():
+                    proc.terminate()
+
+
+def _releaser(ring: FrameRing, seq: int) -> Callable[[], None]:
+    return lambda: ring.release(seq)